@@ -3,12 +3,18 @@ Action Recommendation Agent
 Responsible for recommending specific mitigation and resolution actions
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_action_recommendation_agent() -> Agent:
+def create_action_recommendation_agent(llm=None) -> "Agent":
     """Create the Action Recommendation Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Action Recommendation Specialist",
         goal="Provide specific, actionable mitigation and resolution steps based on root cause analysis",
@@ -19,5 +25,5 @@ def create_action_recommendation_agent() -> Agent:
         permanent solutions, and can recommend both immediate mitigation and long-term fixes.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
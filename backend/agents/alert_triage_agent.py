@@ -3,12 +3,18 @@ Alert Triage Agent
 Responsible for initial alert assessment and severity classification
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_alert_triage_agent() -> Agent:
+def create_alert_triage_agent(llm=None) -> "Agent":
     """Create the Alert Triage Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Alert Triage Specialist",
         goal="Analyze incoming alerts and classify their severity and urgency",
@@ -18,5 +24,5 @@ def create_alert_triage_agent() -> Agent:
         multiple alerts based on service criticality and user impact.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
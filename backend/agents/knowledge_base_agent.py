@@ -3,12 +3,18 @@ Knowledge Base Agent
 Responsible for correlating current incident with historical incidents and known issues
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_knowledge_base_agent() -> Agent:
+def create_knowledge_base_agent(llm=None) -> "Agent":
     """Create the Knowledge Base Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Knowledge Base Specialist",
         goal="Correlate current incident data with historical incidents and known patterns",
@@ -19,5 +25,5 @@ def create_knowledge_base_agent() -> Agent:
         modes, and proven resolution strategies.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
@@ -3,12 +3,18 @@ Log Analysis Agent
 Responsible for analyzing log data to identify patterns and anomalies
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_log_analysis_agent() -> Agent:
+def create_log_analysis_agent(llm=None) -> "Agent":
     """Create the Log Analysis Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Log Analysis Expert",
         goal="Analyze log data to identify error patterns, anomalies, and potential root causes",
@@ -18,5 +24,5 @@ def create_log_analysis_agent() -> Agent:
         issues, or security concerns. You understand log correlation across distributed systems.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
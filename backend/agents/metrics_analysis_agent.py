@@ -3,12 +3,18 @@ Metrics Analysis Agent
 Responsible for analyzing system metrics and performance data
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_metrics_analysis_agent() -> Agent:
+def create_metrics_analysis_agent(llm=None) -> "Agent":
     """Create the Metrics Analysis Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Metrics Analysis Specialist",
         goal="Analyze system metrics to identify performance bottlenecks and resource constraints",
@@ -19,5 +25,5 @@ def create_metrics_analysis_agent() -> Agent:
         and can spot trends that indicate impending failures.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
@@ -3,12 +3,18 @@ Post-Incident Report Agent
 Responsible for generating comprehensive post-incident reports
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_post_incident_agent() -> Agent:
+def create_post_incident_agent(llm=None) -> "Agent":
     """Create the Post-Incident Report Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Post-Incident Report Specialist",
         goal="Generate comprehensive post-incident reports with timeline, impact, and lessons learned",
@@ -20,5 +26,5 @@ def create_post_incident_agent() -> Agent:
         and executive audiences.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
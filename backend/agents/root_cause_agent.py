@@ -3,12 +3,18 @@ Root Cause Analysis Agent
 Responsible for synthesizing all data to determine the most likely root cause
 """
 
-from crewai import Agent
+from typing import TYPE_CHECKING
+
 from llm_config import get_llm
 
+if TYPE_CHECKING:
+    from crewai import Agent
+
 
-def create_root_cause_agent() -> Agent:
+def create_root_cause_agent(llm=None) -> "Agent":
     """Create the Root Cause Analysis Agent"""
+    from crewai import Agent
+    
     return Agent(
         role="Root Cause Analysis Expert",
         goal="Synthesize all available data to determine the most likely root cause of the incident",
@@ -19,5 +25,5 @@ def create_root_cause_agent() -> Agent:
         between symptoms and actual causes. You provide evidence-based conclusions.""",
         verbose=True,
         allow_delegation=False,
-        llm=get_llm()
+        llm=llm if llm is not None else get_llm()
     )
\ No newline at end of file
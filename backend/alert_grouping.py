@@ -0,0 +1,286 @@
+"""
+Alert Grouping
+Debounces incoming alerts and merges correlated ones into a single incident per group
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+ALERT_DEBOUNCE_SECONDS = float(os.environ.get("ALERT_DEBOUNCE_SECONDS", "30"))
+ALERT_MAX_WAIT_SECONDS = float(os.environ.get("ALERT_MAX_WAIT_SECONDS", "120"))
+ALERT_PROXIMITY_SECONDS = float(os.environ.get("ALERT_PROXIMITY_SECONDS", "600"))
+# Labels (or "service") that must match for alerts to share a group
+ALERT_GROUP_BY = [
+    name.strip() for name in os.environ.get("ALERT_GROUP_BY", "environment,region").split(",") if name.strip()
+]
+
+SEVERITY_RANK = {"critical": 0, "error": 1, "high": 1, "warning": 2, "medium": 2, "info": 3, "low": 3}
+
+# Exemplar alerts kept per group; the rest are only counted
+MAX_EXEMPLARS = 20
+
+
+def _parse_time(value: Any) -> float:
+    """Epoch seconds from an ISO-8601 timestamp (now when missing or unparseable)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def normalize_alert(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an alert to the shape of mock_data/alerts.json
+
+    Accepts that native shape or an Alertmanager webhook alert (labels,
+    annotations, startsAt, fingerprint).
+    """
+    if "annotations" in raw or "startsAt" in raw:
+        labels = dict(raw.get("labels") or {})
+        annotations = raw.get("annotations") or {}
+        alert = {
+            "id": raw.get("fingerprint") or labels.get("alertname"),
+            "timestamp": raw.get("startsAt"),
+            "severity": labels.pop("severity", "warning"),
+            "service": labels.get("service") or labels.get("job") or labels.get("app") or "unknown",
+            "message": annotations.get("summary") or annotations.get("description") or labels.get("alertname", ""),
+            "labels": labels,
+            "metrics": {},
+            "status": raw.get("status", "firing")
+        }
+    else:
+        alert = dict(raw)
+        alert.setdefault("labels", {})
+        alert.setdefault("metrics", {})
+        alert.setdefault("status", "firing")
+    alert["severity"] = str(alert.get("severity") or "warning").lower()
+    alert["service"] = str(alert.get("service") or "unknown")
+    if not alert.get("id"):
+        digest = hashlib.sha1(json.dumps(alert, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        alert["id"] = f"alert-{digest[:12]}"
+    return alert
+
+
+def extract_alerts(payload: Any) -> List[Dict[str, Any]]:
+    """Alerts from a single alert, a list of alerts or an Alertmanager webhook body"""
+    if isinstance(payload, dict) and isinstance(payload.get("alerts"), list):
+        common = payload.get("commonLabels") or {}
+        alerts = []
+        for alert in payload["alerts"]:
+            alert = dict(alert)
+            alert["labels"] = {**common, **(alert.get("labels") or {})}
+            alerts.append(alert)
+        payload = alerts
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError("Expected an alert, a list of alerts or an Alertmanager webhook payload")
+    return [normalize_alert(alert) for alert in payload if isinstance(alert, dict)]
+
+
+class AlertGroup:
+    """Alerts that share a grouping key and arrived close together"""
+
+    def __init__(self, key: Tuple, group_labels: Dict[str, Any]):
+        self.id = f"group-{hashlib.sha1(repr((key, time.time())).encode('utf-8')).hexdigest()[:12]}"
+        self.key = key
+        self.group_labels = group_labels
+        self.opened_at = time.monotonic()
+        self.updated_at = self.opened_at
+        self.first_event_at: Optional[float] = None
+        self.last_event_at: Optional[float] = None
+        self.alert_count = 0
+        self.services: Counter = Counter()
+        self.severities: Counter = Counter()
+        self.exemplars: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self.incident_id: Optional[str] = None
+
+    def add(self, alert: Dict[str, Any], event_at: float) -> None:
+        self.alert_count += 1
+        self.updated_at = time.monotonic()
+        self.first_event_at = event_at if self.first_event_at is None else min(self.first_event_at, event_at)
+        self.last_event_at = event_at if self.last_event_at is None else max(self.last_event_at, event_at)
+        self.services[alert["service"]] += 1
+        self.severities[alert["severity"]] += 1
+        # One exemplar per (service, message); repeats only bump the counters
+        exemplar_key = (alert["service"], str(alert.get("message", "")))
+        if exemplar_key not in self.exemplars and len(self.exemplars) < MAX_EXEMPLARS:
+            self.exemplars[exemplar_key] = alert
+
+    @property
+    def severity(self) -> str:
+        return min(self.severities, key=lambda severity: SEVERITY_RANK.get(severity, 3))
+
+    def to_incident(self) -> Dict[str, Any]:
+        """One merged incident payload for the whole group"""
+        exemplars = list(self.exemplars.values())
+        primary = min(exemplars, key=lambda alert: (SEVERITY_RANK.get(alert["severity"], 3), str(alert.get("timestamp"))))
+        services = [service for service, _ in self.services.most_common()]
+        alert = {
+            "id": self.id,
+            "timestamp": primary.get("timestamp"),
+            "severity": self.severity,
+            "service": primary["service"],
+            "services": services,
+            "message": (
+                f"{self.alert_count} alerts across {len(services)} services: "
+                + "; ".join(f"{item['service']}: {item.get('message', '')}" for item in exemplars[:5])
+            ),
+            "labels": self.group_labels,
+            "metrics": primary.get("metrics") or {},
+            "alert_count": self.alert_count,
+            "alerts": exemplars
+        }
+        metrics = [
+            {"timestamp": item.get("timestamp"), "service": item["service"], "metrics": item["metrics"]}
+            for item in exemplars if item.get("metrics")
+        ]
+        return {
+            "alert": json.dumps(alert, default=str),
+            "logs": "",
+            "metrics": json.dumps(metrics, default=str)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "group_id": self.id,
+            "labels": self.group_labels,
+            "alert_count": self.alert_count,
+            "services": dict(self.services),
+            "severity": self.severity,
+            "incident_id": self.incident_id
+        }
+
+
+class AlertGrouper:
+    """
+    Buffers alerts and submits one merged incident per group
+
+    Alerts join an open group with the same group_by labels when their event
+    time is within proximity_seconds of the group's latest alert. A group is
+    flushed once it has been quiet for debounce_seconds, or after max_wait_seconds
+    even if alerts keep arriving, so a long storm still produces timely analyses.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Dict[str, Any]], Awaitable[Any]],
+        group_by: Iterable[str] = ALERT_GROUP_BY,
+        debounce_seconds: float = ALERT_DEBOUNCE_SECONDS,
+        max_wait_seconds: float = ALERT_MAX_WAIT_SECONDS,
+        proximity_seconds: float = ALERT_PROXIMITY_SECONDS,
+        max_recent: int = 100
+    ):
+        self.submit = submit
+        self.group_by = list(group_by)
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.proximity_seconds = proximity_seconds
+        self.max_recent = max_recent
+        self.open_groups: Dict[Tuple, List[AlertGroup]] = {}
+        self.recent: "OrderedDict[str, AlertGroup]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"received": 0, "resolved_ignored": 0, "groups_flushed": 0, "submit_failures": 0}
+
+    def _group_labels(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        labels = alert.get("labels") or {}
+        return {name: alert["service"] if name == "service" else labels.get(name) for name in self.group_by}
+
+    def add(self, alerts: Iterable[Dict[str, Any]]) -> List[str]:
+        """Buffer normalized alerts; returns the IDs of the groups they joined"""
+        joined = []
+        for alert in alerts:
+            self._counters["received"] += 1
+            if alert.get("status") == "resolved":
+                self._counters["resolved_ignored"] += 1
+                continue
+            group_labels = self._group_labels(alert)
+            key = tuple(sorted((name, str(value)) for name, value in group_labels.items()))
+            event_at = _parse_time(alert.get("timestamp"))
+            candidates = self.open_groups.setdefault(key, [])
+            group = next(
+                (group for group in candidates
+                 if group.first_event_at - self.proximity_seconds <= event_at <= group.last_event_at + self.proximity_seconds),
+                None
+            )
+            if group is None:
+                group = AlertGroup(key, group_labels)
+                candidates.append(group)
+            group.add(alert, event_at)
+            joined.append(group.id)
+        return joined
+
+    def due_groups(self, force: bool = False) -> List[AlertGroup]:
+        now = time.monotonic()
+        return [
+            group for groups in self.open_groups.values() for group in groups
+            if force
+            or now - group.updated_at >= self.debounce_seconds
+            or now - group.opened_at >= self.max_wait_seconds
+        ]
+
+    async def flush(self, force: bool = False) -> List[AlertGroup]:
+        """Submit every group that is due; groups whose submission fails stay open for the next tick"""
+        flushed = []
+        for group in self.due_groups(force):
+            # Detach before awaiting, so alerts that arrive meanwhile open a new group
+            # instead of joining one whose incident has already been built
+            incident = group.to_incident()
+            self.open_groups[group.key].remove(group)
+            if not self.open_groups[group.key]:
+                del self.open_groups[group.key]
+            try:
+                job = await self.submit(incident)
+            except Exception as e:
+                self._counters["submit_failures"] += 1
+                print(f"Alert group {group.id} not submitted yet: {e}")
+                self.open_groups.setdefault(group.key, []).insert(0, group)
+                continue
+            group.incident_id = getattr(job, "id", job)
+            self.recent[group.id] = group
+            while len(self.recent) > self.max_recent:
+                self.recent.popitem(last=False)
+            self._counters["groups_flushed"] += 1
+            flushed.append(group)
+        return flushed
+
+    async def _run(self, tick_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(tick_seconds)
+            await self.flush()
+
+    async def start(self, tick_seconds: float = 1.0) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(tick_seconds), name="alert-grouper")
+
+    async def stop(self) -> None:
+        """Stop the timer and submit whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush(force=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "group_by": self.group_by,
+            "debounce_seconds": self.debounce_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+            "open_groups": [group.snapshot() for groups in self.open_groups.values() for group in groups],
+            "recent_groups": [group.snapshot() for group in reversed(self.recent.values())],
+            **self._counters
+        }
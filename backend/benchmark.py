@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+"""
+Analysis Benchmark
+End-to-end latency, per-stage time, throughput and peak RSS of the pipeline, CrewAI crew and API against a latency-injected mock LLM
+"""
+
+import os
+
+# Measure the pipeline rather than the caches: every request pays for its own LLM calls.
+# These are read at import time by llm_cache and main, so they are set before those imports.
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("ANALYSIS_REUSE_WINDOW_SECONDS", "0")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from mock_data_loader import get_sample_incident_data
+from mock_llm import LatencyProfile, MockOllamaLLM
+from tracing import trace_buffer
+
+
+SCENARIOS = ("pipeline", "pipeline_sync", "api", "crewai")
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "benchmarks")
+
+# A scenario call analyzes request n on worker w and returns the incident ID it was traced under
+ScenarioCall = Callable[[int, int], Awaitable[str]]
+
+
+def unique_incident(base: Dict[str, Any], n: int) -> Dict[str, Any]:
+    """The sample incident made unique per request so no cache or coalescing can serve it"""
+    incident = copy.deepcopy(base)
+    alert = incident.get("alert")
+    if isinstance(alert, dict):
+        alert["id"] = f"bench-{n}"
+        alert["message"] = f"{alert.get('message', '')} (benchmark request {n})"
+    if isinstance(incident.get("logs"), list):
+        incident["logs"].append({
+            "timestamp": "2024-12-22T10:30:30Z", "level": "INFO", "service": "benchmark",
+            "message": f"benchmark request {n}"
+        })
+    metrics = incident.get("metrics")
+    if isinstance(metrics, dict) and isinstance(metrics.get("metrics"), dict):
+        metrics["metrics"]["requests_per_second"] = metrics["metrics"].get("requests_per_second", 0) + n
+    return incident
+
+
+def summarize(values_ms: List[float]) -> Dict[str, Optional[float]]:
+    if not values_ms:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    values = np.asarray(values_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "mean": round(float(values.mean()), 2),
+        "max": round(float(values.max()), 2)
+    }
+
+
+def stage_durations(incident_id: str) -> Dict[str, float]:
+    """Stage (pipeline) or task (CrewAI) durations of one traced analysis, in milliseconds"""
+    trace = trace_buffer.get(incident_id)
+    if trace is None:
+        return {}
+    durations = {}
+    for row in trace.waterfall()["spans"]:
+        prefix, _, name = row["name"].partition(".")
+        if prefix in ("stage", "task") and row["duration_ms"] is not None:
+            durations[name] = row["duration_ms"]
+    return durations
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+async def run_level(call: ScenarioCall, concurrency: int, requests: int, offset: int) -> Dict[str, Any]:
+    """Closed loop: `concurrency` workers issue `requests` analyses back to back"""
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    next_request = iter(range(offset, offset + requests))
+
+    async def worker(index: int) -> None:
+        for n in next_request:
+            started = time.perf_counter()
+            try:
+                incident_id = await call(n, index)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            for stage, duration in stage_durations(incident_id).items():
+                stages.setdefault(stage, []).append(duration)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(latencies) / wall, 3) if wall else None,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def make_mock(args: argparse.Namespace) -> MockOllamaLLM:
+    latency = LatencyProfile.parse(args.latency, args.tokens_per_second, args.seed)
+    return MockOllamaLLM(model="mock-bench", latency=latency)
+
+
+async def pipeline_scenario(args: argparse.Namespace, base: Dict[str, Any], use_async: bool) -> ScenarioCall:
+    from simple_crew import SimpleIncidentAnalysisCrew
+
+    crew = SimpleIncidentAnalysisCrew(max_concurrency=args.stage_concurrency, llm=make_mock(args))
+
+    async def call(n: int, worker: int) -> str:
+        incident = unique_incident(base, n)
+        if use_async:
+            result = await crew.analyze_incident_async(incident)
+        else:
+            result = await asyncio.to_thread(crew.analyze_incident, incident)
+        return result["incident_id"]
+
+    return call
+
+
+@contextlib.asynccontextmanager
+async def api_scenario(args: argparse.Namespace, base: Dict[str, Any]):
+    """POST /analyze-incident on the in-process FastAPI app through an ASGI transport"""
+    import httpx
+    import main
+    from simple_crew import SimpleIncidentAnalysisCrew
+
+    main.incident_crew = SimpleIncidentAnalysisCrew(max_concurrency=args.stage_concurrency, llm=make_mock(args))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def call(n: int, worker: int) -> str:
+            incident = unique_incident(base, n)
+            payload = {key: json.dumps(value) for key, value in incident.items()}
+            response = await client.post("/analyze-incident", json=payload)
+            response.raise_for_status()
+            return response.json()["incident_id"]
+
+        yield call
+
+
+def crewai_llm(mock: MockOllamaLLM):
+    """The mock LLM behind CrewAI's BaseLLM interface"""
+    from crewai.llms.base_llm import BaseLLM
+
+    class MockCrewLLM(BaseLLM):
+        def call(self, messages, tools=None, callbacks=None, available_functions=None,
+                 from_task=None, from_agent=None, response_model=None) -> str:
+            if isinstance(messages, list):
+                messages = "\n".join(str(message.get("content", "")) for message in messages)
+            return f"Thought: I now know the final answer\nFinal Answer: {mock.invoke(messages)}"
+
+    return MockCrewLLM(model=mock.model)
+
+
+async def crewai_scenario(args: argparse.Namespace, base: Dict[str, Any], workers: int) -> ScenarioCall:
+    from crew import IncidentAnalysisCrew
+
+    # Agents are stateful, so each worker gets its own crew
+    llm = crewai_llm(make_mock(args))
+    crews = [IncidentAnalysisCrew(llm=llm) for _ in range(workers)]
+
+    async def call(n: int, worker: int) -> str:
+        result = await asyncio.to_thread(crews[worker].analyze_incident, unique_incident(base, n))
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result["incident_id"]
+
+    return call
+
+
+async def run_scenario(name: str, args: argparse.Namespace, base: Dict[str, Any]) -> Dict[str, Any]:
+    levels = []
+    offset = 0
+    async with contextlib.AsyncExitStack() as stack:
+        if name == "crewai":
+            # CrewAI's verbose panels would drown the report
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            call = await crewai_scenario(args, base, max(args.concurrency))
+        elif name == "api":
+            call = await stack.enter_async_context(api_scenario(args, base))
+        else:
+            call = await pipeline_scenario(args, base, use_async=name == "pipeline")
+
+        for _ in range(args.warmup):
+            await call(offset, 0)
+            offset += 1
+        for concurrency in args.concurrency:
+            levels.append(await run_level(call, concurrency, args.requests, offset))
+            offset += args.requests
+    return {"levels": levels, "peak_rss_mb": peak_rss_mb()}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per scenario and concurrency: p50/p95/p99 and requests/s against the baseline run"""
+    rows = []
+    for name, scenario in results["scenarios"].items():
+        base_levels = {
+            level["concurrency"]: level
+            for level in baseline.get("scenarios", {}).get(name, {}).get("levels", [])
+        }
+        for level in scenario.get("levels", []):
+            before = base_levels.get(level["concurrency"])
+            if before is None:
+                continue
+            metrics = [(f"latency_{key}_ms", before["latency_ms"][key], level["latency_ms"][key], False)
+                       for key in ("p50", "p95", "p99")]
+            metrics.append(("requests_per_second", before["requests_per_second"], level["requests_per_second"], True))
+            for metric, old, new, higher_is_better in metrics:
+                if not old or new is None:
+                    continue
+                change = (new - old) / old * 100
+                rows.append({
+                    "scenario": name,
+                    "concurrency": level["concurrency"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change_pct": round(change, 1),
+                    "regression_pct": round(-change if higher_is_better else change, 1)
+                })
+    return rows
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    for name, scenario in results["scenarios"].items():
+        if "skipped" in scenario:
+            print(f"\n{name}: skipped ({scenario['skipped']})")
+            continue
+        print(f"\n{name}  (peak RSS {scenario['peak_rss_mb']} MB)")
+        print(f"  {'conc':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+        for level in scenario["levels"]:
+            latency = level["latency_ms"]
+            print(f"  {level['concurrency']:>4} {level['requests_per_second']:>8} {latency['p50']!s:>9} "
+                  f"{latency['p95']!s:>9} {latency['p99']!s:>9} {level['errors']:>6}")
+        stages = scenario["levels"][-1]["stages_ms"]
+        if stages:
+            print(f"  stages at concurrency {scenario['levels'][-1]['concurrency']} (p50 / p95 ms): " + ", ".join(
+                f"{stage} {values['p50']}/{values['p95']}" for stage, values in stages.items()
+            ))
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print("\nAgainst baseline (positive regression = worse):")
+    for row in rows:
+        print(f"  {row['scenario']:<14} c={row['concurrency']:<3} {row['metric']:<20} "
+              f"{row['baseline']:>10} -> {row['current']:>10}  regression {row['regression_pct']:+.1f}%")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark incident analysis against a latency-injected mock LLM")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="Analyses per concurrency level")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured analyses before each scenario")
+    parser.add_argument("--latency", default="lognormal:50,0.5",
+                        help="Mock time to first token: fixed:MS, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0,
+                        help="Mock generation rate (0 = instant after the first token)")
+    parser.add_argument("--stage-concurrency", type=int, default=4, help="Stages in flight per analysis")
+    parser.add_argument("--seed", type=int, default=7, help="Latency sampling seed")
+    parser.add_argument("--output", help="Results JSON path (default: .cache/benchmarks/benchmark-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="Exit non-zero when any compared metric regresses by more than this percentage")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    return args
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    base = get_sample_incident_data()
+    scenarios: Dict[str, Any] = {}
+    for name in args.scenarios:
+        print(f"Running {name} ...", flush=True)
+        try:
+            scenarios[name] = await run_scenario(name, args, base)
+        except ImportError as e:
+            scenarios[name] = {"skipped": f"missing dependency: {e.name or e}"}
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "latency": args.latency,
+                "tokens_per_second": args.tokens_per_second,
+                "stage_concurrency": args.stage_concurrency,
+                "seed": args.seed
+            }
+        },
+        "scenarios": scenarios
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            rows = compare(results, json.load(handle))
+        results["comparison"] = {"baseline": args.baseline, "rows": rows}
+        print_comparison(rows)
+        if args.max_regression is not None and any(row["regression_pct"] > args.max_regression for row in rows):
+            print(f"\nRegression above {args.max_regression}% against {args.baseline}")
+            exit_code = 1
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(results, handle, indent=2)
+    print(f"\nResults written to {output}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
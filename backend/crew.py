@@ -3,49 +3,124 @@ CrewAI Crew Configuration for SRE Incident Commander
 Orchestrates the multi-agent incident analysis workflow
 """
 
+import importlib
 import json
-from typing import Dict, Any
-from crewai import Crew, Process
-
-# Import agents
-from agents.alert_triage_agent import create_alert_triage_agent
-from agents.log_analysis_agent import create_log_analysis_agent
-from agents.metrics_analysis_agent import create_metrics_analysis_agent
-from agents.knowledge_base_agent import create_knowledge_base_agent
-from agents.root_cause_agent import create_root_cause_agent
-from agents.action_recommendation_agent import create_action_recommendation_agent
-from agents.post_incident_agent import create_post_incident_agent
-
-# Import tasks
-from tasks.incident_tasks import (
-    create_alert_triage_task,
-    create_log_analysis_task,
-    create_metrics_analysis_task,
-    create_knowledge_base_task,
-    create_root_cause_task,
-    create_action_recommendation_task,
-    create_post_incident_task
-)
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
 
 # Import mock data
 from mock_data_loader import load_past_incidents
+from knowledge_index import find_similar_incidents
+from tracing import record_sequential_span, span, trace_analysis
+
+
+# Agent attribute -> (module, factory); modules (and crewai) are imported on first use
+AGENT_FACTORIES = {
+    "alert_triage_agent": ("agents.alert_triage_agent", "create_alert_triage_agent"),
+    "log_analysis_agent": ("agents.log_analysis_agent", "create_log_analysis_agent"),
+    "metrics_analysis_agent": ("agents.metrics_analysis_agent", "create_metrics_analysis_agent"),
+    "knowledge_base_agent": ("agents.knowledge_base_agent", "create_knowledge_base_agent"),
+    "root_cause_agent": ("agents.root_cause_agent", "create_root_cause_agent"),
+    "action_recommendation_agent": ("agents.action_recommendation_agent", "create_action_recommendation_agent"),
+    "post_incident_agent": ("agents.post_incident_agent", "create_post_incident_agent"),
+}
+
+
+def record_task_span(output) -> None:
+    """CrewAI task_callback: one span per task under the current kickoff span"""
+    record_sequential_span(
+        f"task.{getattr(output, 'agent', 'unknown')}",
+        output_chars=len(str(getattr(output, "raw", "") or ""))
+    )
+
+
+def _lazy_agent(name: str) -> property:
+    """Property that builds the agent on first access and memoizes it"""
+    return property(lambda self: self._get_agent(name), doc=f"Lazily constructed {name}")
 
 
 class IncidentAnalysisCrew:
     """Main crew for incident analysis"""
     
-    def __init__(self):
-        # Initialize agents
-        self.alert_triage_agent = create_alert_triage_agent()
-        self.log_analysis_agent = create_log_analysis_agent()
-        self.metrics_analysis_agent = create_metrics_analysis_agent()
-        self.knowledge_base_agent = create_knowledge_base_agent()
-        self.root_cause_agent = create_root_cause_agent()
-        self.action_recommendation_agent = create_action_recommendation_agent()
-        self.post_incident_agent = create_post_incident_agent()
-        
-        # Load historical data
-        self.past_incidents = load_past_incidents()
+    alert_triage_agent = _lazy_agent("alert_triage_agent")
+    log_analysis_agent = _lazy_agent("log_analysis_agent")
+    metrics_analysis_agent = _lazy_agent("metrics_analysis_agent")
+    knowledge_base_agent = _lazy_agent("knowledge_base_agent")
+    root_cause_agent = _lazy_agent("root_cause_agent")
+    action_recommendation_agent = _lazy_agent("action_recommendation_agent")
+    post_incident_agent = _lazy_agent("post_incident_agent")
+    
+    def __init__(self, llm=None, kb_top_k: int = 3):
+        # Nothing heavy happens here: agents, the LLM handle and crewai are all
+        # created on first use so pods can start serving immediately
+        self._llm = llm
+        self.kb_top_k = kb_top_k
+        self._agents: Dict[str, Any] = {}
+        self._past_incidents: Optional[list] = None
+        self._lock = threading.RLock()
+        self._timings: Dict[str, Any] = {"imports": {}, "agents": {}, "llm_seconds": None}
+    
+    def _import(self, module_name: str):
+        """Import a module, recording how long the first import took"""
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self._timings["imports"].setdefault(module_name, round(time.perf_counter() - started, 4))
+        return module
+    
+    @property
+    def llm(self):
+        """One LLM handle shared by all agents"""
+        with self._lock:
+            if self._llm is None:
+                from llm_config import get_llm
+                started = time.perf_counter()
+                self._llm = get_llm()
+                self._timings["llm_seconds"] = round(time.perf_counter() - started, 4)
+            return self._llm
+    
+    def _get_agent(self, name: str):
+        with self._lock:
+            agent = self._agents.get(name)
+            if agent is None:
+                module_name, factory_name = AGENT_FACTORIES[name]
+                self._import("crewai")
+                factory = getattr(self._import(module_name), factory_name)
+                llm = self.llm
+                started = time.perf_counter()
+                agent = factory(llm=llm)
+                self._timings["agents"][name] = round(time.perf_counter() - started, 4)
+                self._agents[name] = agent
+            return agent
+    
+    @property
+    def past_incidents(self) -> list:
+        """Historical incidents, loaded on first use"""
+        if self._past_incidents is None:
+            self._past_incidents = load_past_incidents()
+        return self._past_incidents
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """Eagerly build every agent (e.g. from a readiness hook) and return the startup report"""
+        for name in AGENT_FACTORIES:
+            self._get_agent(name)
+        return self.startup_report()
+    
+    def startup_report(self) -> Dict[str, Any]:
+        """Import and per-agent construction times recorded so far, in seconds"""
+        imports = dict(self._timings["imports"])
+        agents = dict(self._timings["agents"])
+        return {
+            "imports": imports,
+            "agents": agents,
+            "llm_seconds": self._timings["llm_seconds"],
+            "agents_built": len(agents),
+            "agents_total": len(AGENT_FACTORIES),
+            "total_seconds": round(
+                sum(imports.values()) + sum(agents.values()) + (self._timings["llm_seconds"] or 0), 4
+            )
+        }
     
     def analyze_incident(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -58,53 +133,68 @@ class IncidentAnalysisCrew:
             Complete incident analysis results
         """
         
-        # Create tasks with incident data
-        tasks = [
-            create_alert_triage_task(self.alert_triage_agent, incident_data),
-            create_log_analysis_task(self.log_analysis_agent, incident_data),
-            create_metrics_analysis_task(self.metrics_analysis_agent, incident_data),
-            create_knowledge_base_task(self.knowledge_base_agent, self.past_incidents),
-            create_root_cause_task(self.root_cause_agent),
-            create_action_recommendation_task(self.action_recommendation_agent),
-            create_post_incident_task(self.post_incident_agent)
-        ]
-        
-        # Create crew with sequential process
-        crew = Crew(
-            agents=[
-                self.alert_triage_agent,
-                self.log_analysis_agent,
-                self.metrics_analysis_agent,
-                self.knowledge_base_agent,
-                self.root_cause_agent,
-                self.action_recommendation_agent,
-                self.post_incident_agent
-            ],
-            tasks=tasks,
-            process=Process.sequential,
-            verbose=True
-        )
-        
-        # Execute the crew workflow
-        try:
-            result = crew.kickoff()
+        incident_id = f"INC-{uuid.uuid4().hex[:12]}"
+        with trace_analysis(incident_id, "crewai.analyze_incident") as root:
+            with span("build_tasks"):
+                crewai = self._import("crewai")
+                tasks_module = self._import("tasks.incident_tasks")
+                
+                # Create tasks with incident data
+                tasks = [
+                    tasks_module.create_alert_triage_task(self.alert_triage_agent, incident_data),
+                    tasks_module.create_log_analysis_task(self.log_analysis_agent, incident_data),
+                    tasks_module.create_metrics_analysis_task(self.metrics_analysis_agent, incident_data),
+                    tasks_module.create_knowledge_base_task(
+                        self.knowledge_base_agent,
+                        find_similar_incidents(incident_data, k=self.kb_top_k)
+                    ),
+                    tasks_module.create_root_cause_task(self.root_cause_agent),
+                    tasks_module.create_action_recommendation_task(self.action_recommendation_agent),
+                    tasks_module.create_post_incident_task(self.post_incident_agent)
+                ]
             
-            # Parse and structure the final result
-            return self._structure_results(result, tasks)
+            # Create crew with sequential process
+            crew = crewai.Crew(
+                agents=[
+                    self.alert_triage_agent,
+                    self.log_analysis_agent,
+                    self.metrics_analysis_agent,
+                    self.knowledge_base_agent,
+                    self.root_cause_agent,
+                    self.action_recommendation_agent,
+                    self.post_incident_agent
+                ],
+                tasks=tasks,
+                process=crewai.Process.sequential,
+                verbose=True,
+                task_callback=record_task_span
+            )
             
-        except Exception as e:
-            return {
-                "error": f"Incident analysis failed: {str(e)}",
-                "status": "failed"
-            }
+            # Execute the crew workflow
+            try:
+                with span("kickoff"):
+                    result = crew.kickoff()
+                
+                # Parse and structure the final result
+                with span("structure_results"):
+                    return self._structure_results(result, tasks, incident_id)
+                
+            except Exception as e:
+                root.set_attribute("error", str(e))
+                return {
+                    "error": f"Incident analysis failed: {str(e)}",
+                    "status": "failed",
+                    "incident_id": incident_id
+                }
     
-    def _structure_results(self, crew_result: str, tasks: list) -> Dict[str, Any]:
+    def _structure_results(self, crew_result: str, tasks: list, incident_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Structure the crew results into a comprehensive incident report
         
         Args:
             crew_result: Raw result from crew execution
             tasks: List of executed tasks
+            incident_id: ID the analysis was traced under
             
         Returns:
             Structured incident analysis results
@@ -119,7 +209,7 @@ class IncidentAnalysisCrew:
             
             return {
                 "status": "completed",
-                "incident_id": f"INC-{hash(str(crew_result)) % 10000:04d}",
+                "incident_id": incident_id or f"INC-{hash(str(crew_result)) % 10000:04d}",
                 "analysis_timestamp": "2024-12-22T10:35:00Z",
                 "severity": "P1",
                 "summary": {
@@ -0,0 +1,484 @@
+"""
+Durable Incident Queue
+SQLite (WAL) job queue with leases so analyses survive restarts and scale across processes
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from job_queue import (
+    INCIDENT_QUEUE_DEPTH, INCIDENT_RETENTION_SECONDS, INCIDENT_WORKERS, Job, JobConflictError, QueueFullError
+)
+
+
+DEFAULT_QUEUE_DB = os.path.join(os.path.dirname(__file__), ".cache", "incident_queue.sqlite3")
+
+# INCIDENT_QUEUE_DB enables the durable queue for the API (unset keeps the in-memory one)
+INCIDENT_QUEUE_DB = os.environ.get("INCIDENT_QUEUE_DB", "")
+INCIDENT_VISIBILITY_TIMEOUT_SECONDS = float(os.environ.get("INCIDENT_VISIBILITY_TIMEOUT_SECONDS", "300"))
+INCIDENT_MAX_ATTEMPTS = int(os.environ.get("INCIDENT_MAX_ATTEMPTS", "3"))
+# How often the API re-reads the queue depth (other processes enqueue and claim too)
+INCIDENT_DEPTH_REFRESH_SECONDS = float(os.environ.get("INCIDENT_DEPTH_REFRESH_SECONDS", "1"))
+
+
+class SQLiteJobQueue:
+    """
+    Lease-based job queue in a local SQLite database
+
+    A worker claims a job by taking a lease on it for visibility_timeout_seconds
+    and extends the lease with heartbeat() while it runs. A job whose lease
+    expires (worker crashed, process restarted) becomes claimable again. Each
+    claim counts as an attempt; failures are retried with exponential backoff
+    until max_attempts, then the job is marked failed. Completion and stage
+    updates are fenced on the lease owner, so a worker that lost its lease
+    cannot overwrite the newer attempt.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUEUE_DB,
+        visibility_timeout_seconds: float = INCIDENT_VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts: int = INCIDENT_MAX_ATTEMPTS,
+        retry_backoff_seconds: float = 2.0
+    ):
+        self.path = path
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode; claims use explicit BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS incident_jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                revision INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                queued_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS incident_jobs_claim ON incident_jobs (status, available_at);
+            CREATE TABLE IF NOT EXISTS incident_job_stages (
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL,
+                memo TEXT,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (job_id, stage)
+            );
+            """
+        )
+
+    def enqueue(self, job_id: str, incident_data: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO incident_jobs (id, payload, status, available_at, created_at, queued_at)
+                VALUES (?, ?, 'queued', ?, ?, ?)
+                """,
+                (job_id, json.dumps(incident_data), now, now, now)
+            )
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """Lease the oldest available job (queued, or running with an expired lease)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that used their last attempt are not retried
+                self._conn.execute(
+                    """
+                    UPDATE incident_jobs SET status = 'failed', finished_at = ?, lease_owner = NULL,
+                        error = 'Lease expired on the final attempt (worker lost)'
+                    WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                    """,
+                    (now, now, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    """
+                    SELECT id FROM incident_jobs
+                    WHERE (status = 'queued' AND available_at <= ?)
+                       OR (status = 'running' AND lease_expires_at < ?)
+                    ORDER BY available_at, created_at LIMIT 1
+                    """,
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    """
+                    UPDATE incident_jobs SET status = 'running', attempts = attempts + 1,
+                        lease_owner = ?, lease_expires_at = ?, started_at = ?
+                    WHERE id = ?
+                    """,
+                    (worker_id, now + self.visibility_timeout_seconds, now, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0], include_payload=True)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease; False when it was lost to another worker"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE incident_jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + self.visibility_timeout_seconds, job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def record_stage(self, job_id: str, worker_id: str, stage: str, result: Dict[str, Any]) -> None:
+        """Store a stage result for the job's current revision (and as memo for the next one)"""
+        memo = {key: value for key, value in result.items() if key != "reused"}
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO incident_job_stages (job_id, stage, revision, data, memo, completed_at)
+                SELECT ?, ?, revision, ?, ?, ? FROM incident_jobs
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (job_id, stage, json.dumps(result["data"], default=str), json.dumps(memo, default=str),
+                 time.time(), job_id, worker_id)
+            )
+
+    def load_memo(self, job_id: str) -> Dict[str, Any]:
+        """Latest stored result per stage, for reuse by SimpleIncidentAnalysisCrew"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, memo FROM incident_job_stages WHERE job_id = ? AND memo IS NOT NULL", (job_id,)
+            ).fetchall()
+        return {stage: json.loads(memo) for stage, memo in rows}
+
+    def update(self, job_id: str, changes: Dict[str, Any]) -> Optional[Job]:
+        """Merge new incident data into a finished job and queue its next revision"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT payload, status FROM incident_jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                payload, status = row
+                if status not in ("completed", "failed"):
+                    self._conn.execute("COMMIT")
+                    raise JobConflictError(f"Incident {job_id} is {status}; update it once it has finished")
+                self._conn.execute(
+                    """
+                    UPDATE incident_jobs SET payload = ?, status = 'queued', revision = revision + 1,
+                        attempts = 0, available_at = ?, queued_at = ?, started_at = NULL,
+                        finished_at = NULL, result = NULL, error = NULL, lease_owner = NULL
+                    WHERE id = ?
+                    """,
+                    (json.dumps({**json.loads(payload), **changes}), now, now, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE incident_jobs SET status = 'completed', result = ?, finished_at = ?,
+                    lease_owner = NULL, error = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (json.dumps(result, default=str), time.time(), job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Schedule a retry with backoff, or mark failed once attempts are used up"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE incident_jobs SET status = 'queued', lease_owner = NULL, lease_expires_at = NULL,
+                    available_at = ? + ? * (1 << (attempts - 1)), error = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running' AND attempts < ?
+                """,
+                (now, self.retry_backoff_seconds, error, job_id, worker_id, self.max_attempts)
+            )
+            if cursor.rowcount == 0:
+                cursor = self._conn.execute(
+                    """
+                    UPDATE incident_jobs SET status = 'failed', lease_owner = NULL, finished_at = ?, error = ?
+                    WHERE id = ? AND lease_owner = ? AND status = 'running'
+                    """,
+                    (now, error, job_id, worker_id)
+                )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str, include_payload: bool = False) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT id, payload, status, attempts, revision, created_at, queued_at, started_at,
+                    finished_at, result, error
+                FROM incident_jobs WHERE id = ?
+                """,
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Only stages recorded for the current revision count as completed
+            stages = self._conn.execute(
+                """
+                SELECT stage, data FROM incident_job_stages
+                WHERE job_id = ? AND revision = ? ORDER BY completed_at
+                """,
+                (job_id, row[4])
+            ).fetchall()
+        (job_id, payload, status, attempts, revision, created_at, queued_at, started_at,
+         finished_at, result, error) = row
+        return Job(
+            id=job_id,
+            incident_data=json.loads(payload) if include_payload else {},
+            status=status,
+            created_at=created_at,
+            queued_at=queued_at,
+            started_at=started_at,
+            finished_at=finished_at,
+            stage_results={stage: json.loads(data) for stage, data in stages},
+            result=json.loads(result) if result else None,
+            error=error,
+            attempts=attempts,
+            revision=revision
+        )
+
+    def depth(self) -> int:
+        """Jobs waiting to be claimed"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM incident_jobs WHERE status = 'queued'").fetchone()[0]
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """Delete finished jobs (and their stages) older than the retention period"""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            self._conn.execute(
+                """
+                DELETE FROM incident_job_stages WHERE job_id IN (
+                    SELECT id FROM incident_jobs WHERE status IN ('completed', 'failed') AND finished_at < ?
+                )
+                """,
+                (cutoff,)
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM incident_jobs WHERE status IN ('completed', 'failed') AND finished_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM incident_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+async def run_claimed_job(queue: SQLiteJobQueue, crew, job: Job, worker_id: str) -> None:
+    """Run one claimed job, keeping its lease alive and recording stages as they finish"""
+    async def keep_lease():
+        while True:
+            await asyncio.sleep(queue.visibility_timeout_seconds / 3)
+            if not await asyncio.to_thread(queue.heartbeat, job.id, worker_id):
+                return
+
+    # Stage writes wait on the database lock, so they run off the event loop
+    stage_writes: List[asyncio.Task] = []
+
+    def on_stage_complete(stage: str, result: Dict[str, Any]) -> None:
+        stage_writes.append(asyncio.create_task(
+            asyncio.to_thread(queue.record_stage, job.id, worker_id, stage, result)
+        ))
+
+    memo = await asyncio.to_thread(queue.load_memo, job.id)
+    heartbeat = asyncio.create_task(keep_lease())
+    try:
+        result = await crew.analyze_incident_async(
+            job.incident_data,
+            on_stage_complete=on_stage_complete,
+            incident_id=job.id,
+            memo=memo
+        )
+    except asyncio.CancelledError:
+        # Leave the lease to expire so another worker picks the job up
+        raise
+    except Exception as e:
+        # Stages are only recorded while the job is running; finish writing them first
+        await asyncio.gather(*stage_writes, return_exceptions=True)
+        await asyncio.to_thread(queue.fail, job.id, worker_id, str(e))
+    else:
+        await asyncio.gather(*stage_writes, return_exceptions=True)
+        await asyncio.to_thread(queue.complete, job.id, worker_id, result)
+    finally:
+        heartbeat.cancel()
+
+
+async def worker_loop(
+    queue: SQLiteJobQueue,
+    crew,
+    worker_id: str,
+    stop: asyncio.Event,
+    poll_interval_seconds: float = 0.5
+) -> None:
+    """Claim and run jobs until stop is set"""
+    while not stop.is_set():
+        job = await asyncio.to_thread(queue.claim, worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_claimed_job(queue, crew, job, worker_id)
+
+
+class DurableJobManager:
+    """
+    JobManager counterpart backed by SQLiteJobQueue
+
+    Submissions are persisted before the API answers. The API process runs
+    `workers` in-process consumers (0 leaves all work to incident_worker.py
+    processes); any number of processes can share the same database file.
+    Every database call runs in a thread, since it can wait up to the busy
+    timeout on another process's lock; queue_depth is a cached value.
+    """
+
+    def __init__(
+        self,
+        crew,
+        path: str = DEFAULT_QUEUE_DB,
+        workers: int = INCIDENT_WORKERS,
+        max_queue_depth: int = INCIDENT_QUEUE_DEPTH,
+        retention_seconds: float = INCIDENT_RETENTION_SECONDS
+    ):
+        self.crew = crew
+        self.queue = SQLiteJobQueue(path)
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self.worker_id = new_worker_id()
+        self._stop = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._counters = {"submitted": 0, "updated": 0, "rejected": 0}
+        self._last_purge = 0.0
+        self._depth = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._stop = asyncio.Event()
+        await self._read_depth()
+        self._tasks = [
+            asyncio.create_task(
+                worker_loop(self.queue, self.crew, f"{self.worker_id}-{index}", self._stop),
+                name=f"incident-worker-{index}"
+            )
+            for index in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._track_depth(), name="incident-queue-depth"))
+
+    async def _read_depth(self) -> int:
+        self._depth = await asyncio.to_thread(self.queue.depth)
+        return self._depth
+
+    async def _track_depth(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await self._read_depth()
+            except sqlite3.Error as e:
+                print(f"Incident queue depth not refreshed: {e}")
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=INCIDENT_DEPTH_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self) -> None:
+        """Stop claiming; jobs still running are re-claimed after their lease expires"""
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, incident_data: Dict[str, Any]) -> Job:
+        # Writes can wait on other processes' locks; keep them off the event loop
+        if time.monotonic() - self._last_purge > 60:
+            self._last_purge = time.monotonic()
+            await asyncio.to_thread(self.queue.purge_finished, self.retention_seconds)
+        if await self._read_depth() >= self.max_queue_depth:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Incident queue is full ({self.max_queue_depth} waiting)")
+        job_id = self.crew.new_incident_id()
+        await asyncio.to_thread(self.queue.enqueue, job_id, incident_data)
+        self._depth += 1
+        self._counters["submitted"] += 1
+        return await asyncio.to_thread(self.queue.get, job_id)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.queue.get, job_id)
+
+    async def update(self, job_id: str, changes: Dict[str, Any]) -> Optional[Job]:
+        if await self._read_depth() >= self.max_queue_depth:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Incident queue is full ({self.max_queue_depth} waiting)")
+        job = await asyncio.to_thread(self.queue.update, job_id, changes)
+        if job is not None:
+            self._depth += 1
+            self._counters["updated"] += 1
+        return job
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting as of the last read (at most INCIDENT_DEPTH_REFRESH_SECONDS old)"""
+        return self._depth
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = await asyncio.to_thread(self.queue.counts)
+        self._depth = counts.get("queued", 0)
+        return {
+            "backend": "sqlite",
+            "path": self.queue.path,
+            "workers": self.workers,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": self._depth,
+            "jobs_by_status": counts,
+            **self._counters
+        }
@@ -0,0 +1,55 @@
+"""
+Incident Payload Utilities
+Parses and normalizes alert/logs/metrics payloads submitted to the API
+"""
+
+import ast
+import hashlib
+import json
+from typing import Any, Dict
+
+# Python-literal parsing is only attempted on payloads up to this size
+MAX_LITERAL_EVAL_CHARS = 1_000_000
+
+
+def parse_structured(value: Any) -> Any:
+    """
+    Best-effort conversion of a payload field into structured data
+
+    Accepts already-structured values, JSON text, and Python literal reprs
+    (as produced by str() on the sample data). Anything else is returned as-is.
+    """
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if not text or text[0] not in "[{":
+        return value
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    if len(text) <= MAX_LITERAL_EVAL_CHARS:
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    return value
+
+
+def _normalize_field(value: Any) -> Any:
+    value = parse_structured(value)
+    if isinstance(value, str):
+        lines = value.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip()
+    return value
+
+
+def normalize_incident(incident_data: Dict[str, Any]) -> str:
+    """Canonical JSON form of an incident payload (key order and whitespace independent)"""
+    normalized = {key: _normalize_field(value) for key, value in incident_data.items()}
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def incident_fingerprint(incident_data: Dict[str, Any]) -> str:
+    """Stable hash of the normalized incident payload"""
+    return hashlib.sha256(normalize_incident(incident_data).encode("utf-8")).hexdigest()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Incident Worker
+Runs analyses from the durable SQLite queue; start as many processes as the LLM backend can serve
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from durable_queue import DEFAULT_QUEUE_DB, INCIDENT_QUEUE_DB, SQLiteJobQueue, new_worker_id, worker_loop
+
+
+async def serve(db_path: str, concurrency: int, poll_interval: float) -> None:
+    """One worker process: `concurrency` claim loops sharing one crew"""
+    from simple_crew import SimpleIncidentAnalysisCrew
+    from llm_health import health_monitor
+
+    health_monitor.ensure_started()
+    crew = SimpleIncidentAnalysisCrew()
+    queue = SQLiteJobQueue(db_path)
+    worker_id = new_worker_id()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    print(f"Incident worker {worker_id} polling {db_path} with concurrency {concurrency}")
+    await asyncio.gather(*(
+        worker_loop(queue, crew, f"{worker_id}-{index}", stop, poll_interval)
+        for index in range(concurrency)
+    ))
+    health_monitor.stop()
+    queue.close()
+
+
+def run_process(db_path: str, concurrency: int, poll_interval: float) -> None:
+    asyncio.run(serve(db_path, concurrency, poll_interval))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run incident analyses from the durable queue")
+    parser.add_argument("--db", default=INCIDENT_QUEUE_DB or DEFAULT_QUEUE_DB, help="Queue database path")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent analyses per process")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between polls of an empty queue")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_process(args.db, args.concurrency, args.poll_interval)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_process, args=(args.db, args.concurrency, args.poll_interval))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Instrumentation
+Prometheus-format counters, gauges and histograms for stages, LLM calls and queues
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+# Seconds; covers cache hits (sub-millisecond) through slow local models
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Samples keyed by label values; label values are passed positionally in labelnames order"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: Any) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is a bisect and three additions under a lock"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: Any) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, with +Inf last; then sum and count
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter read at scrape time from state another component already keeps"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Iterable[str],
+        collect: Callable[[], Dict[Tuple, float]]
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Metric {self.name} not collected: {e}")
+            values = {}
+        return self._header() + [
+            f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; registering a name again replaces the previous metric"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Any],
+        kind: str = "gauge",
+        labelnames: Iterable[str] = ()
+    ) -> CallbackMetric:
+        """
+        Register a metric computed at scrape time
+
+        collect returns a number for an unlabelled metric or a dict mapping
+        label-value tuples to numbers.
+        """
+        def collect_samples() -> Dict[Tuple, float]:
+            value = collect()
+            return value if isinstance(value, dict) else {(): value}
+
+        return self.register(CallbackMetric(name, documentation, kind, labelnames, collect_samples))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "sre_stage_duration_seconds",
+    "Stage wall time by outcome (llm, reused, precomputed)",
+    ("stage", "outcome")
+))
+LLM_REQUEST_SECONDS = registry.register(Histogram(
+    "sre_llm_request_duration_seconds",
+    "LLM backend call latency (streams until the last chunk)",
+    ("backend", "outcome")
+))
+LLM_IN_FLIGHT = registry.register(Gauge(
+    "sre_llm_requests_in_flight", "LLM backend calls currently running", ("backend",)
+))
+ANALYSES_IN_FLIGHT = registry.register(Gauge(
+    "sre_analyses_in_flight", "Incident analyses currently running"
+))
+PROMPT_CHARS = registry.register(Counter(
+    "sre_llm_prompt_chars_total", "Characters in LLM stage prompts (cache hits included)", ("stage",)
+))
+PROMPT_TOKENS = registry.register(Counter(
+    "sre_llm_prompt_tokens_total", "Estimated tokens in LLM stage prompts (cache hits included)", ("stage",)
+))
+RESPONSE_CHARS = registry.register(Counter(
+    "sre_llm_response_chars_total", "Characters in LLM stage responses (cache hits included)", ("stage",)
+))
+RESPONSE_TOKENS = registry.register(Counter(
+    "sre_llm_response_tokens_total", "Estimated tokens in LLM stage responses (cache hits included)", ("stage",)
+))
+JSON_EXTRACTIONS = registry.register(Counter(
+    "sre_json_extraction_total",
+    "Stage responses by how their JSON was recovered (direct, code_block, embedded, none)",
+    ("stage", "method")
+))
+LLM_EARLY_STOPS = registry.register(Counter(
+    "sre_llm_streams_stopped_early_total",
+    "Stage generations cancelled as soon as a complete JSON object had streamed", ("stage",)
+))
+LLM_STREAM_FALLBACKS = registry.register(Counter(
+    "sre_llm_stream_fallbacks_total",
+    "Stage streams that broke part-way and were re-run without streaming", ("stage",)
+))
+STAGE_VALIDATIONS = registry.register(Counter(
+    "sre_stage_output_validation_total",
+    "Stage outputs checked against their schema (valid, no_json, schema_mismatch)", ("stage", "result")
+))
+STAGE_REPAIRS = registry.register(Counter(
+    "sre_stage_output_repairs_total",
+    "Repair retries after invalid stage output, by outcome (succeeded, failed)", ("stage", "outcome")
+))
+
+
+@contextmanager
+def in_flight(gauge: Gauge, *labels: Any) -> Iterator[None]:
+    """Hold a gauge up by one for the duration of the block"""
+    gauge.inc(*labels)
+    try:
+        yield
+    finally:
+        gauge.dec(*labels)
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text format"""
+    return registry.render()
+
+
+def cache_event_totals(cache_stats: Callable[[], Dict[str, Any]]) -> Callable[[], Dict[Tuple, float]]:
+    """Collector for CachedLLM per-stage counters as (stage, result) samples"""
+    def collect() -> Dict[Tuple, float]:
+        by_stage = cache_stats().get("by_stage", {})
+        return {
+            (stage, result): count
+            for stage, counters in by_stage.items()
+            for result, count in counters.items()
+        }
+    return collect
+
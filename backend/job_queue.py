@@ -0,0 +1,225 @@
+"""
+Incident Job Queue
+Bounded asyncio worker pool that runs analyses in the background for submit-and-poll clients
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+INCIDENT_WORKERS = int(os.environ.get("INCIDENT_WORKERS", "4"))
+INCIDENT_QUEUE_DEPTH = int(os.environ.get("INCIDENT_QUEUE_DEPTH", "100"))
+INCIDENT_RETENTION_SECONDS = float(os.environ.get("INCIDENT_RETENTION_SECONDS", "3600"))
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its depth limit"""
+
+
+class JobConflictError(Exception):
+    """Raised when a job cannot be updated because it is still queued or running"""
+
+
+@dataclass
+class Job:
+    """One queued or running incident analysis"""
+    id: str
+    incident_data: Dict[str, Any]
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    queued_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage_results: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    revision: int = 0
+    # Stage results with fingerprints, reused by the next revision when unchanged
+    memo: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        """Queue wait and execution time in milliseconds, reported separately"""
+        now = time.time()
+        queue_wait = ((self.started_at or now) - (self.queued_at or self.created_at)) * 1000
+        execution = None
+        if self.started_at is not None:
+            execution = ((self.finished_at or now) - self.started_at) * 1000
+        return {
+            "queue_wait_ms": round(queue_wait, 2),
+            "execution_ms": round(execution, 2) if execution is not None else None
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "incident_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            **self.timings(),
+            "completed_stages": list(self.stage_results),
+            "stages": self.stage_results,
+            "analysis": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "revision": self.revision,
+            "reused_stages": (self.result or {}).get("reused_stages", [])
+        }
+
+
+class JobManager:
+    """
+    Runs incident analyses from a bounded queue on a fixed pool of worker tasks
+
+    submit() never waits: when max_queue_depth jobs are already waiting it raises
+    QueueFullError so the API can shed load with a 429. Finished jobs (with their
+    inputs and stage memo, for update()) are kept for retention_seconds so
+    clients can poll for the result.
+    """
+
+    def __init__(
+        self,
+        crew,
+        workers: int = INCIDENT_WORKERS,
+        max_queue_depth: int = INCIDENT_QUEUE_DEPTH,
+        retention_seconds: float = INCIDENT_RETENTION_SECONDS
+    ):
+        self.crew = crew
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.retention_seconds = retention_seconds
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._counters = {"submitted": 0, "updated": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"incident-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are abandoned"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, incident_data: Dict[str, Any]) -> Job:
+        """Enqueue an analysis and return its job immediately (async to match DurableJobManager)"""
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been called")
+        self._prune()
+        job = Job(id=self.crew.new_incident_id(), incident_data=incident_data)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Incident queue is full ({self.max_queue_depth} waiting)")
+        self.jobs[job.id] = job
+        self._counters["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def update(self, job_id: str, changes: Dict[str, Any]) -> Optional[Job]:
+        """
+        Apply new incident data to a finished job and queue a re-analysis
+
+        Stages whose prompts are unaffected by the changes are reused from the
+        previous revision. Returns None for an unknown job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.finished:
+            raise JobConflictError(f"Incident {job_id} is {job.status}; update it once it has finished")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"Incident queue is full ({self.max_queue_depth} waiting)")
+        job.incident_data = {**job.incident_data, **changes}
+        job.revision += 1
+        job.status = "queued"
+        job.queued_at = time.time()
+        job.started_at = job.finished_at = None
+        job.stage_results = {}
+        job.result = job.error = None
+        self.jobs.move_to_end(job_id)
+        self._counters["updated"] += 1
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.attempts += 1
+
+        def on_stage_complete(stage: str, result: Dict[str, Any]) -> None:
+            job.stage_results[stage] = result["data"]
+
+        try:
+            job.result = await self.crew.analyze_incident_async(
+                job.incident_data,
+                on_stage_complete=on_stage_complete,
+                incident_id=job.id,
+                memo=job.memo
+            )
+            job.status = "completed"
+            self._counters["completed"] += 1
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled during shutdown"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self._counters["failed"] += 1
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        """Forget finished jobs past their retention period (oldest first)"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in list(self.jobs):
+            job = self.jobs[job_id]
+            if job.finished and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return {
+            "workers": self.workers,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": self.queue_depth,
+            "running": running,
+            "tracked_jobs": len(self.jobs),
+            **self._counters
+        }
@@ -0,0 +1,154 @@
+"""
+Streaming JSON Extraction
+Finds the first complete top-level JSON object in LLM output as it streams, so generation can stop there
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+
+# Characters that change state inside an object: braces outside strings, quotes and escapes inside them.
+# A backtick outside a string never occurs in JSON, so it ends a candidate that was really prose.
+_OBJECT_TOKENS = re.compile(r'[{}"`]')
+_STRING_TOKENS = re.compile(r'["\\]')
+_FENCE = re.compile(r"```[a-zA-Z]*\s*$")
+_FENCE_OPEN = re.compile(r"```[a-zA-Z]*[ \t]*\n")
+
+
+class StreamingJSONExtractor:
+    """
+    Incremental scanner for the first valid top-level JSON object in a text stream
+
+    feed() each chunk as it arrives; it returns the parsed object as soon as its
+    closing brace is seen, after which `complete` is true and the rest of the
+    generation can be cancelled. Narrative before the object, markdown fences
+    and trailing prose are skipped. Only brace and string state is tracked, so
+    each character is examined once, with no regex backtracking.
+
+    Only top-level objects count: a candidate that fails to parse is skipped as
+    a whole, and one that never closes yields nothing, so an object nested
+    inside invalid or truncated output is never mistaken for the answer. The
+    exception is a markdown fence: JSON cannot contain one outside a string, so
+    an unclosed "{" in prose before a fenced block does not hide the block.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.result: Optional[Dict[str, Any]] = None
+        # Where the object starts and ends in buffer, once found
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self.result is not None
+
+    @property
+    def method(self) -> Optional[str]:
+        """
+        How the object was found: "direct" (the text starts with it), "code_block"
+        (inside a markdown fence) or "embedded" (after narrative text)
+
+        Whatever follows the object is ignored; a stopped stream never has it all.
+        """
+        if self.result is None:
+            return None
+        before = self.buffer[:self.start]
+        if not before.strip():
+            return "direct"
+        if _FENCE.search(before):
+            return "code_block"
+        return "embedded"
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Add streamed text; returns the object once complete (and keeps returning it)"""
+        self.buffer += chunk
+        if self.result is None:
+            self._scan()
+        return self.result
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """
+        End of stream: the object, or None if the last candidate never closed
+
+        A stray "{" in prose with unbalanced quotes can swallow a fenced block
+        whole; retry from the first fence opened after it.
+        """
+        while self.result is None and self.start is not None:
+            fence = _FENCE_OPEN.search(self.buffer, self.start)
+            if fence is None:
+                break
+            self._reset_candidate()
+            self._pos = fence.end()
+            self._scan()
+        return self.result
+
+    def _reset_candidate(self) -> None:
+        # Scanning resumes at _pos: past the rejected candidate's closing brace or backtick
+        self.start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _scan(self) -> None:
+        text = self.buffer
+        while self._pos < len(text):
+            if self.start is None:
+                index = text.find("{", self._pos)
+                if index < 0:
+                    self._pos = len(text)
+                    return
+                self.start = index
+                self._depth = 1
+                self._pos = index + 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    self._pos += 1
+                    continue
+                match = _STRING_TOKENS.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    return
+                self._pos = match.end()
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _OBJECT_TOKENS.search(text, self._pos)
+            if match is None:
+                self._pos = len(text)
+                return
+            self._pos = match.end()
+            token = match.group()
+            if token == "`":
+                # Prose (e.g. "use {placeholder" before a fenced block); rescan from here
+                self._reset_candidate()
+            elif token == '"':
+                self._in_string = True
+            elif token == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        data = json.loads(text[self.start:self._pos])
+                    except json.JSONDecodeError:
+                        data = None
+                    if isinstance(data, dict):
+                        self.result = data
+                        self.end = self._pos
+                        return
+                    # Not JSON after all (e.g. "{placeholder}" in prose, or a trailing comma);
+                    # look for the next top-level object
+                    self._reset_candidate()
+
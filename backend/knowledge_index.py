@@ -0,0 +1,247 @@
+"""
+Knowledge Base Index
+BM25 retrieval over past incidents so only the top matches reach the KB stage prompt
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from mock_data_loader import load_past_incidents
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "with after before into over under per no not all any via".split()
+)
+
+# Field weights for the combined (BM25F-style) term frequency
+FIELD_WEIGHTS = {
+    "title": 2.0,
+    "symptoms": 1.5,
+    "root_cause": 1.5,
+    "services_affected": 1.0,
+    "resolution": 1.0,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+class IncidentIndex:
+    """
+    Inverted index over past incidents with BM25 scoring
+
+    BM25 term contributions depend only on the document, so they are precomputed
+    per posting and stored as NumPy arrays; a query is a handful of vectorized
+    scatter-adds over the postings of its most selective terms, which keeps
+    lookups in the millisecond range even for 100k incidents. Scores are
+    deterministic; ties break on index order.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_query_terms: int = 32):
+        self.k1 = k1
+        self.b = b
+        self.max_query_terms = max_query_terms
+        self.incidents: List[Dict[str, Any]] = []
+        self.postings: Dict[str, tuple] = {}
+        self.idf: Dict[str, float] = {}
+        self.by_service: Dict[str, np.ndarray] = {}
+        self.by_severity: Dict[str, np.ndarray] = {}
+
+    def build(self, incidents: Iterable[Dict[str, Any]]) -> "IncidentIndex":
+        """(Re)build the index from a list of incident records"""
+        self.incidents = list(incidents)
+        by_service: Dict[str, List[int]] = defaultdict(list)
+        by_severity: Dict[str, List[int]] = defaultdict(list)
+
+        term_freqs: List[Counter] = []
+        doc_lengths: List[float] = []
+        for doc_id, incident in enumerate(self.incidents):
+            weighted: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(_field_text(incident.get(field))):
+                    weighted[token] += weight
+            term_freqs.append(weighted)
+            doc_lengths.append(sum(weighted.values()))
+            for service in set(str(service).lower() for service in incident.get("services_affected") or []):
+                by_service[service].append(doc_id)
+            if incident.get("severity"):
+                by_severity[str(incident["severity"]).upper()].append(doc_id)
+
+        doc_count = len(self.incidents)
+        avg_length = (sum(doc_lengths) / doc_count) if doc_count else 0.0
+        raw_postings: Dict[str, tuple] = defaultdict(lambda: ([], []))
+        for doc_id, weighted in enumerate(term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * (doc_lengths[doc_id] / avg_length if avg_length else 0))
+            for term, tf in weighted.items():
+                doc_ids, impacts = raw_postings[term]
+                doc_ids.append(doc_id)
+                # Saturated tf component; multiplied by idf at query time
+                impacts.append(tf * (self.k1 + 1) / (tf + norm))
+
+        self.idf = {
+            term: math.log(1 + (doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for term, (doc_ids, _) in raw_postings.items()
+        }
+        self.postings = {
+            term: (np.asarray(doc_ids, dtype=np.int32), np.asarray(impacts, dtype=np.float64))
+            for term, (doc_ids, impacts) in raw_postings.items()
+        }
+        self.by_service = {key: np.asarray(ids, dtype=np.int32) for key, ids in by_service.items()}
+        self.by_severity = {key: np.asarray(ids, dtype=np.int32) for key, ids in by_severity.items()}
+        return self
+
+    def _mask(self, services: Optional[Iterable[str]], severities: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """Boolean mask of documents passing the service/severity filters"""
+        mask: Optional[np.ndarray] = None
+        for values, facet, normalize in ((services, self.by_service, str.lower), (severities, self.by_severity, str.upper)):
+            if not values:
+                continue
+            matching = np.zeros(len(self.incidents), dtype=bool)
+            for value in values:
+                ids = facet.get(normalize(str(value)))
+                if ids is not None:
+                    matching[ids] = True
+            mask = matching if mask is None else mask & matching
+        return mask
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        services: Optional[Iterable[str]] = None,
+        severities: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the top-k incidents for a free-text query
+
+        Args:
+            query: Free text (alert, log and metric text can be passed as-is)
+            k: Number of matches to return
+            services: Only incidents affecting any of these services
+            severities: Only incidents with one of these severities (P0-P3)
+
+        Returns:
+            List of {"incident", "score", "similarity_score"} sorted by relevance
+        """
+        if not self.incidents or k <= 0:
+            return []
+
+        query_terms = set(term for term in tokenize(query) if term in self.postings)
+        # Keep the most selective terms: rare terms carry the signal, common ones cost the most
+        selected = sorted(query_terms, key=lambda term: (-self.idf[term], term))[:self.max_query_terms]
+        if not selected:
+            return []
+
+        scores = np.zeros(len(self.incidents), dtype=np.float64)
+        for term in selected:
+            doc_ids, impacts = self.postings[term]
+            scores[doc_ids] += self.idf[term] * impacts
+
+        mask = self._mask(services, severities)
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            # Partition on score, then keep every document tied with the k-th score
+            kth = np.partition(scores[candidates], candidates.size - k)[candidates.size - k]
+            candidates = candidates[scores[candidates] >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+
+        # Upper bound of the BM25 score for this query, used to normalize to [0, 1]
+        max_score = sum(self.idf[term] * (self.k1 + 1) for term in selected)
+        return [
+            {
+                "incident": self.incidents[int(doc_id)],
+                "score": round(float(scores[doc_id]), 4),
+                "similarity_score": round(float(scores[doc_id]) / max_score, 4) if max_score else 0.0
+            }
+            for doc_id in candidates[order]
+        ]
+
+    def __len__(self) -> int:
+        return len(self.incidents)
+
+
+_index: Optional[IncidentIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_incident_index() -> IncidentIndex:
+    """Process-wide index over mock_data/past_incidents.json, built on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = IncidentIndex().build(load_past_incidents())
+        return _index
+
+
+def summarize_match(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of a search hit for inclusion in a prompt"""
+    incident = match["incident"]
+    return {
+        "id": incident.get("id"),
+        "title": incident.get("title"),
+        "severity": incident.get("severity"),
+        "services_affected": incident.get("services_affected"),
+        "root_cause": incident.get("root_cause"),
+        "symptoms": incident.get("symptoms"),
+        "resolution": incident.get("resolution"),
+        "similarity_score": match["similarity_score"]
+    }
+
+
+# Cap on incident text tokenized for a query; the head of the payload carries the signal
+MAX_QUERY_CHARS = 20000
+
+
+def find_similar_incidents(incident_data: Dict[str, Any], k: int = 3) -> List[Dict[str, Any]]:
+    """
+    Top-k past incidents for an incident payload, as compact prompt-ready dicts
+
+    Restricts to incidents sharing the alerting service when one is known and
+    falls back to an unfiltered search if that yields nothing.
+    """
+    from incident_payload import parse_structured
+
+    query = " ".join(
+        str(incident_data.get(field, ""))[:MAX_QUERY_CHARS] for field in ("alert", "logs", "metrics")
+    )
+    alert = parse_structured(incident_data.get("alert"))
+    services = (str(alert["service"]),) if isinstance(alert, dict) and alert.get("service") else None
+    return [dict(match) for match in _cached_search(query, services, k)]
+
+
+@lru_cache(maxsize=256)
+def _cached_search(query: str, services: Optional[tuple], k: int) -> tuple:
+    """Memoized lookup so repeated incidents (replays, batches) search the index once"""
+    index = get_incident_index()
+    matches = index.search(query, k=k, services=services)
+    if not matches and services:
+        matches = index.search(query, k=k)
+    return tuple(summarize_match(match) for match in matches)
+
+
+def search_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters of the memoized incident lookup"""
+    info = _cached_search.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
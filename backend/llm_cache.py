@@ -0,0 +1,370 @@
+"""
+LLM Response Cache
+Two-tier content-addressed cache (in-memory LRU + on-disk SQLite) around the configured LLM
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional
+
+from instrumentation import LLM_EARLY_STOPS
+from llm_config import ainvoke_llm, astream_llm
+from llm_health import SERVED_BY
+from tracing import set_span_attribute
+
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.sqlite3")
+
+# Environment overrides; LLM_CACHE_DB="" disables the on-disk tier
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_DISK_TTL_SECONDS = float(os.environ.get("LLM_CACHE_DISK_TTL_SECONDS", "86400"))
+LLM_CACHE_DB = os.environ.get("LLM_CACHE_DB", DEFAULT_DB_PATH)
+LLM_CACHE_DISABLED_STAGES = [
+    stage.strip() for stage in os.environ.get("LLM_CACHE_DISABLED_STAGES", "").split(",") if stage.strip()
+]
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with per-entry TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteResponseCache:
+    """Persistent response cache that survives restarts"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, ttl_seconds: float = 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                stage TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if created_at + self.ttl_seconds < time.time():
+            return None
+        return response
+
+    def set(self, key: str, value: str, stage: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, stage, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, stage, value, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns the number removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLLM:
+    """
+    Caching wrapper around an LLM returned by llm_config.get_llm()
+
+    Responses are keyed on a hash of prompt, model, temperature and stage. Lookups
+    go to the in-memory LRU first, then SQLite; misses call the wrapped LLM.
+    Stages listed in disabled_stages always bypass the cache. Answers from the
+    mock fallback of a FailoverLLM are returned but never stored, so an outage
+    does not leave canned responses cached under the real model's key.
+    """
+
+    def __init__(
+        self,
+        llm,
+        enabled: bool = LLM_CACHE_ENABLED,
+        memory_size: int = LLM_CACHE_SIZE,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        db_path: Optional[str] = LLM_CACHE_DB,
+        disk_ttl_seconds: float = LLM_CACHE_DISK_TTL_SECONDS,
+        disabled_stages: Iterable[str] = LLM_CACHE_DISABLED_STAGES
+    ):
+        self.llm = llm
+        self.enabled = enabled
+        self.disabled_stages = set(disabled_stages)
+        self.memory = LRUCache(maxsize=memory_size, ttl_seconds=ttl_seconds)
+        self.disk: Optional[SQLiteResponseCache] = None
+        if enabled and db_path:
+            try:
+                self.disk = SQLiteResponseCache(db_path, ttl_seconds=disk_ttl_seconds)
+            except sqlite3.Error as e:
+                print(f"LLM disk cache unavailable ({e}), using memory cache only")
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "fallbacks_not_stored": 0
+        }
+        self._stage_counters: Dict[str, Dict[str, int]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose model, base_url, temperature, ... of the wrapped LLM
+        return getattr(self.llm, name)
+
+    def cache_key(self, prompt: str, stage: Optional[str] = None, **kwargs) -> str:
+        """Content address for a prompt on this model (and any per-call options such as format)"""
+        fields = {
+            "prompt": prompt,
+            "model": getattr(self.llm, "model", None),
+            "temperature": getattr(self.llm, "temperature", None),
+            "stage": stage
+        }
+        if kwargs:
+            fields["options"] = kwargs
+        payload = json.dumps(fields, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, counter: str, stage: Optional[str]) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+            per_stage = self._stage_counters.setdefault(
+                stage or "unknown",
+                {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "fallbacks_not_stored": 0}
+            )
+            per_stage[counter] += 1
+        set_span_attribute("cache", counter)
+
+    def _cacheable(self, stage: Optional[str]) -> bool:
+        if self.enabled and stage not in self.disabled_stages:
+            return True
+        self._count("bypassed", stage)
+        return False
+
+    def _lookup(self, key: str, stage: Optional[str]) -> Optional[str]:
+        response = self.memory.get(key)
+        if response is not None:
+            self._count("memory_hits", stage)
+            return response
+        if self.disk is not None:
+            response = self.disk.get(key)
+            if response is not None:
+                self.memory.set(key, response)
+                self._count("disk_hits", stage)
+                return response
+        self._count("misses", stage)
+        # A miss is followed by a call to the wrapped LLM; _store checks who answered it
+        SERVED_BY.set(None)
+        return None
+
+    def _store(self, key: str, response: str, stage: Optional[str]) -> None:
+        if SERVED_BY.get() == "mock":
+            self._count("fallbacks_not_stored", stage)
+            return
+        self.memory.set(key, response)
+        if self.disk is not None:
+            self.disk.set(key, response, stage)
+
+    def invoke(self, prompt: str, stage: Optional[str] = None, **kwargs) -> str:
+        """Invoke the wrapped LLM, serving repeated prompts from cache"""
+        if not self._cacheable(stage):
+            return self.llm.invoke(prompt, **kwargs)
+        key = self.cache_key(prompt, stage, **kwargs)
+        response = self._lookup(key, stage)
+        if response is None:
+            response = self.llm.invoke(prompt, **kwargs)
+            self._store(key, response, stage)
+        return response
+
+    async def ainvoke(self, prompt: str, stage: Optional[str] = None, **kwargs) -> str:
+        """Async variant of invoke"""
+        if not self._cacheable(stage):
+            return await ainvoke_llm(self.llm, prompt, **kwargs)
+        key = self.cache_key(prompt, stage, **kwargs)
+        response = self._lookup(key, stage)
+        if response is None:
+            response = await ainvoke_llm(self.llm, prompt, **kwargs)
+            self._store(key, response, stage)
+        return response
+
+    def stream(
+        self,
+        prompt: str,
+        stage: Optional[str] = None,
+        until: Optional[Callable[[str], bool]] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Stream from the wrapped LLM; a cache hit is yielded as a single chunk
+
+        until is called with each chunk; once it returns true the generation is
+        cancelled and what arrived so far is what gets cached. Other keyword
+        arguments (e.g. format) are passed to the wrapped LLM and keyed on.
+        """
+        if not self._cacheable(stage):
+            with closing(self.llm.stream(prompt, **kwargs)) as stream:
+                for chunk in stream:
+                    stop = until is not None and until(chunk)
+                    yield chunk
+                    if stop:
+                        self._stopped_early(stage)
+                        return
+            return
+        key = self.cache_key(prompt, stage, **kwargs)
+        response = self._lookup(key, stage)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        with closing(self.llm.stream(prompt, **kwargs)) as stream:
+            for chunk in stream:
+                chunks.append(chunk)
+                stop = until is not None and until(chunk)
+                yield chunk
+                if stop:
+                    self._stopped_early(stage)
+                    break
+        self._store(key, "".join(chunks), stage)
+
+    async def astream(
+        self,
+        prompt: str,
+        stage: Optional[str] = None,
+        until: Optional[Callable[[str], bool]] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Async variant of stream"""
+        if not self._cacheable(stage):
+            async with aclosing(astream_llm(self.llm, prompt, **kwargs)) as stream:
+                async for chunk in stream:
+                    stop = until is not None and until(chunk)
+                    yield chunk
+                    if stop:
+                        self._stopped_early(stage)
+                        return
+            return
+        key = self.cache_key(prompt, stage, **kwargs)
+        response = self._lookup(key, stage)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        async with aclosing(astream_llm(self.llm, prompt, **kwargs)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                stop = until is not None and until(chunk)
+                yield chunk
+                if stop:
+                    self._stopped_early(stage)
+                    break
+        self._store(key, "".join(chunks), stage)
+
+    @staticmethod
+    def _stopped_early(stage: Optional[str]) -> None:
+        LLM_EARLY_STOPS.inc(stage or "unknown")
+        set_span_attribute("stopped_early", True)
+
+    def discard(self, prompt: str, stage: Optional[str] = None, **kwargs) -> None:
+        """Forget a cached response (e.g. one that failed validation) so it is not served again"""
+        key = self.cache_key(prompt, stage, **kwargs)
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        """Drop the in-memory tier (the SQLite tier expires by TTL)"""
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes for cache sizing"""
+        with self._lock:
+            counters = dict(self._counters)
+            by_stage = {stage: dict(values) for stage, values in self._stage_counters.items()}
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "memory_max_size": self.memory.maxsize,
+            "memory_evictions": self.memory.evictions,
+            "memory_expirations": self.memory.expirations,
+            "disk_size": len(self.disk) if self.disk is not None else None,
+            "disabled_stages": sorted(self.disabled_stages),
+            "by_stage": by_stage
+        }
@@ -3,16 +3,41 @@ LLM Configuration for Ollama Integration
 Provides centralized configuration for all CrewAI agents using Ollama
 """
 
+import asyncio
 import os
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from functools import partial
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Tuple
 
 # Set environment to prevent OpenAI requirement
 os.environ["OPENAI_API_KEY"] = "not-needed"
 
-try:
+if TYPE_CHECKING:
     from langchain_ollama import OllamaLLM
-except ImportError:
-    from langchain_community.llms import Ollama as OllamaLLM
+
+_ollama_stack: Optional[SimpleNamespace] = None
+
+
+def _load_ollama_stack() -> SimpleNamespace:
+    """Import langchain/ollama on first use; they dominate cold-start time"""
+    global _ollama_stack
+    if _ollama_stack is None:
+        try:
+            from langchain_ollama import OllamaLLM
+        except ImportError:
+            from langchain_community.llms import Ollama as OllamaLLM
+        
+        try:
+            import httpx
+            from ollama import AsyncClient, Client
+        except ImportError:
+            httpx = AsyncClient = Client = None
+        
+        _ollama_stack = SimpleNamespace(OllamaLLM=OllamaLLM, httpx=httpx, Client=Client, AsyncClient=AsyncClient)
+    return _ollama_stack
 
 
 class OllamaConfig:
@@ -23,39 +48,229 @@ class OllamaConfig:
         model: str = "llama3.2",
         base_url: str = "http://localhost:11434",
         temperature: float = 0.2,
-        timeout: int = 120
+        timeout: int = 120,
+        connect_timeout: float = 5.0,
+        max_connections: int = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "32")),
+        max_keepalive_connections: int = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "16")),
+        keepalive_expiry: float = 60.0
     ):
         self.model = model
         self.base_url = base_url
         self.temperature = temperature
         self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+    
+    def get_llm(self) -> "OllamaLLM":
+        """Get the shared, connection-pooled Ollama LLM handle for this configuration"""
+        return llm_registry.get(self)
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of shared LLM handles
+    
+    Handles are memoized per (base_url, model, temperature), and every handle for
+    the same base URL shares one keep-alive HTTP connection pool, so agents and
+    crews reuse warm connections instead of paying TCP/TLS setup per stage.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handles: Dict[Tuple[str, str, float], Any] = {}
+        self._pools: Dict[str, Tuple[Any, Any]] = {}
+    
+    def _client_kwargs(self, config: OllamaConfig) -> Dict[str, Any]:
+        httpx = _load_ollama_stack().httpx
+        if httpx is None:
+            return {}
+        return {
+            "timeout": httpx.Timeout(config.timeout, connect=config.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry
+            )
+        }
     
-    def get_llm(self) -> OllamaLLM:
-        """Get configured Ollama LLM instance"""
-        return OllamaLLM(
-            model=self.model,
-            base_url=self.base_url,
-            temperature=self.temperature,
-            timeout=self.timeout
-        )
+    def _pool(self, config: OllamaConfig) -> Optional[Tuple[Any, Any]]:
+        """Shared (sync, async) Ollama clients for the config's base URL"""
+        stack = _load_ollama_stack()
+        if stack.httpx is None:
+            return None
+        pool = self._pools.get(config.base_url)
+        if pool is None:
+            client_kwargs = self._client_kwargs(config)
+            pool = (
+                stack.Client(host=config.base_url, **client_kwargs),
+                stack.AsyncClient(host=config.base_url, **client_kwargs)
+            )
+            self._pools[config.base_url] = pool
+        return pool
+    
+    def get(self, config: OllamaConfig) -> "OllamaLLM":
+        """Get (or create) the shared LLM handle for a configuration"""
+        key = (config.base_url, config.model, config.temperature)
+        with self._lock:
+            llm = self._handles.get(key)
+            if llm is not None:
+                return llm
+            
+            llm = _load_ollama_stack().OllamaLLM(
+                model=config.model,
+                base_url=config.base_url,
+                temperature=config.temperature,
+                client_kwargs=self._client_kwargs(config)
+            )
+            pool = self._pool(config)
+            if pool is not None and hasattr(llm, "_client"):
+                llm._client, llm._async_client = pool
+            self._handles[key] = llm
+            return llm
+    
+    def stats(self) -> Dict[str, Any]:
+        """Registered handles and connection pools"""
+        with self._lock:
+            return {
+                "handles": [
+                    {"base_url": base_url, "model": model, "temperature": temperature}
+                    for base_url, model, temperature in self._handles
+                ],
+                "pools": sorted(self._pools)
+            }
+    
+    async def aclose(self) -> None:
+        """Close all pooled connections (called on application shutdown)"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+            self._handles.clear()
+        for sync_client, async_client in pools:
+            sync_client._client.close()
+            await async_client._client.aclose()
 
 
-# Global configuration instance
+# Global configuration and client registry
 ollama_config = OllamaConfig()
+llm_registry = LLMClientRegistry()
 
 
 def get_llm():
-    """Get the configured LLM instance for agents"""
+    """
+    Get the configured LLM instance for agents
+    
+    Reads the background health monitor's cached state instead of probing, so
+    this returns instantly: the first healthy backend, or the mock LLM.
+    """
+    from llm_health import health_monitor
+    health_monitor.ensure_started()
+    backend = health_monitor.select()
+    if backend is not None:
+        return backend.llm
+    
+    errors = "; ".join(b.last_error for b in health_monitor.backends if b.last_error)
+    print(f"Ollama not available ({errors or 'circuit open'}), using mock LLM for demo")
+    from mock_llm import get_shared_mock_llm
+    return get_shared_mock_llm()
+
+
+_failover_llm = None
+
+
+def get_failover_llm():
+    """
+    Get the process-wide failover LLM handle
+    
+    Each call is routed to the first backend whose circuit is closed, falling
+    back to a secondary backend and finally the mock LLM without waiting on a
+    timeout against a backend already known to be down.
+    """
+    global _failover_llm
+    if _failover_llm is None:
+        from llm_health import FailoverLLM, health_monitor
+        from mock_llm import get_shared_mock_llm
+        health_monitor.ensure_started()
+        _failover_llm = FailoverLLM(health_monitor, get_shared_mock_llm())
+    return _failover_llm
+
+
+# Executor for LLM backends that only expose a blocking invoke()
+LLM_EXECUTOR_WORKERS = int(os.environ.get("LLM_EXECUTOR_WORKERS", "64"))
+_llm_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """Get the shared executor used to run blocking LLM calls off the event loop"""
+    global _llm_executor
+    if _llm_executor is None:
+        _llm_executor = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="llm")
+    return _llm_executor
+
+
+def shutdown_llm_executor() -> None:
+    """Shut down the shared LLM executor (called on application shutdown)"""
+    global _llm_executor
+    if _llm_executor is not None:
+        _llm_executor.shutdown(wait=False, cancel_futures=True)
+        _llm_executor = None
+
+
+async def ainvoke_llm(llm, prompt: str, **kwargs) -> str:
+    """Invoke the LLM without blocking the event loop"""
+    if hasattr(llm, "ainvoke"):
+        return await llm.ainvoke(prompt, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_llm_executor(), partial(llm.invoke, prompt, **kwargs))
+
+
+async def astream_llm(llm, prompt: str, **kwargs) -> AsyncIterator[str]:
+    """
+    Stream response chunks from the LLM without blocking the event loop
+
+    Closing this generator early (the caller has what it needs) closes the
+    underlying stream too, so the backend stops generating.
+    """
+    if hasattr(llm, "astream"):
+        async with aclosing(llm.astream(prompt, **kwargs)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+        return
+    
+    if not hasattr(llm, "stream"):
+        yield await ainvoke_llm(llm, prompt, **kwargs)
+        return
+    
+    # Drain the blocking generator on the executor and hand chunks back to the loop
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+    
+    def produce():
+        try:
+            for chunk in llm.stream(prompt, **kwargs):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+    
+    loop.run_in_executor(get_llm_executor(), produce)
     try:
-        # Try to use real Ollama first
-        llm = ollama_config.get_llm()
-        # Test if Ollama is accessible
-        llm.invoke("Hello")
-        return llm
-    except Exception as e:
-        print(f"Ollama not available ({e}), using mock LLM for demo")
-        from mock_llm import get_mock_llm
-        return get_mock_llm()
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stopped early: the producer closes the blocking stream at its next chunk
+        stop.set()
 
 
 def set_model(model_name: str) -> None:
@@ -64,37 +279,41 @@ def set_model(model_name: str) -> None:
 
 
 def health_check() -> dict:
-    """Check if Ollama is accessible"""
+    """Report LLM health from the monitor's cached state (no generation is run)"""
+    from llm_health import health_monitor
+    health_monitor.ensure_started()
+    backend = health_monitor.select()
+    status = health_monitor.status()
+    
+    if backend is not None:
+        return {
+            "status": "healthy",
+            "model": backend.config.model,
+            "base_url": backend.config.base_url,
+            "latency_ms": backend.latency_ms,
+            "llm_type": "ollama",
+            "backend": backend.name,
+            "backends": status["backends"]
+        }
+    
+    # Fall back to mock LLM
     try:
-        # Try real Ollama first
-        real_llm = ollama_config.get_llm()
-        response = real_llm.invoke("Hello")
+        from mock_llm import get_shared_mock_llm
+        mock_llm = get_shared_mock_llm()
         return {
             "status": "healthy",
+            "model": mock_llm.model,
+            "base_url": mock_llm.base_url,
+            "llm_type": "mock",
+            "note": "Using mock LLM for demo - Ollama not available",
+            "backends": status["backends"]
+        }
+    except Exception as mock_e:
+        return {
+            "status": "unhealthy",
             "model": ollama_config.model,
             "base_url": ollama_config.base_url,
-            "response_length": len(response),
-            "llm_type": "ollama"
+            "error": "; ".join(b["last_error"] or "" for b in status["backends"]),
+            "mock_error": str(mock_e),
+            "backends": status["backends"]
         }
-    except Exception as e:
-        # Fall back to mock LLM
-        try:
-            from mock_llm import get_mock_llm
-            mock_llm = get_mock_llm()
-            response = mock_llm.invoke("Hello")
-            return {
-                "status": "healthy",
-                "model": "mock-llama3",
-                "base_url": "mock://localhost",
-                "response_length": len(response),
-                "llm_type": "mock",
-                "note": "Using mock LLM for demo - Ollama not available"
-            }
-        except Exception as mock_e:
-            return {
-                "status": "unhealthy",
-                "model": ollama_config.model,
-                "base_url": ollama_config.base_url,
-                "error": str(e),
-                "mock_error": str(mock_e)
-            }
\ No newline at end of file
@@ -0,0 +1,350 @@
+"""
+LLM Health Monitor
+Probes LLM backends in the background and routes calls around unhealthy ones
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from contextlib import aclosing, closing
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from llm_config import OllamaConfig, ainvoke_llm, astream_llm
+from instrumentation import LLM_IN_FLIGHT, LLM_REQUEST_SECONDS, in_flight
+from tracing import set_span_attribute
+
+
+# Backend that answered the latest FailoverLLM call in this context ("mock" after failing over to it)
+SERVED_BY: ContextVar[Optional[str]] = ContextVar("llm_served_by", default=None)
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open circuit breaker
+
+    After failure_threshold consecutive failures the circuit opens and calls are
+    skipped without touching the backend. Once reset_timeout_seconds have passed
+    it goes half-open: requests are let through again, the next success closes
+    the circuit and the next failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                # Re-arm the timer on every failure while open or half-open
+                self.opened_at = time.monotonic()
+
+    def trip(self) -> None:
+        """Open the circuit immediately (e.g. a health probe failed)"""
+        with self._lock:
+            self.consecutive_failures = max(self.consecutive_failures, self.failure_threshold)
+            self.opened_at = time.monotonic()
+
+
+class LLMBackend:
+    """An LLM backend with its cached health state and circuit breaker"""
+
+    def __init__(self, name: str, config: OllamaConfig, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.config = config
+        self.breaker = breaker or CircuitBreaker()
+        self.healthy: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self.model_available: Optional[bool] = None
+
+    @property
+    def llm(self):
+        return self.config.get_llm()
+
+    @property
+    def available(self) -> bool:
+        return self.healthy is not False and self.breaker.allow_request()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.config.model,
+            "base_url": self.config.base_url,
+            "healthy": self.healthy,
+            "model_available": self.model_available,
+            "latency_ms": self.latency_ms,
+            "last_error": self.last_error,
+            "last_checked": self.last_checked,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures
+        }
+
+
+class LLMHealthMonitor:
+    """Background prober that keeps an instantly readable health snapshot per backend"""
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        interval_seconds: float = 15.0,
+        probe_timeout_seconds: float = 2.0
+    ):
+        self.backends = backends
+        self.interval_seconds = interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started_lock = threading.Lock()
+
+    def probe(self, backend: LLMBackend) -> None:
+        """Cheap liveness probe: list models instead of running a generation"""
+        started = time.perf_counter()
+        try:
+            url = backend.config.base_url.rstrip("/") + "/api/tags"
+            with urllib.request.urlopen(url, timeout=self.probe_timeout_seconds) as response:
+                tags = json.loads(response.read().decode("utf-8"))
+            names = {model.get("name", "") for model in tags.get("models", [])}
+            wanted = backend.config.model
+            backend.model_available = any(name == wanted or name.split(":")[0] == wanted for name in names)
+            if not backend.model_available:
+                raise RuntimeError(f"model '{wanted}' is not available on {backend.config.base_url}")
+            backend.healthy = True
+            backend.last_error = None
+            backend.breaker.record_success()
+        except Exception as e:
+            backend.healthy = False
+            backend.last_error = str(e)
+            backend.breaker.trip()
+        finally:
+            backend.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            backend.last_checked = time.time()
+
+    def probe_all(self) -> None:
+        for backend in self.backends:
+            self.probe(backend)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.probe_all()
+
+    def ensure_started(self) -> None:
+        """Run the first probe synchronously, then keep probing in a daemon thread"""
+        with self._started_lock:
+            if self._thread is not None:
+                return
+            self.probe_all()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="llm-health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._started_lock:
+            self._stop.set()
+            self._thread = None
+
+    def select(self) -> Optional[LLMBackend]:
+        """First backend that is healthy with a closed (or half-open) circuit"""
+        for backend in self.backends:
+            if backend.available:
+                return backend
+        return None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "backends": [backend.snapshot() for backend in self.backends]
+        }
+
+
+class FailoverLLM:
+    """
+    LLM handle that routes each call to the first available backend
+
+    Backends with an open circuit are skipped without a network round trip; call
+    failures count against the backend's breaker and the call moves on to the
+    next backend, finally the mock LLM. The backend that answered is left in
+    SERVED_BY, since model and temperature describe the selected backend, not
+    necessarily the one that produced the response.
+    """
+
+    def __init__(self, monitor: LLMHealthMonitor, fallback):
+        self.monitor = monitor
+        self.fallback = fallback
+
+    @property
+    def model(self) -> str:
+        backend = self.monitor.select()
+        return backend.config.model if backend else self.fallback.model
+
+    @property
+    def temperature(self) -> float:
+        backend = self.monitor.select()
+        return backend.config.temperature if backend else self.fallback.temperature
+
+    @property
+    def base_url(self) -> str:
+        backend = self.monitor.select()
+        return backend.config.base_url if backend else self.fallback.base_url
+
+    def _candidates(self) -> List[LLMBackend]:
+        return [backend for backend in self.monitor.backends if backend.available]
+
+    @staticmethod
+    def _observe(name: str, outcome: str, started: float) -> None:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, name, outcome)
+        set_span_attribute("backend", name)
+        if outcome == "success":
+            SERVED_BY.set(name)
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        for backend in self._candidates():
+            started = time.perf_counter()
+            try:
+                with in_flight(LLM_IN_FLIGHT, backend.name):
+                    response = backend.llm.invoke(prompt, **kwargs)
+            except Exception:
+                self._observe(backend.name, "error", started)
+                backend.breaker.record_failure()
+                continue
+            self._observe(backend.name, "success", started)
+            backend.breaker.record_success()
+            return response
+        started = time.perf_counter()
+        with in_flight(LLM_IN_FLIGHT, "mock"):
+            response = self.fallback.invoke(prompt)
+        self._observe("mock", "success", started)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> str:
+        for backend in self._candidates():
+            started = time.perf_counter()
+            try:
+                with in_flight(LLM_IN_FLIGHT, backend.name):
+                    response = await ainvoke_llm(backend.llm, prompt, **kwargs)
+            except Exception:
+                self._observe(backend.name, "error", started)
+                backend.breaker.record_failure()
+                continue
+            self._observe(backend.name, "success", started)
+            backend.breaker.record_success()
+            return response
+        started = time.perf_counter()
+        with in_flight(LLM_IN_FLIGHT, "mock"):
+            response = await ainvoke_llm(self.fallback, prompt)
+        self._observe("mock", "success", started)
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        for backend in self._candidates():
+            started = False
+            began = time.perf_counter()
+            try:
+                with in_flight(LLM_IN_FLIGHT, backend.name):
+                    with closing(backend.llm.stream(prompt, **kwargs)) as chunks:
+                        for chunk in chunks:
+                            started = True
+                            yield chunk
+            except GeneratorExit:
+                # The caller stopped reading (e.g. its JSON was complete); the backend did its job
+                self._observe(backend.name, "success", began)
+                backend.breaker.record_success()
+                raise
+            except Exception:
+                self._observe(backend.name, "error", began)
+                backend.breaker.record_failure()
+                if started:
+                    raise
+                continue
+            self._observe(backend.name, "success", began)
+            backend.breaker.record_success()
+            return
+        began = time.perf_counter()
+        try:
+            with in_flight(LLM_IN_FLIGHT, "mock"):
+                yield from self.fallback.stream(prompt)
+        finally:
+            self._observe("mock", "success", began)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        for backend in self._candidates():
+            started = False
+            began = time.perf_counter()
+            try:
+                with in_flight(LLM_IN_FLIGHT, backend.name):
+                    async with aclosing(astream_llm(backend.llm, prompt, **kwargs)) as chunks:
+                        async for chunk in chunks:
+                            started = True
+                            yield chunk
+            except GeneratorExit:
+                self._observe(backend.name, "success", began)
+                backend.breaker.record_success()
+                raise
+            except Exception:
+                self._observe(backend.name, "error", began)
+                backend.breaker.record_failure()
+                if started:
+                    raise
+                continue
+            self._observe(backend.name, "success", began)
+            backend.breaker.record_success()
+            return
+        began = time.perf_counter()
+        try:
+            with in_flight(LLM_IN_FLIGHT, "mock"):
+                async with aclosing(astream_llm(self.fallback, prompt)) as chunks:
+                    async for chunk in chunks:
+                        yield chunk
+        finally:
+            self._observe("mock", "success", began)
+
+
+def _build_backends() -> List[LLMBackend]:
+    from llm_config import ollama_config
+
+    backends = [LLMBackend("primary", ollama_config)]
+    secondary_url = os.environ.get("OLLAMA_SECONDARY_URL")
+    if secondary_url:
+        secondary = OllamaConfig(
+            model=os.environ.get("OLLAMA_SECONDARY_MODEL", ollama_config.model),
+            base_url=secondary_url,
+            temperature=ollama_config.temperature,
+            timeout=ollama_config.timeout
+        )
+        backends.append(LLMBackend("secondary", secondary))
+    return backends
+
+
+# Global monitor: primary Ollama plus an optional secondary from OLLAMA_SECONDARY_URL
+health_monitor = LLMHealthMonitor(
+    _build_backends(),
+    interval_seconds=float(os.environ.get("LLM_HEALTH_INTERVAL_SECONDS", "15")),
+    probe_timeout_seconds=float(os.environ.get("LLM_HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+)
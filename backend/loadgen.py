@@ -0,0 +1,571 @@
+#!/usr/bin/env python
+"""
+Load Generator
+Closed- and open-loop HTTP load against the API with HDR latency histograms and a JSON report
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from mock_data_loader import load_alerts, load_logs, load_metrics
+
+
+TARGETS = ("analyze", "sample", "health", "stream", "job", "batch")
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "loadgen")
+REPORT_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9, 99.99)
+
+
+class HdrHistogram:
+    """
+    Log-linear histogram of integer values with a fixed relative precision
+
+    Values are bucketed like HdrHistogram: each power-of-two range is split
+    into sub-buckets fine enough that any recorded value is reported within
+    10^-significant_figures of its true value, over the whole trackable range.
+    Recording is O(1) and memory is fixed (a few thousand counters).
+    """
+
+    def __init__(self, highest_trackable: int = 3_600_000_000, significant_figures: int = 3):
+        self.highest_trackable = highest_trackable
+        self.significant_figures = significant_figures
+        self.sub_bucket_count_magnitude = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count >> 1
+        bucket_count = max(1, highest_trackable.bit_length() - self.sub_bucket_count_magnitude + 1)
+        self.counts = [0] * ((bucket_count + 1) * self.sub_bucket_half_count)
+        self.total_count = 0
+        self.total_sum = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self.sub_bucket_count_magnitude)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + (sub_bucket - self.sub_bucket_half_count)
+
+    def _value_at(self, index: int) -> int:
+        """Lowest value that lands in counts[index]"""
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            bucket, sub_bucket = 0, sub_bucket - self.sub_bucket_half_count
+        return sub_bucket << bucket
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket = max(0, (index >> self.sub_bucket_half_count_magnitude) - 1)
+        return self._value_at(index) + (1 << bucket) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        value = min(max(0, int(value)), self.highest_trackable)
+        self.counts[self._index(value)] += count
+        self.total_count += count
+        self.total_sum += value * count
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+
+    def record_corrected(self, value: int, expected_interval: int, count: int = 1) -> None:
+        """
+        Record a value and back-fill the samples a stalled closed-loop client never sent
+
+        While one request took `value`, a client that issues one request every
+        expected_interval would have had requests waiting value - interval,
+        value - 2 * interval, ... at the same stall.
+        """
+        self.record(value, count)
+        if expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing, count)
+            missing -= expected_interval
+
+    def corrected_copy(self, expected_interval: int) -> "HdrHistogram":
+        """This histogram with coordinated-omission correction applied afterwards"""
+        corrected = HdrHistogram(self.highest_trackable, self.significant_figures)
+        for value, count in self.buckets():
+            corrected.record_corrected(value, expected_interval, count)
+        # Buckets replay their lowest value; keep the exact extremes
+        corrected.min_value = self.min_value
+        corrected.max_value = self.max_value
+        return corrected
+
+    def merge(self, other: "HdrHistogram") -> None:
+        """Add another histogram's samples (same precision and range)"""
+        if (other.significant_figures, other.highest_trackable) != (self.significant_figures, self.highest_trackable):
+            raise ValueError("Can only merge histograms with the same precision and range")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_sum += other.total_sum
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+
+    def buckets(self) -> Iterator[Tuple[int, int]]:
+        """(representative value, count) for every non-empty bucket, ascending"""
+        for index, count in enumerate(self.counts):
+            if count:
+                yield self._value_at(index), count
+
+    def percentile(self, percentile: float) -> int:
+        if not self.total_count:
+            return 0
+        wanted = max(1, math.ceil(percentile / 100 * self.total_count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min(self._highest_equivalent(index), self.max_value)
+        return self.max_value
+
+    @property
+    def mean(self) -> float:
+        return self.total_sum / self.total_count if self.total_count else 0.0
+
+    def to_dict(self, unit_divisor: float = 1000.0) -> Dict[str, Any]:
+        """Summary in milliseconds (values are recorded in microseconds) plus the raw buckets"""
+        def ms(value: float) -> float:
+            return round(value / unit_divisor, 3)
+
+        return {
+            "count": self.total_count,
+            "min_ms": ms(self.min_value or 0),
+            "mean_ms": ms(self.mean),
+            "max_ms": ms(self.max_value),
+            "percentiles_ms": {f"p{p:g}": ms(self.percentile(p)) for p in REPORT_PERCENTILES},
+            "significant_figures": self.significant_figures,
+            # [value_us, count] pairs; enough to merge runs or re-plot the distribution
+            "buckets_us": [[value, count] for value, count in self.buckets()]
+        }
+
+
+class PayloadGenerator:
+    """Incident bodies built from mock_data, one alert per incident with its service's logs and metrics"""
+
+    def __init__(self, seed: Optional[int] = None, duplicate_ratio: float = 0.0):
+        self.alerts = load_alerts()
+        self.logs = load_logs()
+        self.metrics = load_metrics()
+        self.duplicate_ratio = duplicate_ratio
+        self._random = random.Random(seed)
+
+    def incident(self, n: int) -> Dict[str, Any]:
+        """Incident n, made unique unless drawn as a duplicate (which exercises coalescing and caches)"""
+        alert = dict(self.alerts[n % len(self.alerts)]) if self.alerts else {"message": "No alert data"}
+        service = alert.get("service")
+        logs = [entry for entry in self.logs if entry.get("service") == service] or list(self.logs)
+        metrics = next((entry for entry in self.metrics if entry.get("service") == service),
+                       self.metrics[0] if self.metrics else {})
+        if self._random.random() >= self.duplicate_ratio:
+            alert["id"] = f"load-{n}"
+            alert["message"] = f"{alert.get('message', '')} (load request {n})"
+            logs = logs + [{
+                "timestamp": alert.get("timestamp", "2024-12-22T10:30:00Z"), "level": "INFO",
+                "service": "loadgen", "message": f"load request {n}"
+            }]
+        return {"alert": alert, "logs": logs, "metrics": metrics}
+
+    def request_body(self, n: int) -> Dict[str, str]:
+        """IncidentRequest body: the API takes each field as text"""
+        return {key: json.dumps(value) for key, value in self.incident(n).items()}
+
+
+class TargetResult:
+    """Outcome counters and histograms for one target at one load level"""
+
+    def __init__(self):
+        self.latency = HdrHistogram()
+        self.service_time = HdrHistogram()
+        self.first_event = HdrHistogram()
+        self.ok = 0
+        self.errors: Dict[str, int] = {}
+        self.timeline: Dict[int, List[int]] = {}
+
+    def record(self, second: int, latency_us: int, service_us: int, error: Optional[str],
+               first_event_us: Optional[int] = None) -> None:
+        slot = self.timeline.setdefault(second, [0, 0])
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+            slot[1] += 1
+            return
+        self.ok += 1
+        slot[0] += 1
+        self.latency.record(latency_us)
+        self.service_time.record(service_us)
+        if first_event_us is not None:
+            self.first_event.record(first_event_us)
+
+    def to_dict(self, wall_seconds: float, expected_interval_us: Optional[int]) -> Dict[str, Any]:
+        total = self.ok + sum(self.errors.values())
+        result = {
+            "requests": total,
+            "ok": self.ok,
+            "errors": dict(sorted(self.errors.items())),
+            "error_rate": round(1 - self.ok / total, 4) if total else 0.0,
+            "throughput_rps": round(self.ok / wall_seconds, 3) if wall_seconds else None,
+            "latency": self.latency.to_dict(),
+            "service_time": self.service_time.to_dict(),
+            # [second, ok, errors] from the start of the level
+            "timeline": [[second, ok, errors] for second, (ok, errors) in sorted(self.timeline.items())]
+        }
+        if expected_interval_us:
+            result["latency_corrected"] = self.latency.corrected_copy(expected_interval_us).to_dict()
+            result["expected_interval_ms"] = round(expected_interval_us / 1000, 3)
+        if self.first_event.total_count:
+            result["first_event"] = self.first_event.to_dict()
+        return result
+
+
+# A request issues one call and returns (error label or None, microseconds to the first streamed event)
+Request = Callable[[int], Awaitable[Tuple[Optional[str], Optional[int]]]]
+
+
+def build_requests(client, payloads: PayloadGenerator, args: argparse.Namespace) -> Dict[str, Request]:
+    """One coroutine per target; errors are labelled by HTTP status or exception type"""
+
+    def status_error(response) -> Optional[str]:
+        return None if response.status_code < 400 else f"http_{response.status_code}"
+
+    async def analyze(n: int):
+        response = await client.post("/analyze-incident", json=payloads.request_body(n))
+        return status_error(response), None
+
+    async def sample(n: int):
+        response = await client.post("/analyze-sample")
+        return status_error(response), None
+
+    async def health(n: int):
+        response = await client.get("/health")
+        return status_error(response), None
+
+    async def stream(n: int):
+        started = time.perf_counter()
+        first_event = None
+        event = None
+        async with client.stream("POST", "/analyze-incident/stream", json=payloads.request_body(n)) as response:
+            if response.status_code >= 400:
+                return f"http_{response.status_code}", None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "stage" and first_event is None:
+                        first_event = int((time.perf_counter() - started) * 1e6)
+                    if event in ("complete", "error"):
+                        break
+        if event != "complete":
+            return "stream_error" if event == "error" else "stream_incomplete", first_event
+        return None, first_event
+
+    async def job(n: int):
+        response = await client.post("/incidents", json=payloads.request_body(n))
+        if response.status_code >= 400:
+            return f"http_{response.status_code}", None
+        incident_id = response.json()["incident_id"]
+        while True:
+            await asyncio.sleep(args.poll_interval)
+            response = await client.get(f"/incidents/{incident_id}")
+            if response.status_code >= 400:
+                return f"http_{response.status_code}", None
+            status = response.json().get("status")
+            if status in ("completed", "failed"):
+                return (None if status == "completed" else "job_failed"), None
+
+    async def batch(n: int):
+        body = {"incidents": [payloads.request_body(n * args.batch_size + i) for i in range(args.batch_size)]}
+        started = time.perf_counter()
+        first_event = None
+        summary = None
+        async with client.stream("POST", "/analyze-incidents/batch", json=body) as response:
+            if response.status_code >= 400:
+                return f"http_{response.status_code}", None
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("type") == "result" and first_event is None:
+                    first_event = int((time.perf_counter() - started) * 1e6)
+                if item.get("type") == "summary":
+                    summary = item
+        if summary is None:
+            return "stream_incomplete", first_event
+        return ("batch_partial" if summary.get("failed") else None), first_event
+
+    return {"analyze": analyze, "sample": sample, "health": health, "stream": stream, "job": job, "batch": batch}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """"analyze:8,stream:1,health:1" -> weighted targets (a bare name weighs 1)"""
+    mix = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.strip().partition(":")
+        if name not in TARGETS:
+            raise ValueError(f"Unknown target '{name}' (choose from {', '.join(TARGETS)})")
+        mix.append((name, float(weight) if weight else 1.0))
+    if not mix:
+        raise ValueError("Empty target mix")
+    return mix
+
+
+class LoadRunner:
+    """Drives one load level and collects a TargetResult per target"""
+
+    def __init__(self, requests: Dict[str, Request], mix: List[Tuple[str, float]], seed: Optional[int]):
+        self.requests = requests
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self._random = random.Random(seed)
+        self._counter = 0
+
+    def _next(self) -> Tuple[str, int]:
+        self._counter += 1
+        return self._random.choices(self.names, self.weights)[0], self._counter
+
+    async def _issue(self, results: Dict[str, TargetResult], level_start: float, intended: float) -> None:
+        name, n = self._next()
+        sent = time.perf_counter()
+        try:
+            error, first_event_us = await self.requests[name](n)
+        except Exception as e:
+            error, first_event_us = type(e).__name__, None
+        done = time.perf_counter()
+        results.setdefault(name, TargetResult()).record(
+            int(done - level_start),
+            latency_us=int((done - intended) * 1e6),
+            service_us=int((done - sent) * 1e6),
+            error=error,
+            first_event_us=first_event_us
+        )
+
+    async def closed_loop(self, concurrency: int, duration: float) -> Tuple[Dict[str, TargetResult], float]:
+        """`concurrency` clients, each sending its next request as soon as the last one returns"""
+        results: Dict[str, TargetResult] = {}
+        started = time.perf_counter()
+        deadline = started + duration
+
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                await self._issue(results, started, time.perf_counter())
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return results, time.perf_counter() - started
+
+    async def open_loop(self, rate: float, duration: float, max_in_flight: int) -> Tuple[Dict[str, TargetResult], float]:
+        """
+        Poisson arrivals at `rate` per second, independent of how fast responses come back
+
+        Latency is measured from each request's scheduled arrival, so time spent
+        waiting for an in-flight slot (or behind a lagging scheduler) counts and
+        coordinated omission does not hide it.
+        """
+        results: Dict[str, TargetResult] = {}
+        limiter = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        tasks = set()
+
+        async def arrival(intended: float) -> None:
+            if limiter is None:
+                await self._issue(results, started, intended)
+                return
+            async with limiter:
+                await self._issue(results, started, intended)
+
+        started = time.perf_counter()
+        scheduled = started
+        while True:
+            scheduled += self._random.expovariate(rate)
+            if scheduled - started >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(arrival(scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        return results, time.perf_counter() - started
+
+
+def level_report(
+    mode: str,
+    level: float,
+    results: Dict[str, TargetResult],
+    wall: float,
+    expected_interval_ms: Optional[float]
+) -> Dict[str, Any]:
+    targets = {}
+    overall = HdrHistogram()
+    ok = errors = 0
+    for name, result in sorted(results.items()):
+        interval_us = None
+        if mode == "closed":
+            # Closed loop: a client's expected gap between requests is the typical response time
+            interval_us = int(expected_interval_ms * 1000) if expected_interval_ms else result.latency.percentile(50)
+        targets[name] = result.to_dict(wall, interval_us)
+        overall.merge(result.latency.corrected_copy(interval_us) if interval_us else result.latency)
+        ok += result.ok
+        errors += sum(result.errors.values())
+    return {
+        "mode": mode,
+        "concurrency" if mode == "closed" else "rate_rps": level,
+        "wall_seconds": round(wall, 3),
+        "requests": ok + errors,
+        "ok": ok,
+        "error_rate": round(errors / (ok + errors), 4) if ok + errors else 0.0,
+        "throughput_rps": round(ok / wall, 3) if wall else None,
+        # Open loop is corrected by construction; closed loop after the fact
+        "latency_p50_ms": round(overall.percentile(50) / 1000, 3),
+        "latency_p99_ms": round(overall.percentile(99) / 1000, 3),
+        "targets": targets
+    }
+
+
+def max_sustainable(levels: List[Dict[str, Any]], slo_p99_ms: Optional[float], max_error_rate: float) -> Optional[Dict[str, Any]]:
+    """Highest load level still within the p99 SLO and error budget"""
+    key = "concurrency" if levels and levels[0]["mode"] == "closed" else "rate_rps"
+    within = [
+        level for level in levels
+        if level["error_rate"] <= max_error_rate
+        and (slo_p99_ms is None or (level["latency_p99_ms"] or 0) <= slo_p99_ms)
+    ]
+    if not within:
+        return None
+    best = max(within, key=lambda level: level[key])
+    return {key: best[key], "throughput_rps": best["throughput_rps"], "latency_p99_ms": best["latency_p99_ms"]}
+
+
+@contextlib.asynccontextmanager
+async def make_client(args: argparse.Namespace):
+    import httpx
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    # The real app with its lifespan (job workers, health monitor) but no network hop
+    import main
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=timeout) as client:
+            yield client
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    mode = report["meta"]["config"]["mode"]
+    header = "conc" if mode == "closed" else "rate"
+    print(f"\n{header:>6} {'req/s':>8} {'p50 ms':>10} {'p99 ms':>10} {'err %':>7}  targets")
+    for level in report["levels"]:
+        value = level["concurrency" if mode == "closed" else "rate_rps"]
+        targets = ", ".join(
+            f"{name} p99 {target['latency']['percentiles_ms']['p99']}" for name, target in level["targets"].items()
+        )
+        print(f"{value!s:>6} {level['throughput_rps']!s:>8} {level['latency_p50_ms']!s:>10} "
+              f"{level['latency_p99_ms']!s:>10} {level['error_rate'] * 100:>6.1f}%  {targets}")
+    if report.get("max_sustainable"):
+        print(f"\nMax sustainable level: {report['max_sustainable']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive load against the incident analysis API")
+    parser.add_argument("--url", default="http://localhost:8080", help="API base URL")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Load the FastAPI app in this process instead of calling --url")
+    parser.add_argument("--mix", default="analyze", help=f"Weighted targets, e.g. analyze:8,stream:1,health:1 "
+                                                         f"({', '.join(TARGETS)})")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Closed loop: comma-separated client counts")
+    parser.add_argument("--rate", default="1,2,4", help="Open loop: comma-separated arrival rates (requests/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per load level")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Open loop: cap on outstanding requests (0 = unbounded); queued arrivals still count")
+    parser.add_argument("--expected-interval-ms", type=float,
+                        help="Closed loop: per-client request interval for coordinated-omission correction "
+                             "(default: the level's median latency)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Job target: seconds between status polls")
+    parser.add_argument("--batch-size", type=int, default=4, help="Batch target: incidents per request")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0,
+                        help="Fraction of incidents sent without a unique marker (hits coalescing and caches)")
+    parser.add_argument("--slo-p99-ms", type=float, help="p99 latency budget for the max-sustainable summary")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error budget for the same summary")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Report JSON path (default: .cache/loadgen/loadgen-<time>.json)")
+    args = parser.parse_args()
+    try:
+        args.mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.mode == "closed":
+        args.levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    else:
+        args.levels = [float(level) for level in args.rate.split(",") if level.strip()]
+    return args
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    payloads = PayloadGenerator(args.seed, args.duplicate_ratio)
+    levels = []
+    async with make_client(args) as client:
+        runner = LoadRunner(build_requests(client, payloads, args), args.mix, args.seed)
+        for level in args.levels:
+            print(f"{args.mode} loop at {level} {'clients' if args.mode == 'closed' else 'req/s'} "
+                  f"for {args.duration:g}s ...", flush=True)
+            if args.mode == "closed":
+                results, wall = await runner.closed_loop(level, args.duration)
+            else:
+                results, wall = await runner.open_loop(level, args.duration, args.max_in_flight)
+            levels.append(level_report(args.mode, level, results, wall, args.expected_interval_ms))
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "target_url": "in-process" if args.in_process else args.url,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "mode": args.mode,
+                "mix": dict(args.mix),
+                "levels": args.levels,
+                "duration_seconds": args.duration,
+                "max_in_flight": args.max_in_flight,
+                "expected_interval_ms": args.expected_interval_ms,
+                "duplicate_ratio": args.duplicate_ratio,
+                "seed": args.seed
+            }
+        },
+        "levels": levels,
+        "max_sustainable": max_sustainable(levels, args.slo_p99_ms, args.max_error_rate)
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"loadgen-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Log Template Mining
+Streaming Drain-style miner that reduces raw log records to templates with counts
+"""
+
+import json
+import re
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+
+WILDCARD = "<*>"
+
+# "2025-01-14 18:45:02 ERROR CheckoutService - message" and ISO-8601 variants
+TEXT_LINE_PATTERN = re.compile(
+    r"^(?P<timestamp>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\s+"
+    r"(?:\[?(?P<level>TRACE|DEBUG|INFO|NOTICE|WARN|WARNING|ERROR|FATAL|CRITICAL|SEVERE)\]?\s+)?"
+    r"(?:(?P<service>[\w.\-]+)\s+-\s+)?"
+    r"(?P<message>.*)$"
+)
+CONTINUATION_PATTERN = re.compile(r"^(?:\s+at\s|\s*\.\.\. \d+ more|Caused by:|\s+\S)")
+DIGIT_PATTERN = re.compile(r"\d")
+
+LEVEL_RANK = {"FATAL": 0, "CRITICAL": 0, "SEVERE": 0, "ERROR": 1, "WARN": 2, "WARNING": 2,
+              "NOTICE": 3, "INFO": 3, "DEBUG": 4, "TRACE": 4}
+
+
+class LogCluster:
+    """One log template and its aggregate statistics"""
+
+    __slots__ = ("template", "count", "first_seen", "last_seen", "levels", "services",
+                 "exemplar", "stack_trace")
+
+    def __init__(self, tokens: List[str], record: Dict[str, Any]):
+        self.template = tokens
+        self.count = 0
+        self.first_seen: Optional[str] = None
+        self.last_seen: Optional[str] = None
+        self.levels: Dict[str, int] = {}
+        self.services: Dict[str, int] = {}
+        self.exemplar = record.get("message", "")
+        self.stack_trace: Optional[str] = None
+
+    def add(self, record: Dict[str, Any], max_services: int) -> None:
+        self.count += 1
+        timestamp = record.get("timestamp")
+        if timestamp:
+            timestamp = str(timestamp)
+            if self.first_seen is None or timestamp < self.first_seen:
+                self.first_seen = timestamp
+            if self.last_seen is None or timestamp > self.last_seen:
+                self.last_seen = timestamp
+        level = record.get("level")
+        if level:
+            self.levels[level] = self.levels.get(level, 0) + 1
+        service = record.get("service")
+        if service and (service in self.services or len(self.services) < max_services):
+            self.services[service] = self.services.get(service, 0) + 1
+        if self.stack_trace is None and record.get("stack_trace"):
+            self.stack_trace = str(record["stack_trace"])
+
+    @property
+    def severity_rank(self) -> int:
+        return min((LEVEL_RANK.get(level, 3) for level in self.levels), default=3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "template": " ".join(self.template),
+            "count": self.count,
+            "levels": self.levels,
+            "services": sorted(self.services),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "exemplar": self.exemplar
+        }
+        if self.stack_trace:
+            result["stack_trace"] = self.stack_trace
+        return result
+
+
+class LogTemplateMiner:
+    """
+    Drain-style online template miner
+
+    Messages are tokenized on whitespace and tokens containing digits are masked.
+    A fixed-depth tree routes each message by token count and first token to a
+    small set of candidate clusters; the most similar one above sim_threshold
+    absorbs it (differing positions become <*>), otherwise a new cluster starts.
+    Cluster counts are capped, so memory stays bounded however much is fed in.
+    """
+
+    def __init__(
+        self,
+        sim_threshold: float = 0.5,
+        max_children: int = 64,
+        max_clusters: int = 2000,
+        max_tokens: int = 64,
+        max_services: int = 20
+    ):
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_tokens = max_tokens
+        self.max_services = max_services
+        self.tree: Dict[tuple, List[LogCluster]] = {}
+        self.clusters: List[LogCluster] = []
+        self.total_records = 0
+        self.overflow: Optional[LogCluster] = None
+
+    def _tokens(self, message: str) -> List[str]:
+        tokens = message.split()[:self.max_tokens]
+        return [WILDCARD if DIGIT_PATTERN.search(token) else token for token in tokens]
+
+    @staticmethod
+    def _similarity(template: List[str], tokens: List[str]) -> float:
+        same = 0
+        for template_token, token in zip(template, tokens):
+            if template_token == token:
+                same += 1
+        return same / len(tokens) if tokens else 1.0
+
+    def add(self, record: Dict[str, Any]) -> LogCluster:
+        """Feed one normalized log record ({"message", "timestamp", "level", "service", ...})"""
+        self.total_records += 1
+        tokens = self._tokens(str(record.get("message", "")))
+        first = tokens[0] if tokens else ""
+        key = (len(tokens), first)
+        candidates = self.tree.get(key)
+        if candidates is None:
+            candidates = self.tree[key] = []
+
+        best, best_similarity = None, -1.0
+        for cluster in candidates:
+            similarity = self._similarity(cluster.template, tokens)
+            if similarity > best_similarity:
+                best, best_similarity = cluster, similarity
+
+        if best is not None and best_similarity >= self.sim_threshold:
+            if best_similarity < 1.0:
+                best.template = [
+                    template_token if template_token == token else WILDCARD
+                    for template_token, token in zip(best.template, tokens)
+                ]
+        elif len(candidates) < self.max_children and len(self.clusters) < self.max_clusters:
+            best = LogCluster(tokens, record)
+            candidates.append(best)
+            self.clusters.append(best)
+        elif best is None:
+            if self.overflow is None:
+                self.overflow = LogCluster([WILDCARD], {"message": "(template limit reached)"})
+                self.clusters.append(self.overflow)
+            best = self.overflow
+
+        best.add(record, self.max_services)
+        return best
+
+    def add_all(self, records: Iterable[Dict[str, Any]]) -> "LogTemplateMiner":
+        for record in records:
+            self.add(record)
+        return self
+
+    def summary(self, max_templates: int = 50) -> Dict[str, Any]:
+        """Templates ordered by severity, then frequency"""
+        ranked = sorted(self.clusters, key=lambda cluster: (cluster.severity_rank, -cluster.count))
+        templates = [cluster.to_dict() for cluster in ranked[:max_templates]]
+        return {
+            "total_records": self.total_records,
+            "unique_templates": len(self.clusters),
+            "templates_shown": len(templates),
+            "templates": templates
+        }
+
+
+def normalize_record(record: Any) -> Dict[str, Any]:
+    """Coerce a structured log entry into the miner's record shape"""
+    if not isinstance(record, dict):
+        return parse_text_line(str(record))
+    message = record.get("message") or record.get("msg") or record.get("log") or ""
+    return {
+        "message": str(message),
+        "timestamp": record.get("timestamp") or record.get("time") or record.get("@timestamp"),
+        "level": str(record.get("level") or record.get("severity") or "").upper() or None,
+        "service": record.get("service") or record.get("logger") or record.get("app"),
+        "stack_trace": record.get("stack_trace") or record.get("exception")
+    }
+
+
+def parse_text_line(line: str) -> Dict[str, Any]:
+    """Parse a plain-text log line into a record"""
+    match = TEXT_LINE_PATTERN.match(line)
+    if match is None:
+        return {"message": line.strip(), "timestamp": None, "level": None, "service": None, "stack_trace": None}
+    level = match.group("level")
+    if level == "WARNING":
+        level = "WARN"
+    return {
+        "message": match.group("message").strip(),
+        "timestamp": match.group("timestamp"),
+        "level": level,
+        "service": match.group("service"),
+        "stack_trace": None
+    }
+
+
+def iter_text_records(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Plain-text or NDJSON lines to records; indented/'Caused by' lines join the previous stack trace"""
+    pending: Optional[Dict[str, Any]] = None
+    trace: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if pending is not None and CONTINUATION_PATTERN.match(line):
+            if len(trace) < 50:
+                trace.append(line)
+            continue
+        if pending is not None:
+            if trace and not pending.get("stack_trace"):
+                pending["stack_trace"] = "\n".join(trace)
+            yield pending
+        trace = []
+        if line.lstrip().startswith("{"):
+            try:
+                pending = normalize_record(json.loads(line))
+                continue
+            except ValueError:
+                pass
+        pending = parse_text_line(line)
+    if pending is not None:
+        if trace and not pending.get("stack_trace"):
+            pending["stack_trace"] = "\n".join(trace)
+        yield pending
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Incrementally decode the elements of a top-level JSON array without loading it whole"""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size)
+    position = 0
+    eof = not buffer
+    started = False
+    while True:
+        length = len(buffer)
+        while position < length and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < length:
+            if not started:
+                if buffer[position] != "[":
+                    return
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+                yield value
+                continue
+            except ValueError:
+                if eof:
+                    return
+        elif eof:
+            return
+        # Element split across chunks (or buffer drained): keep the tail and read more
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def mine_file(path: str, max_templates: int = 50, **miner_options) -> Dict[str, Any]:
+    """Mine a log file (JSON array, NDJSON or plain text) in bounded memory"""
+    miner = LogTemplateMiner(**miner_options)
+    with open(path, "r", encoding="utf-8", errors="replace") as stream:
+        head = stream.read(1)
+        while head and head.isspace():
+            head = stream.read(1)
+        stream.seek(0)
+        if head == "[":
+            miner.add_all(normalize_record(record) for record in iter_json_array(stream))
+        else:
+            miner.add_all(iter_text_records(stream))
+    return miner.summary(max_templates)
+
+
+def summarize_logs(logs: Any, max_templates: int = 50, **miner_options) -> Any:
+    """
+    Reduce a log payload (list of records, or raw text) to a template summary
+
+    Anything that is not a record list or non-empty text is returned as-is.
+    """
+    if isinstance(logs, dict):
+        logs = [logs]
+    if isinstance(logs, list):
+        records = (normalize_record(record) for record in logs)
+    elif isinstance(logs, str) and logs.strip():
+        records = iter_text_records(logs.splitlines())
+    else:
+        return logs
+    return LogTemplateMiner(**miner_options).add_all(records).summary(max_templates)
@@ -3,15 +3,30 @@ FastAPI Backend for SRE Incident Commander
 Provides REST API endpoints for incident analysis
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Literal, Optional
 import uvicorn
 
 from simple_crew import SimpleIncidentAnalysisCrew
-from llm_config import health_check
+from llm_config import health_check, llm_registry, shutdown_llm_executor
+from llm_health import health_monitor
 from mock_data_loader import get_sample_incident_data
+from incident_payload import incident_fingerprint
+from knowledge_index import search_cache_stats
+from single_flight import SingleFlight
+from job_queue import JobConflictError, JobManager, QueueFullError
+from durable_queue import DurableJobManager, INCIDENT_QUEUE_DB
+from alert_grouping import AlertGrouper, extract_alerts
+from instrumentation import cache_event_totals, registry as metrics_registry, render_metrics
+from tracing import trace_buffer
 
 
 # Pydantic models for request/response
@@ -19,6 +34,38 @@ class IncidentRequest(BaseModel):
     alert: str
     logs: str
     metrics: str
+    # "precomputed" answers the metrics stage from the metrics engine without an LLM call
+    metrics_mode: Optional[Literal["assisted", "precomputed"]] = None
+
+    def to_incident_data(self) -> Dict[str, Any]:
+        incident_data = {
+            "alert": self.alert,
+            "logs": self.logs,
+            "metrics": self.metrics
+        }
+        if self.metrics_mode:
+            incident_data["metrics_mode"] = self.metrics_mode
+        return incident_data
+
+
+class IncidentUpdate(BaseModel):
+    """Fields to replace on a finished incident; omitted fields keep their previous values"""
+    alert: Optional[str] = None
+    logs: Optional[str] = None
+    metrics: Optional[str] = None
+    metrics_mode: Optional[Literal["assisted", "precomputed"]] = None
+
+    def to_changes(self) -> Dict[str, Any]:
+        return self.model_dump(exclude_none=True)
+
+
+# Upper bound on concurrent stage (LLM) calls for one batch request
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "16"))
+
+
+class BatchIncidentRequest(BaseModel):
+    incidents: List[IncidentRequest] = Field(..., min_length=1)
+    max_concurrency: Optional[int] = Field(None, ge=1)
 
 
 class IncidentResponse(BaseModel):
@@ -28,11 +75,26 @@ class IncidentResponse(BaseModel):
     error: Optional[str] = None
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    health_monitor.ensure_started()
+    await job_manager.start()
+    await alert_grouper.start()
+    yield
+    await alert_grouper.stop()
+    await job_manager.stop()
+    health_monitor.stop()
+    shutdown_llm_executor()
+    await llm_registry.aclose()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SRE Incident Commander",
     description="AI-powered incident analysis and response system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend access
@@ -47,6 +109,40 @@ app.add_middleware(
 # Initialize the incident analysis crew
 incident_crew = SimpleIncidentAnalysisCrew()
 
+# Identical concurrent analyses (e.g. during an alert storm) share one run
+analysis_coalescer = SingleFlight(
+    reuse_window_seconds=float(os.environ.get("ANALYSIS_REUSE_WINDOW_SECONDS", "10"))
+)
+
+# Background analyses for submit-and-poll clients (POST /incidents); with
+# INCIDENT_QUEUE_DB set they are persisted and shared with incident_worker.py processes
+if INCIDENT_QUEUE_DB:
+    job_manager = DurableJobManager(incident_crew, INCIDENT_QUEUE_DB)
+else:
+    job_manager = JobManager(incident_crew)
+
+# Alert storms: correlated alerts are buffered and submitted as one incident per group
+alert_grouper = AlertGrouper(submit=job_manager.submit)
+
+# Scrape-time gauges over state the components already keep
+metrics_registry.callback(
+    "sre_incident_queue_depth", "Incident jobs waiting for a worker", lambda: job_manager.queue_depth
+)
+metrics_registry.callback(
+    "sre_alert_groups_open", "Alert groups still collecting alerts",
+    lambda: sum(len(groups) for groups in alert_grouper.open_groups.values())
+)
+metrics_registry.callback(
+    "sre_llm_backend_available", "1 when the backend is healthy and its circuit is not open",
+    lambda: {(backend.name,): int(backend.available) for backend in health_monitor.backends},
+    labelnames=("backend",)
+)
+if hasattr(incident_crew.llm, "stats"):
+    metrics_registry.callback(
+        "sre_llm_cache_lookups_total", "LLM response cache lookups by stage and result",
+        cache_event_totals(incident_crew.llm.stats), kind="counter", labelnames=("stage", "result")
+    )
+
 
 @app.get("/")
 async def root():
@@ -60,17 +156,57 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint"""
+    """Health check endpoint (served from the background monitor's cached state)"""
     llm_health = health_check()
     
     return {
         "api_status": "healthy",
         "llm_status": llm_health["status"],
         "llm_model": llm_health.get("model", "unknown"),
+        "llm_type": llm_health.get("llm_type", "unknown"),
+        "llm_backends": llm_health.get("backends", []),
         "timestamp": "2024-12-22T10:35:00Z"
     }
 
 
+@app.get("/stats")
+async def stats():
+    """Runtime statistics for cache and capacity sizing"""
+    return {
+        "llm_cache": incident_crew.llm.stats() if hasattr(incident_crew.llm, "stats") else None,
+        "coalescing": analysis_coalescer.stats(),
+        "jobs": await job_manager.stats(),
+        "alert_grouping": {
+            key: value for key, value in alert_grouper.status().items()
+            if key not in ("open_groups", "recent_groups")
+        },
+        "prompt_coalescing": incident_crew.prompt_flight.stats(),
+        "kb_lookups": search_cache_stats(),
+        "llm_clients": llm_registry.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage and LLM latency, token, JSON-fallback, in-flight and queue metrics in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/traces")
+async def list_traces(limit: int = 50):
+    """Most recent analysis traces (newest first) with their total duration"""
+    return {"traces": [trace.summary() for trace in trace_buffer.recent(limit)]}
+
+
+@app.get("/debug/traces/{incident_id}")
+async def get_trace(incident_id: str):
+    """Waterfall of one analysis: every span with its offset from the start, duration and attributes"""
+    trace = trace_buffer.get(incident_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No trace for incident: {incident_id}")
+    return trace.waterfall()
+
+
 @app.post("/analyze-incident", response_model=IncidentResponse)
 async def analyze_incident(request: IncidentRequest):
     """
@@ -84,14 +220,14 @@ async def analyze_incident(request: IncidentRequest):
     """
     try:
         # Prepare incident data for analysis
-        incident_data = {
-            "alert": request.alert,
-            "logs": request.logs,
-            "metrics": request.metrics
-        }
+        incident_data = request.to_incident_data()
         
-        # Run the incident analysis crew
-        analysis_result = incident_crew.analyze_incident(incident_data)
+        # Run the incident analysis crew without blocking the event loop,
+        # attaching to an identical in-flight analysis when there is one
+        analysis_result = await analysis_coalescer.do(
+            incident_fingerprint(incident_data),
+            lambda: incident_crew.analyze_incident_async(incident_data)
+        )
         
         if analysis_result.get("status") == "failed":
             raise HTTPException(
@@ -112,6 +248,220 @@ async def analyze_incident(request: IncidentRequest):
         )
 
 
+@app.post("/incidents", status_code=202)
+async def submit_incident(request: IncidentRequest, http_request: Request):
+    """
+    Queue an incident analysis and return its ID immediately
+    
+    Poll GET /incidents/{incident_id} for progress and the result. Responds with
+    429 when the queue is full.
+    """
+    try:
+        job = await job_manager.submit(request.to_incident_data())
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    
+    return {
+        "status": job.status,
+        "incident_id": job.id,
+        "status_url": str(http_request.url_for("get_incident", incident_id=job.id)),
+        "queue_depth": job_manager.queue_depth
+    }
+
+
+@app.get("/incidents/{incident_id}")
+async def get_incident(incident_id: str):
+    """Status, completed stages, timings and (when finished) the analysis of a queued incident"""
+    job = await job_manager.get(incident_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown incident: {incident_id}")
+    return job.to_dict()
+
+
+@app.patch("/incidents/{incident_id}", status_code=202)
+async def update_incident(incident_id: str, request: IncidentUpdate, http_request: Request):
+    """
+    Re-analyze a finished incident with new alert, logs or metrics
+    
+    Only the stages whose prompts change (and their downstream stages) call the
+    LLM again; the rest are reused from the previous revision. Responds with 409
+    while the incident is still queued or running.
+    """
+    changes = request.to_changes()
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    try:
+        job = await job_manager.update(incident_id, changes)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown incident: {incident_id}")
+    
+    return {
+        "status": job.status,
+        "incident_id": job.id,
+        "revision": job.revision,
+        "status_url": str(http_request.url_for("get_incident", incident_id=job.id)),
+        "queue_depth": job_manager.queue_depth
+    }
+
+
+@app.post("/alerts", status_code=202)
+async def ingest_alerts(payload: Any = Body(...)):
+    """
+    Ingest alerts for grouped analysis
+    
+    Accepts one alert or a list in the mock_data/alerts.json shape, or an
+    Alertmanager webhook body. Alerts are grouped by labels and time, and
+    each group is queued as one merged incident once it goes quiet (see
+    GET /alerts/groups for the resulting incident IDs).
+    """
+    try:
+        alerts = extract_alerts(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    groups = alert_grouper.add(alerts)
+    return {
+        "status": "accepted",
+        "alerts": len(alerts),
+        "groups": sorted(set(groups))
+    }
+
+
+@app.get("/alerts/groups")
+async def alert_groups():
+    """Open alert groups and recently submitted ones with their incident IDs"""
+    return alert_grouper.status()
+
+
+@app.post("/analyze-incidents/batch")
+async def analyze_incidents_batch(request: BatchIncidentRequest):
+    """
+    Analyze many incidents at once, streaming one NDJSON line per incident as it completes
+    
+    All stages of all incidents share one concurrency limit. Identical incidents
+    run once, identical stage prompts in flight are sent to the LLM once, and
+    knowledge base lookups are memoized. The start line reports the LLM backend
+    the health monitor currently prefers; each LLM call still fails over on its own.
+    If the client disconnects, analyses nobody else is waiting for are cancelled.
+    
+    Lines: {"type": "start"}, one {"type": "result"} per incident (with its
+    index in the request), then {"type": "summary"}.
+    """
+    limit = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    limiter = asyncio.Semaphore(limit)
+    incidents = [incident.to_incident_data() for incident in request.incidents]
+    fingerprints = [incident_fingerprint(incident_data) for incident_data in incidents]
+    llm_health = health_check()
+    
+    async def run_one(index: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = await analysis_coalescer.do(
+                fingerprints[index],
+                lambda: incident_crew.analyze_incident_async(incidents[index], limiter=limiter)
+            )
+            item = {"status": "success", "incident_id": result.get("incident_id"), "analysis": result}
+        except Exception as e:
+            item = {"status": "failed", "error": str(e)}
+        return {"type": "result", "index": index, **item,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+    
+    async def ndjson_stream():
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(run_one(index)) for index in range(len(incidents))]
+        succeeded = 0
+        try:
+            yield json.dumps({
+                "type": "start",
+                "incidents": len(incidents),
+                "unique_incidents": len(set(fingerprints)),
+                "max_concurrency": limit,
+                "llm_backend": llm_health.get("backend"),
+                "llm_type": llm_health.get("llm_type")
+            }) + "\n"
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                succeeded += item["status"] == "success"
+                yield json.dumps(item, default=str) + "\n"
+            yield json.dumps({
+                "type": "summary",
+                "incidents": len(incidents),
+                "succeeded": succeeded,
+                "failed": len(incidents) - succeeded,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+            }) + "\n"
+        finally:
+            # Client went away: stop waiting. SingleFlight cancels each analysis once
+            # no caller (here or in another request) is waiting for it any more
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/analyze-incident/stream")
+async def analyze_incident_stream(request: IncidentRequest, tokens: bool = False):
+    """
+    Analyze an incident and stream each stage's result as Server-Sent Events
+    
+    Emits a `start` event, one `stage` event per completed stage (triage first
+    among the parallel stages), optional `token` events with raw LLM chunks when
+    `tokens=true`, and finally a `complete` event with the full analysis (or `error`).
+    """
+    incident_data = request.to_incident_data()
+    incident_id = incident_crew.new_incident_id()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def on_stage_complete(stage: str, result: Dict[str, Any]) -> None:
+        queue.put_nowait(("stage", {"stage": stage, "data": result["data"]}))
+    
+    def on_token(stage: str, chunk: str) -> None:
+        queue.put_nowait(("token", {"stage": stage, "chunk": chunk}))
+    
+    async def run_analysis():
+        try:
+            result = await incident_crew.analyze_incident_async(
+                incident_data,
+                on_stage_complete=on_stage_complete,
+                on_token=on_token if tokens else None,
+                incident_id=incident_id
+            )
+            queue.put_nowait(("complete", {"status": "success", "incident_id": incident_id, "analysis": result}))
+        except Exception as e:
+            queue.put_nowait(("error", {"status": "failed", "incident_id": incident_id, "error": str(e)}))
+        finally:
+            queue.put_nowait(None)
+    
+    async def event_stream():
+        task = asyncio.create_task(run_analysis())
+        try:
+            yield _sse_event("start", {"incident_id": incident_id, "stages": list(incident_crew.STAGES)})
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield _sse_event(*item)
+        finally:
+            # Client went away: stop spending LLM calls on this incident
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/sample-incident")
 async def get_sample_incident():
     """Get sample incident data for testing"""
@@ -0,0 +1,258 @@
+"""
+Metrics Anomaly Engine
+Vectorized threshold and baseline checks over per-service metric time series
+"""
+
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# Static thresholds; a metric breaches when its latest value is >= the level
+DEFAULT_THRESHOLDS = {
+    "memory_utilization_percent": {"warning": 85.0, "critical": 95.0},
+    "heap_utilization_percent": {"warning": 85.0, "critical": 95.0},
+    "memory_usage_percent": {"warning": 85.0, "critical": 95.0},
+    "cpu_usage_percent": {"warning": 80.0, "critical": 95.0},
+    "connection_pool_saturation_percent": {"warning": 80.0, "critical": 95.0},
+    "connection_wait_time_ms": {"warning": 500.0, "critical": 2000.0},
+    "error_rate_percent": {"warning": 1.0, "critical": 5.0},
+    "status_5xx_percent": {"warning": 1.0, "critical": 5.0},
+    "response_time_p95_ms": {"warning": 500.0, "critical": 1000.0},
+    "response_time_p99_ms": {"warning": 1000.0, "critical": 2000.0},
+    "query_duration_p95_ms": {"warning": 250.0, "critical": 1000.0},
+    "query_duration_p99_ms": {"warning": 500.0, "critical": 2000.0},
+    "deadlocks_per_minute": {"warning": 1.0, "critical": 5.0},
+    "slow_queries_per_minute": {"warning": 10.0, "critical": 50.0},
+}
+
+# Ratio metrics derived from raw (usage, limit) pairs, in percent
+DERIVED_RATIOS = {
+    "memory_utilization_percent": ("memory_usage_bytes", "memory_limit_bytes"),
+    "heap_utilization_percent": ("heap_used_mb", "heap_max_mb"),
+    "connection_pool_saturation_percent": ("active_connections", "max_connections"),
+}
+
+# Metrics whose breaches read as resource constraints rather than symptoms
+RESOURCE_METRICS = frozenset({
+    "memory_utilization_percent", "heap_utilization_percent", "memory_usage_percent",
+    "cpu_usage_percent", "connection_pool_saturation_percent", "connection_wait_time_ms",
+})
+
+SEVERITY_ORDER = {"critical": 0, "warning": 1}
+
+
+def iter_samples(metrics: Any) -> Iterator[Tuple[str, str, Dict[str, float]]]:
+    """
+    Yield (timestamp, service, numeric metrics) from the supported payload shapes
+
+    Accepts a list of {"timestamp", "service", "metrics": {...}} samples (as in
+    mock_data/metrics.json), a single such sample, or a flat dict of metric values.
+    """
+    if isinstance(metrics, dict):
+        metrics = [metrics]
+    if not isinstance(metrics, list):
+        return
+    for position, sample in enumerate(metrics):
+        if not isinstance(sample, dict):
+            continue
+        values = sample.get("metrics") if isinstance(sample.get("metrics"), dict) else sample
+        numeric = {
+            name: float(value) for name, value in values.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        }
+        for derived, (usage, limit) in DERIVED_RATIOS.items():
+            if derived not in numeric and numeric.get(limit):
+                if usage in numeric:
+                    numeric[derived] = numeric[usage] / numeric[limit] * 100.0
+        timestamp = str(sample.get("timestamp") or f"{position:012d}")
+        yield timestamp, str(sample.get("service") or "unknown"), numeric
+
+
+class MetricsEngine:
+    """
+    Threshold and anomaly detection over all (service, metric) series at once
+
+    Samples are laid out as a (series x timestamp) matrix. Static thresholds are
+    checked on each series' latest value; anomalies compare the latest value
+    against a rolling z-score baseline and an EWMA baseline built from the
+    preceding points, and a series is flagged only when both agree. Every step
+    is a NumPy operation over all series, with a single pass over timestamps
+    for the EWMA recurrence.
+    """
+
+    def __init__(
+        self,
+        thresholds: Optional[Dict[str, Dict[str, float]]] = None,
+        window: int = 30,
+        z_threshold: float = 3.0,
+        ewma_alpha: float = 0.3,
+        min_history: int = 5
+    ):
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+        self.window = window
+        self.z_threshold = z_threshold
+        self.ewma_alpha = ewma_alpha
+        self.min_history = min_history
+
+    def _matrix(self, samples: Iterable[Tuple[str, str, Dict[str, float]]]):
+        """Build the (series x timestamp) matrix, NaN where a series has no sample"""
+        cells: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(dict)
+        timestamps = set()
+        for timestamp, service, values in samples:
+            timestamps.add(timestamp)
+            for name, value in values.items():
+                cells[(service, name)][timestamp] = value
+        series = sorted(cells)
+        columns = {timestamp: index for index, timestamp in enumerate(sorted(timestamps))}
+        matrix = np.full((len(series), len(columns)), np.nan)
+        rows, cols, values = [], [], []
+        for row, key in enumerate(series):
+            for timestamp, value in cells[key].items():
+                rows.append(row)
+                cols.append(columns[timestamp])
+                values.append(value)
+        if rows:
+            matrix[rows, cols] = values
+        return series, sorted(timestamps), matrix
+
+    def analyze(self, metrics: Any) -> Dict[str, Any]:
+        """
+        Detect threshold breaches and anomalies in a metrics payload
+
+        Returns:
+            {"services", "threshold_breaches", "performance_anomalies",
+             "resource_constraints", "latest"} with breaches ordered by severity
+        """
+        series, timestamps, matrix = self._matrix(iter_samples(metrics))
+        if not series:
+            return {"services": [], "threshold_breaches": [], "performance_anomalies": [],
+                    "resource_constraints": [], "latest": {}}
+
+        count, width = matrix.shape
+        rows = np.arange(count)
+        present = ~np.isnan(matrix)
+        last_col = width - 1 - np.argmax(present[:, ::-1], axis=1)
+        latest = matrix[rows, last_col]
+
+        # Static thresholds
+        warning = np.array([self.thresholds.get(metric, {}).get("warning", np.nan) for _, metric in series])
+        critical = np.array([self.thresholds.get(metric, {}).get("critical", np.nan) for _, metric in series])
+        with np.errstate(invalid="ignore"):
+            is_critical = latest >= critical
+            is_warning = (latest >= warning) & ~is_critical
+
+        # Rolling z-score over the window preceding each series' latest point
+        cols = np.arange(width)
+        in_window = (cols[None, :] < last_col[:, None]) & (cols[None, :] >= (last_col - self.window)[:, None]) & present
+        history = np.where(in_window, matrix, 0.0)
+        n = in_window.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = history.sum(axis=1) / n
+            std = np.sqrt(np.where(in_window, (matrix - mean[:, None]) ** 2, 0.0).sum(axis=1) / n)
+            zscore = (latest - mean) / std
+
+        # EWMA mean/variance recurrence, one vectorized step per timestamp
+        ewma = np.full(count, np.nan)
+        ewvar = np.zeros(count)
+        alpha = self.ewma_alpha
+        for col in range(width):
+            column = matrix[:, col]
+            update = present[:, col] & (col < last_col)
+            first = update & np.isnan(ewma)
+            ewma[first] = column[first]
+            step = update & ~first
+            delta = column[step] - ewma[step]
+            ewma[step] += alpha * delta
+            ewvar[step] = (1 - alpha) * (ewvar[step] + alpha * delta ** 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ewma_z = (latest - ewma) / np.sqrt(ewvar)
+
+        # Both baselines must agree; a jump on a flat series has an infinite z-score
+        enough = n >= self.min_history
+        with np.errstate(invalid="ignore"):
+            anomalous = enough & (np.abs(np.nan_to_num(zscore)) >= self.z_threshold) & (
+                np.abs(np.nan_to_num(ewma_z)) >= self.z_threshold
+            )
+
+        breaches = []
+        for row in np.flatnonzero(is_critical | is_warning):
+            service, metric = series[row]
+            severity = "critical" if is_critical[row] else "warning"
+            breaches.append({
+                "service": service,
+                "metric": metric,
+                "value": round(float(latest[row]), 2),
+                "threshold": float(critical[row] if is_critical[row] else warning[row]),
+                "severity": severity,
+                "timestamp": timestamps[last_col[row]]
+            })
+        breaches.sort(key=lambda breach: (SEVERITY_ORDER[breach["severity"]], breach["service"], breach["metric"]))
+
+        anomalies = []
+        for row in np.flatnonzero(anomalous):
+            service, metric = series[row]
+            anomalies.append({
+                "service": service,
+                "metric": metric,
+                "value": round(float(latest[row]), 2),
+                "baseline_mean": round(float(mean[row]), 2),
+                "zscore": round(float(zscore[row]), 2) if np.isfinite(zscore[row]) else None,
+                "ewma": round(float(ewma[row]), 2),
+                "ewma_zscore": round(float(ewma_z[row]), 2) if np.isfinite(ewma_z[row]) else None,
+                "history_points": int(n[row]),
+                "timestamp": timestamps[last_col[row]]
+            })
+
+        latest_by_service: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for row, (service, metric) in enumerate(series):
+            latest_by_service[service][metric] = round(float(latest[row]), 2)
+
+        return {
+            "services": sorted(latest_by_service),
+            "threshold_breaches": breaches,
+            "performance_anomalies": anomalies,
+            "resource_constraints": [
+                f"{breach['service']} {breach['metric']} at {breach['value']} ({breach['severity']}, threshold {breach['threshold']})"
+                for breach in breaches if breach["metric"] in RESOURCE_METRICS
+            ],
+            "latest": dict(latest_by_service)
+        }
+
+
+def precomputed_metrics_analysis(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Metrics stage output built from an engine report, used instead of an LLM call"""
+    symptoms = [breach for breach in report["threshold_breaches"] if breach["metric"] not in RESOURCE_METRICS]
+    return {
+        "resource_constraints": report["resource_constraints"],
+        "performance_anomalies": [
+            f"{anomaly['service']} {anomaly['metric']} at {anomaly['value']} vs baseline {anomaly['baseline_mean']}"
+            for anomaly in report["performance_anomalies"]
+        ] + [
+            f"{breach['service']} {breach['metric']} at {breach['value']} ({breach['severity']})"
+            for breach in symptoms
+        ],
+        "capacity_issues": [
+            f"{breach['service']} {breach['metric']} at {breach['value']}"
+            for breach in report["threshold_breaches"]
+            if breach["metric"] in RESOURCE_METRICS and breach["severity"] == "critical"
+        ],
+        "threshold_breaches": [
+            # Strings, as in the stage's output schema and the LLM's answers
+            {"metric": f"{breach['service']}.{breach['metric']}", "value": str(breach["value"]),
+             "threshold": str(breach["threshold"]), "severity": breach["severity"]}
+            for breach in report["threshold_breaches"]
+        ],
+        "trends": (
+            f"{len(report['threshold_breaches'])} threshold breaches and "
+            f"{len(report['performance_anomalies'])} baseline anomalies across "
+            f"{len(report['services'])} services"
+        )
+    }
+
+
+metrics_engine = MetricsEngine()
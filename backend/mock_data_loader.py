@@ -47,6 +47,6 @@ def get_sample_incident_data() -> Dict[str, Any]:
     
     return {
         "alert": alerts[0] if alerts else "No alert data",
-        "logs": logs[:3] if logs else "No log data",  # First 3 log entries
+        "logs": logs if logs else "No log data",  # Mined into templates by the log stage
         "metrics": metrics[0] if metrics else "No metrics data"
     }
\ No newline at end of file
@@ -3,233 +3,392 @@ Mock LLM for demo purposes when Ollama is not available
 Provides realistic responses for incident analysis
 """
 
+import asyncio
 import json
+import math
+import os
 import random
-from typing import Any, Dict, List, Optional, Iterator
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Iterator
+
+
+# Latency for the shared mock, e.g. "lognormal:400,0.5" (see LatencyProfile.parse); empty means instant
+MOCK_LLM_LATENCY = os.environ.get("MOCK_LLM_LATENCY", "")
+MOCK_LLM_TOKENS_PER_SECOND = float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", "0"))
+
+# Rough characters per token for simulated generation time
+CHARS_PER_TOKEN = 4
+
+
+class LatencyProfile:
+    """
+    Simulated per-call latency: a sampled time to first token, then generation at tokens_per_second
+    
+    Distributions (parameters in milliseconds):
+        fixed:MS, uniform:LOW,HIGH, normal:MEAN,STDDEV (clamped at 0),
+        lognormal:MEDIAN,SIGMA (long right tail, like real model servers)
+    """
+    
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+    
+    def __init__(
+        self,
+        distribution: str = "fixed",
+        params: tuple = (0.0,),
+        tokens_per_second: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'; expected one of {self.DISTRIBUTIONS}")
+        self.distribution = distribution
+        self.params = tuple(float(value) for value in params)
+        self.tokens_per_second = tokens_per_second or None
+        self._random = random.Random(seed)
+    
+    @classmethod
+    def parse(cls, spec: str, tokens_per_second: Optional[float] = None, seed: Optional[int] = None) -> "LatencyProfile":
+        """Build a profile from "distribution:p1,p2" (a bare number means fixed milliseconds)"""
+        distribution, _, params = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        values = tuple(float(value) for value in params.split(",") if value.strip()) or (0.0,)
+        return cls(distribution.strip(), values, tokens_per_second, seed)
+    
+    def first_token_seconds(self) -> float:
+        first, second = self.params[0], (self.params[1] if len(self.params) > 1 else 0.0)
+        if self.distribution == "uniform":
+            ms = self._random.uniform(first, second)
+        elif self.distribution == "normal":
+            ms = max(0.0, self._random.gauss(first, second))
+        elif self.distribution == "lognormal":
+            ms = first * math.exp(self._random.gauss(0.0, second)) if first > 0 else 0.0
+        else:
+            ms = first
+        return ms / 1000
+    
+    def generation_seconds(self, text: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(text) / CHARS_PER_TOKEN / self.tokens_per_second
+    
+    def total_seconds(self, text: str) -> float:
+        return self.first_token_seconds() + self.generation_seconds(text)
+
+
+# Stage keyword rules in priority order; a rule matches when every group has a keyword in the text
+STAGE_ROUTES = [
+    ("triage", [("alert",), ("triage", "severity")]),
+    ("logs", [("log",), ("analysis", "error")]),
+    ("metrics", [("metrics",), ("analysis", "threshold")]),
+    ("knowledge_base", [("knowledge", "historical", "similar")]),
+    ("actions", [("recommendation", "action"), ("immediate", "based on")]),
+    ("report", [("post-incident", "report"), ("based on", "analysis")]),
+    # Last: action and report instructions mention the root cause they build on
+    ("root_cause", [("root cause", "determine")]),
+]
+
+
+def _match_stage(text: str) -> Optional[str]:
+    text = text.lower()
+    for stage, groups in STAGE_ROUTES:
+        if all(any(keyword in text for keyword in group) for group in groups):
+            return stage
+    return None
+
+
+def route_stage(prompt: str) -> str:
+    """
+    Stage a prompt is asking for, or "generic"
+    
+    The instruction line (the first non-empty line) decides first: matching the
+    whole prompt alone sends later stages to earlier ones, since their prompts
+    embed upstream analyses that mention logs, alerts and metrics.
+    """
+    if prompt == "Hello":
+        return "health"
+    instruction = next((line for line in prompt.splitlines() if line.strip()), "")
+    return _match_stage(instruction) or _match_stage(prompt) or "generic"
+
+
+def stage_response(stage: str) -> str:
+    """Canned response for a stage name from route_stage"""
+    if stage == "health":
+        return "Hello! I'm a mock LLM ready to help with incident analysis."
+
+    # Alert triage responses
+    if stage == "triage":
+        return json.dumps({
+            "severity": "P1",
+            "urgency": "High",
+            "business_impact": "High - Service degradation with significant user impact",
+            "affected_services": ["checkout-service", "payment-service"],
+            "classification": "Downstream dependency failure",
+            "confidence": "High",
+            "escalation_needed": True,
+            "estimated_users_affected": 5000,
+            "priority_justification": "Circuit breaker opened on payment service causing cascading failures"
+        })
+
+    # Log analysis responses
+    if stage == "logs":
+        return json.dumps({
+            "key_errors": [
+                "503 Service Unavailable: PaymentService connection failed",
+                "Circuit breaker opened for PaymentService",
+                "Fallback response triggered for payment operations"
+            ],
+            "error_patterns": [
+                "Payment service failures increasing since 18:45",
+                "Checkout service error rate correlating with PaymentService availability",
+                "Circuit breaker state changes detected"
+            ],
+            "timeline": [
+                {"timestamp": "18:45:02", "severity": "ERROR", "event": "PaymentService 503 error"},
+                {"timestamp": "18:45:05", "severity": "WARN", "event": "Circuit breaker opened"},
+                {"timestamp": "18:45:10", "severity": "ERROR", "event": "Fallback response triggered"}
+            ],
+            "failure_indicators": [
+                "Repeated 503 responses from PaymentService",
+                "Circuit breaker transitioning to open"
+            ],
+            "log_correlation": "CheckoutService errors start within seconds of PaymentService 503s"
+        })
+
+    # Metrics analysis responses
+    if stage == "metrics":
+        return json.dumps({
+            "threshold_breaches": [
+                {
+                    "metric": "payment_service_availability",
+                    "value": "92%",
+                    "threshold": "99.9%",
+                    "severity": "Critical",
+                    "duration": "2 minutes"
+                },
+                {
+                    "metric": "checkout_error_rate",
+                    "value": "8%",
+                    "threshold": "1%",
+                    "severity": "Critical",
+                    "duration": "ongoing"
+                }
+            ],
+            "resource_constraints": [
+                "Payment service unavailable due to downstream failures",
+                "Circuit breaker limiting request flow to payment service",
+                "Latency increased 420% from baseline (p95: 4.2s)"
+            ],
+            "performance_anomalies": [
+                "checkout p95 latency 4.2s vs 1s baseline",
+                "checkout error rate 8% vs 0.5% baseline"
+            ],
+            "capacity_issues": [],
+            "trends": "Error rate and latency rising together since 18:45",
+            "performance_impact": "Error rate at 8%, latency increased 4x, user impact significant"
+        })
+
+    # Knowledge base responses
+    if stage == "knowledge_base":
+        return json.dumps({
+            "similar_incidents": [
+                {
+                    "id": "INC-2024-1203",
+                    "similarity": "0.92 - Downstream service degradation causing circuit breaker activation",
+                    "outcome": "Restored downstream service, circuit breaker auto-recovery",
+                    "date": "2024-12-01"
+                },
+                {
+                    "id": "INC-2024-0945",
+                    "similarity": "0.81 - Payment service timeout causing cascading failures",
+                    "outcome": "Increased timeout values and improved fallback handling",
+                    "date": "2024-11-10"
+                }
+            ],
+            "recurring_patterns": [
+                "Downstream service failures often trigger circuit breaker patterns",
+                "Payment service issues cascade to checkout service",
+                "Previous incidents resolved within 5-10 minutes with service restoration"
+            ],
+            "lessons_learned": ["Fallbacks for payment calls shorten checkout outages"],
+            "proven_strategies": ["Restore the downstream service and let the circuit breaker recover"],
+            "preventive_measures": ["Alert on circuit breaker state changes"]
+        })
+
+    # Root cause analysis responses
+    if stage == "root_cause":
+        return json.dumps({
+            "primary_cause": "PaymentService degradation causing cascading failures in CheckoutService",
+            "contributing_factors": [
+                "Payment service unable to process requests (503 errors)",
+                "CheckoutService circuit breaker correctly opened to protect from cascading failures",
+                "No fallback mechanism for checkout operations"
+            ],
+            "failure_chain": "PaymentService unavailability → CheckoutService calls fail → Circuit breaker opens → Checkout operations fail → User-visible errors",
+            "supporting_evidence": [
+                "Error logs show 503 errors from PaymentService",
+                "Circuit breaker state changed from closed to open at 18:45:05",
+                "Latency spike correlates with PaymentService failures",
+                "Metrics show payment_service_availability dropped to 92%"
+            ],
+            "confidence_level": "High",
+            "alternative_causes": ["Network partition between checkout and payment services"]
+        })
+
+    # Action recommendations responses
+    if stage == "actions":
+        return json.dumps({
+            "immediate_actions": [
+                {
+                    "action": "Investigate PaymentService availability and restore if degraded",
+                    "priority": "High",
+                    "estimated_time": "5 minutes",
+                    "risk": "Low - investigating existing issue"
+                },
+                {
+                    "action": "Monitor circuit breaker state for auto-recovery",
+                    "priority": "High",
+                    "estimated_time": "1 minute",
+                    "risk": "Low - monitoring only"
+                },
+                {
+                    "action": "Implement checkout service fallback or queue mechanism",
+                    "priority": "High",
+                    "estimated_time": "10 minutes",
+                    "risk": "Medium - requires code deployment"
+                }
+            ],
+            "long_term_actions": [
+                {
+                    "action": "Implement graceful degradation for payment service failures",
+                    "priority": "High",
+                    "estimated_effort": "1-2 days",
+                    "owner": "Backend Team"
+                },
+                {
+                    "action": "Add comprehensive circuit breaker monitoring and alerting",
+                    "priority": "High",
+                    "estimated_effort": "1 day",
+                    "owner": "SRE Team"
+                },
+                {
+                    "action": "Improve dependency health monitoring and runbooks",
+                    "priority": "Medium",
+                    "estimated_effort": "2 days",
+                    "owner": "SRE Team"
+                }
+            ],
+            "rollback_procedures": ["Revert the most recent PaymentService deployment if it preceded the errors"],
+            "monitoring_steps": ["Watch PaymentService availability and circuit breaker state"],
+            "validation_criteria": ["Checkout error rate back under 1% for 15 minutes"]
+        })
+
+    # Post-incident report responses
+    if stage == "report":
+        return json.dumps({
+            "incident_summary": "PaymentService degradation caused cascading CheckoutService failures affecting 5000+ users for 2 minutes",
+            "timeline": [
+                {"time": "18:45:02", "event": "PaymentService returned 503 Service Unavailable", "impact": "High"},
+                {"time": "18:45:05", "event": "CheckoutService circuit breaker opened", "impact": "High"},
+                {"time": "18:45:10", "event": "User-facing checkout errors began", "impact": "High"},
+                {"time": "18:45:15", "event": "Incident alert triggered", "impact": "Medium"},
+                {"time": "18:46:30", "event": "PaymentService restored", "impact": "Low"},
+                {"time": "18:47:00", "event": "Circuit breaker auto-recovered", "impact": "Low"},
+                {"time": "18:47:30", "event": "All services returned to normal", "impact": "Low"}
+            ],
+            "impact_analysis": {
+                "services_affected": ["checkout-service", "payment-service"],
+                "users_impacted": "5000+",
+                "business_impact": "Checkout unavailable for about 2 minutes",
+                "duration": "5 minutes 28 seconds"
+            },
+            "resolution_summary": "PaymentService was restored and the circuit breaker recovered automatically",
+            "lessons_learned": [
+                "Circuit breaker implementation correctly prevented cascading failures",
+                "Need better visibility into downstream service health",
+                "Fallback mechanisms needed for payment operations",
+                "Alert on circuit breaker state changes would enable faster response"
+            ],
+            "preventive_measures": [
+                "Implement service health probes for PaymentService",
+                "Add graceful degradation with fallback mechanisms",
+                "Improve monitoring of circuit breaker metrics",
+                "Create runbooks for common circuit breaker scenarios",
+                "Implement request queuing for payment operations"
+            ],
+            "action_items": [
+                {"action": "Deploy circuit breaker monitoring dashboard", "owner": "SRE Team", "due_date": "EOD"},
+                {"action": "Create PaymentService health probe", "owner": "Backend Team", "due_date": "24 hours"},
+                {"action": "Design graceful degradation strategy", "owner": "Backend Team", "due_date": "1 week"},
+                {"action": "Schedule post-mortem review", "owner": "Engineering", "due_date": "1 week"}
+            ]
+        })
+
+    # Generic analysis fallback for unmatched prompts
+    return json.dumps({
+        "analysis": "Service dependency issue detected with cascading failure pattern",
+        "severity": "P1",
+        "affected_services": ["checkout-service", "payment-service"],
+        "confidence": "High",
+        "recommendations": [
+            "Investigate downstream service health",
+            "Verify circuit breaker and fallback mechanisms",
+            "Review recent deployment changes",
+            "Follow up with platform/infrastructure team"
+        ]
+    })
 
 
 class MockOllamaLLM:
     """Mock LLM that simulates Ollama responses for demo purposes"""
     
-    def __init__(self, model: str = "llama3", **kwargs):
+    def __init__(self, model: str = "llama3", latency: Optional[LatencyProfile] = None, **kwargs):
         self.model = model
         self.temperature = kwargs.get("temperature", 0.2)
         self.timeout = kwargs.get("timeout", 120)
         self.base_url = kwargs.get("base_url", "mock://localhost")
+        self.latency = latency
         self.kwargs = kwargs
     
-    def invoke(self, prompt: str) -> str:
+    def invoke(self, prompt: str, **kwargs) -> str:
         """Generate mock response based on prompt content"""
-        prompt_lower = prompt.lower()
-        
-        # Simple health check
-        if prompt == "Hello":
-            return "Hello! I'm a mock LLM ready to help with incident analysis."
-        
-        # Alert triage responses
-        if ("alert" in prompt_lower and "triage" in prompt_lower) or ("alert" in prompt_lower and "severity" in prompt_lower):
-            return json.dumps({
-                "severity": "P1",
-                "business_impact": "High - Service degradation with significant user impact",
-                "affected_services": ["checkout-service", "payment-service"],
-                "escalation_needed": True,
-                "estimated_users_affected": 5000,
-                "priority_justification": "Circuit breaker opened on payment service causing cascading failures"
-            })
-        
-        # Log analysis responses
-        if ("log" in prompt_lower and "analysis" in prompt_lower) or ("log" in prompt_lower and "error" in prompt_lower):
-            return json.dumps({
-                "key_errors": [
-                    "503 Service Unavailable: PaymentService connection failed",
-                    "Circuit breaker opened for PaymentService",
-                    "Fallback response triggered for payment operations"
-                ],
-                "error_patterns": [
-                    "Payment service failures increasing since 18:45",
-                    "Checkout service error rate correlating with PaymentService availability",
-                    "Circuit breaker state changes detected"
-                ],
-                "timeline": [
-                    {"timestamp": "18:45:02", "severity": "ERROR", "event": "PaymentService 503 error"},
-                    {"timestamp": "18:45:05", "severity": "WARN", "event": "Circuit breaker opened"},
-                    {"timestamp": "18:45:10", "severity": "ERROR", "event": "Fallback response triggered"}
-                ]
-            })
-        
-        # Metrics analysis responses
-        if ("metrics" in prompt_lower and "analysis" in prompt_lower) or ("metrics" in prompt_lower and "threshold" in prompt_lower):
-            return json.dumps({
-                "threshold_breaches": [
-                    {
-                        "metric": "payment_service_availability",
-                        "value": "92%",
-                        "threshold": "99.9%",
-                        "severity": "Critical",
-                        "duration": "2 minutes"
-                    },
-                    {
-                        "metric": "checkout_error_rate",
-                        "value": "8%",
-                        "threshold": "1%",
-                        "severity": "Critical",
-                        "duration": "ongoing"
-                    }
-                ],
-                "resource_constraints": [
-                    "Payment service unavailable due to downstream failures",
-                    "Circuit breaker limiting request flow to payment service",
-                    "Latency increased 420% from baseline (p95: 4.2s)"
-                ],
-                "performance_impact": "Error rate at 8%, latency increased 4x, user impact significant"
-            })
-        
-        # Knowledge base responses
-        if ("knowledge" in prompt_lower or "historical" in prompt_lower or "similar" in prompt_lower):
-            return json.dumps({
-                "similar_incidents": [
-                    {
-                        "incident_id": "INC-2024-1203",
-                        "date": "2024-12-01",
-                        "similarity_score": 0.92,
-                        "root_cause": "Downstream service degradation causing circuit breaker activation",
-                        "resolution": "Restored downstream service, circuit breaker auto-recovery"
-                    },
-                    {
-                        "incident_id": "INC-2024-0945",
-                        "date": "2024-11-10",
-                        "similarity_score": 0.81,
-                        "root_cause": "Payment service timeout causing cascading failures",
-                        "resolution": "Increased timeout values and improved fallback handling"
-                    }
-                ],
-                "patterns": [
-                    "Downstream service failures often trigger circuit breaker patterns",
-                    "Payment service issues cascade to checkout service",
-                    "Previous incidents resolved within 5-10 minutes with service restoration"
-                ]
-            })
-        
-        # Root cause analysis responses
-        if "root cause" in prompt_lower or "determine" in prompt_lower:
-            return json.dumps({
-                "primary_cause": "PaymentService degradation causing cascading failures in CheckoutService",
-                "contributing_factors": [
-                    "Payment service unable to process requests (503 errors)",
-                    "CheckoutService circuit breaker correctly opened to protect from cascading failures",
-                    "No fallback mechanism for checkout operations"
-                ],
-                "failure_chain": "PaymentService unavailability → CheckoutService calls fail → Circuit breaker opens → Checkout operations fail → User-visible errors",
-                "supporting_evidence": [
-                    "Error logs show 503 errors from PaymentService",
-                    "Circuit breaker state changed from closed to open at 18:45:05",
-                    "Latency spike correlates with PaymentService failures",
-                    "Metrics show payment_service_availability dropped to 92%"
-                ],
-                "confidence_level": "Very High (95%)"
-            })
-        
-        # Action recommendations responses
-        if ("recommendation" in prompt_lower or "action" in prompt_lower) and ("immediate" in prompt_lower or "based on" in prompt_lower):
-            return json.dumps({
-                "immediate_actions": [
-                    {
-                        "action": "Investigate PaymentService availability and restore if degraded",
-                        "priority": "Critical",
-                        "estimated_time": "5 minutes",
-                        "risk": "Low - investigating existing issue"
-                    },
-                    {
-                        "action": "Monitor circuit breaker state for auto-recovery",
-                        "priority": "High",
-                        "estimated_time": "1 minute",
-                        "risk": "Low - monitoring only"
-                    },
-                    {
-                        "action": "Implement checkout service fallback or queue mechanism",
-                        "priority": "High",
-                        "estimated_time": "10 minutes",
-                        "risk": "Medium - requires code deployment"
-                    }
-                ],
-                "long_term_actions": [
-                    {
-                        "action": "Implement graceful degradation for payment service failures",
-                        "priority": "High",
-                        "estimated_effort": "1-2 days",
-                        "owner": "Backend Team"
-                    },
-                    {
-                        "action": "Add comprehensive circuit breaker monitoring and alerting",
-                        "priority": "High",
-                        "estimated_effort": "1 day",
-                        "owner": "SRE Team"
-                    },
-                    {
-                        "action": "Improve dependency health monitoring and runbooks",
-                        "priority": "Medium",
-                        "estimated_effort": "2 days",
-                        "owner": "SRE Team"
-                    }
-                ]
-            })
-        
-        # Post-incident report responses
-        if ("post-incident" in prompt_lower or "report" in prompt_lower) and ("based on" in prompt_lower or "analysis" in prompt_lower):
-            return json.dumps({
-                "incident_summary": "PaymentService degradation caused cascading CheckoutService failures affecting 5000+ users for 2 minutes",
-                "timeline": [
-                    "18:45:02 - PaymentService returned 503 Service Unavailable",
-                    "18:45:05 - CheckoutService circuit breaker opened",
-                    "18:45:10 - User-facing checkout errors began",
-                    "18:45:15 - Incident alert triggered",
-                    "18:46:30 - PaymentService restored",
-                    "18:47:00 - Circuit breaker auto-recovered",
-                    "18:47:30 - All services returned to normal"
-                ],
-                "lessons_learned": [
-                    "Circuit breaker implementation correctly prevented cascading failures",
-                    "Need better visibility into downstream service health",
-                    "Fallback mechanisms needed for payment operations",
-                    "Alert on circuit breaker state changes would enable faster response"
-                ],
-                "preventive_measures": [
-                    "Implement service health probes for PaymentService",
-                    "Add graceful degradation with fallback mechanisms",
-                    "Improve monitoring of circuit breaker metrics",
-                    "Create runbooks for common circuit breaker scenarios",
-                    "Implement request queuing for payment operations"
-                ],
-                "action_items": [
-                    "Deploy circuit breaker monitoring dashboard by EOD",
-                    "Create PaymentService health probe within 24 hours",
-                    "Design graceful degradation strategy within 1 week",
-                    "Schedule post-mortem review with engineering team"
-                ]
-            })
-        
-        # Generic analysis fallback for unmatched prompts
-        return json.dumps({
-            "analysis": "Service dependency issue detected with cascading failure pattern",
-            "severity": "P1",
-            "affected_services": ["checkout-service", "payment-service"],
-            "confidence": "High",
-            "recommendations": [
-                "Investigate downstream service health",
-                "Verify circuit breaker and fallback mechanisms",
-                "Review recent deployment changes",
-                "Follow up with platform/infrastructure team"
-            ]
-        })
+        response = self._respond(prompt)
+        if self.latency is not None:
+            time.sleep(self.latency.total_seconds(response))
+        return response
     
-    def stream(self, prompt: str) -> Iterator[str]:
-        """Stream response chunks (for streaming support)"""
-        response = self.invoke(prompt)
-        # Simulate streaming by yielding chunks
-        chunk_size = 50
+    async def ainvoke(self, prompt: str, **kwargs) -> str:
+        """Async variant of invoke; simulated latency does not block the event loop"""
+        response = self._respond(prompt)
+        if self.latency is not None:
+            await asyncio.sleep(self.latency.total_seconds(response))
+        return response
+    
+    def _respond(self, prompt: str) -> str:
+        return stage_response(route_stage(prompt))
+    
+    def _chunks(self, response: str, chunk_size: int = 50) -> Iterator[str]:
         for i in range(0, len(response), chunk_size):
             yield response[i:i + chunk_size]
     
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream response chunks (for streaming support)"""
+        response = self._respond(prompt)
+        if self.latency is not None:
+            time.sleep(self.latency.first_token_seconds())
+        # Simulate streaming by yielding chunks
+        for chunk in self._chunks(response):
+            if self.latency is not None:
+                time.sleep(self.latency.generation_seconds(chunk))
+            yield chunk
+    
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Async variant of stream"""
+        response = self._respond(prompt)
+        if self.latency is not None:
+            await asyncio.sleep(self.latency.first_token_seconds())
+        for chunk in self._chunks(response):
+            if self.latency is not None:
+                await asyncio.sleep(self.latency.generation_seconds(chunk))
+            yield chunk
+    
     def call(self, prompt: str, **kwargs) -> str:
         """Call the LLM (alias for invoke)"""
         return self.invoke(prompt)
@@ -259,5 +418,19 @@ def get_mock_llm(**kwargs) -> MockOllamaLLM:
     return MockOllamaLLM(**kwargs)
 
 
+_shared_mock_llm: Optional[MockOllamaLLM] = None
+
+
+def get_shared_mock_llm() -> MockOllamaLLM:
+    """Get the process-wide mock LLM used as the fallback backend"""
+    global _shared_mock_llm
+    if _shared_mock_llm is None:
+        latency = None
+        if MOCK_LLM_LATENCY or MOCK_LLM_TOKENS_PER_SECOND:
+            latency = LatencyProfile.parse(MOCK_LLM_LATENCY or "0", MOCK_LLM_TOKENS_PER_SECOND)
+        _shared_mock_llm = MockOllamaLLM(model="mock-llama3", latency=latency)
+    return _shared_mock_llm
+
+
 # Alias for backward compatibility with fallback in get_llm()
-__all__ = ['MockOllamaLLM', 'get_mock_llm']
+__all__ = ['LatencyProfile', 'MockOllamaLLM', 'get_mock_llm', 'get_shared_mock_llm', 'route_stage', 'stage_response']
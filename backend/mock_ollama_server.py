@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Mock Ollama Server
+Ollama-compatible HTTP stand-in with tunable latency, token rate, slots and fault injection for load-testing the real client stack
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import uvicorn
+
+from mock_llm import CHARS_PER_TOKEN, LatencyProfile, route_stage, stage_response
+
+
+# Word-sized pieces, streamed one per NDJSON line like Ollama's per-token chunks
+TOKEN_PIECE = re.compile(r"\s*\S+")
+
+
+class StandInConfig:
+    """Server knobs; every field can be changed at runtime through POST /admin/config"""
+
+    FIELDS = {
+        "models": list, "ttft": str, "tokens_per_second": float, "slots": int, "max_queue": int,
+        "error_rate": float, "timeout_rate": float, "hang_seconds": float,
+        "malformed_rate": float, "disconnect_rate": float, "seed": int,
+    }
+
+    def __init__(
+        self,
+        models: Optional[List[str]] = None,
+        ttft: str = "lognormal:200,0.4",
+        tokens_per_second: float = 40.0,
+        slots: int = 4,
+        max_queue: int = 512,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 600.0,
+        malformed_rate: float = 0.0,
+        disconnect_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.models = models or ["llama3.2", "llama3"]
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.slots = slots
+        self.max_queue = max_queue
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.malformed_rate = malformed_rate
+        self.disconnect_rate = disconnect_rate
+        self.seed = seed
+
+    def update(self, changes: Dict[str, Any]) -> None:
+        unknown = set(changes) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        for key, value in changes.items():
+            setattr(self, key, self.FIELDS[key](value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+
+class OllamaStandIn:
+    """
+    Serves /api/generate, /api/chat and /api/tags with mock stage responses
+
+    Requests hold one of `slots` generation slots (like OLLAMA_NUM_PARALLEL);
+    the rest wait in a queue, and beyond max_queue waiting requests get a 503
+    as Ollama does. Injected faults are drawn per request: a 500, a hang of
+    hang_seconds (for client timeouts), model output cut off mid-JSON, or a
+    stream dropped part-way.
+    """
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.latency = LatencyProfile.parse(config.ttft, config.tokens_per_second, config.seed)
+        self._random = random.Random(config.seed)
+        self._slots = asyncio.Semaphore(config.slots)
+        self.waiting = 0
+        self.active = 0
+        self.counters = {
+            "requests": 0, "completed": 0, "rejected_busy": 0, "injected_errors": 0,
+            "injected_timeouts": 0, "injected_malformed": 0, "injected_disconnects": 0
+        }
+        self.stages: Dict[str, int] = {}
+
+    def reconfigure(self, changes: Dict[str, Any]) -> None:
+        self.config.update(changes)
+        self.latency = LatencyProfile.parse(self.config.ttft, self.config.tokens_per_second, self.config.seed)
+        if "slots" in changes:
+            # Requests already holding or waiting on the old semaphore finish under it
+            self._slots = asyncio.Semaphore(self.config.slots)
+        if "seed" in changes:
+            self._random = random.Random(self.config.seed)
+
+    def _draw_fault(self) -> Optional[str]:
+        roll = self._random.random()
+        for fault, rate in (
+            ("error", self.config.error_rate),
+            ("timeout", self.config.timeout_rate),
+            ("malformed", self.config.malformed_rate),
+            ("disconnect", self.config.disconnect_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.counters,
+            "stages": dict(self.stages),
+            "config": self.config.to_dict()
+        }
+
+    async def generate(
+        self,
+        kind: str,
+        body: Dict[str, Any]
+    ):
+        """Shared handler for /api/generate (kind "generate") and /api/chat (kind "chat")"""
+        self.counters["requests"] += 1
+        model = body.get("model") or self.config.models[0]
+        if kind == "chat":
+            messages = body.get("messages") or []
+            prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        else:
+            prompt = str(body.get("prompt", ""))
+        stream = body.get("stream", True)
+
+        if model not in self.config.models and model.split(":")[0] not in self.config.models:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        if self.waiting >= self.config.max_queue:
+            self.counters["rejected_busy"] += 1
+            return JSONResponse({"error": "server busy, please try again.  maximum pending requests exceeded"},
+                                status_code=503)
+
+        fault = self._draw_fault()
+        if fault == "error":
+            self.counters["injected_errors"] += 1
+            return JSONResponse({"error": "injected failure: llama runner process has terminated"}, status_code=500)
+        if fault == "timeout":
+            self.counters["injected_timeouts"] += 1
+            await asyncio.sleep(self.config.hang_seconds)
+            return JSONResponse({"error": "injected timeout"}, status_code=504)
+
+        stage = route_stage(prompt)
+        self.stages[stage] = self.stages.get(stage, 0) + 1
+        text = stage_response(stage)
+        if fault == "malformed":
+            self.counters["injected_malformed"] += 1
+            text = text[:max(1, len(text) // 2)]
+        run = self._run(kind, model, prompt, text, drop_midway=fault == "disconnect")
+        if stream:
+            return StreamingResponse(run, media_type="application/x-ndjson")
+
+        final: Dict[str, Any] = {}
+        pieces = []
+        async for line in run:
+            chunk = json.loads(line)
+            pieces.append(chunk["message"]["content"] if kind == "chat" else chunk["response"])
+            final = chunk
+        if kind == "chat":
+            final["message"] = {"role": "assistant", "content": "".join(pieces)}
+        else:
+            final["response"] = "".join(pieces)
+        return JSONResponse(final)
+
+    async def _run(self, kind: str, model: str, prompt: str, text: str, drop_midway: bool) -> AsyncIterator[str]:
+        """Wait for a slot, then emit NDJSON chunks paced at the configured TTFT and token rate"""
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        slots = self._slots
+        self.active += 1
+        try:
+            started = time.perf_counter()
+            await asyncio.sleep(self.latency.first_token_seconds())
+            first_token_at = time.perf_counter()
+            pieces = TOKEN_PIECE.findall(text) or [text]
+            cutoff = len(pieces) // 2 if drop_midway else None
+            for index, piece in enumerate(pieces):
+                if cutoff is not None and index == cutoff:
+                    self.counters["injected_disconnects"] += 1
+                    raise ConnectionAbortedError("injected disconnect")
+                await asyncio.sleep(self.latency.generation_seconds(piece))
+                yield json.dumps(self._chunk(kind, model, piece, done=False)) + "\n"
+            finished = time.perf_counter()
+            final = self._chunk(kind, model, "", done=True)
+            final.update({
+                "done_reason": "stop",
+                "total_duration": int((finished - queued_at) * 1e9),
+                "load_duration": int((started - queued_at) * 1e9),
+                "prompt_eval_count": max(1, len(prompt) // CHARS_PER_TOKEN),
+                "prompt_eval_duration": int((first_token_at - started) * 1e9),
+                "eval_count": max(1, len(text) // CHARS_PER_TOKEN),
+                "eval_duration": int((finished - first_token_at) * 1e9)
+            })
+            self.counters["completed"] += 1
+            yield json.dumps(final) + "\n"
+        finally:
+            self.active -= 1
+            slots.release()
+
+    @staticmethod
+    def _chunk(kind: str, model: str, piece: str, done: bool) -> Dict[str, Any]:
+        chunk: Dict[str, Any] = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "done": done
+        }
+        if kind == "chat":
+            chunk["message"] = {"role": "assistant", "content": piece}
+        else:
+            chunk["response"] = piece
+        return chunk
+
+
+def create_app(config: Optional[StandInConfig] = None) -> FastAPI:
+    server = OllamaStandIn(config or StandInConfig())
+    app = FastAPI(title="Mock Ollama Server")
+    app.state.server = server
+
+    @app.get("/")
+    async def root():
+        return PlainTextResponse("Ollama is running")
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-standin"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [
+            {
+                "name": f"{name}:latest" if ":" not in name else name,
+                "model": f"{name}:latest" if ":" not in name else name,
+                "modified_at": "2024-12-22T00:00:00Z",
+                "size": 0,
+                "digest": "0" * 64,
+                "details": {"format": "gguf", "family": "mock", "parameter_size": "0B", "quantization_level": "none"}
+            }
+            for name in server.config.models
+        ]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await server.generate("generate", await request.json())
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await server.generate("chat", await request.json())
+
+    @app.get("/admin/stats")
+    async def admin_stats():
+        return server.stats()
+
+    @app.post("/admin/config")
+    async def admin_config(request: Request):
+        try:
+            server.reconfigure(await request.json())
+        except (TypeError, ValueError) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return server.config.to_dict()
+
+    return app
+
+
+def main() -> None:
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description="Serve the Ollama API with mock incident-analysis responses")
+    parser.add_argument("--host", default=env("MOCK_OLLAMA_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(env("MOCK_OLLAMA_PORT", "11434")))
+    parser.add_argument("--models", default=env("MOCK_OLLAMA_MODELS", "llama3.2,llama3"),
+                        help="Comma-separated model names reported by /api/tags")
+    parser.add_argument("--ttft", default=env("MOCK_OLLAMA_TTFT", "lognormal:200,0.4"),
+                        help="Time to first token: fixed:MS, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=float(env("MOCK_OLLAMA_TOKENS_PER_SECOND", "40")))
+    parser.add_argument("--slots", type=int, default=int(env("MOCK_OLLAMA_SLOTS", "4")),
+                        help="Concurrent generations; further requests queue")
+    parser.add_argument("--max-queue", type=int, default=int(env("MOCK_OLLAMA_MAX_QUEUE", "512")),
+                        help="Queued requests beyond which the server answers 503")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=600.0, help="How long a hanging request hangs")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of responses whose JSON output is cut off")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0,
+                        help="Fraction of streams dropped part-way")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        models=[name.strip() for name in args.models.split(",") if name.strip()],
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        slots=args.slots,
+        max_queue=args.max_queue,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        malformed_rate=args.malformed_rate,
+        disconnect_rate=args.disconnect_rate,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
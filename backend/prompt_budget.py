@@ -0,0 +1,179 @@
+"""
+Prompt Budgeting
+Compact canonical JSON for prompt sections with priority-based truncation to a token budget
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Token budget for the data embedded in each stage prompt
+STAGE_TOKEN_BUDGETS = {
+    "triage": 1500,
+    "logs": 6000,
+    "metrics": 3000,
+    "knowledge_base": 4000,
+    "root_cause": 3000,
+    "actions": 1500,
+    "report": 2500,
+}
+
+# Lower is more important; unlisted keys get DEFAULT_PRIORITY
+KEY_PRIORITY = {
+    # Errors, breaches and the conclusions built on them
+    "severity": 0, "affected_services": 0, "key_errors": 0, "threshold_breaches": 0,
+    "primary_cause": 0, "root_cause": 0, "immediate_actions": 0, "errors": 0,
+    "breaches": 0, "anomalies": 0, "level": 0, "message": 0, "service": 0,
+    # Supporting evidence
+    "error_patterns": 1, "failure_chain": 1, "contributing_factors": 1, "supporting_evidence": 1,
+    "resource_constraints": 1, "similar_incidents": 1, "timeline": 1, "urgency": 1,
+    "business_impact": 1, "long_term_actions": 1, "failure_indicators": 1, "performance_anomalies": 1,
+    "capacity_issues": 1, "confidence_level": 1, "templates": 1, "metrics": 1,
+    # Narrative that is nice to have
+    "lessons_learned": 3, "preventive_measures": 3, "patterns": 3, "trends": 3,
+    "priority_justification": 3, "stack_trace": 3, "metadata": 3, "recommendations": 3,
+    "action_items": 3, "log_correlation": 3, "performance_impact": 3,
+}
+DEFAULT_PRIORITY = 2
+
+ERROR_MARKERS = re.compile(r"error|exception|fatal|critical|breach|fail|timeout|oom|exhaust|refused|5\d\d", re.IGNORECASE)
+
+TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate without a model tokenizer
+
+    Counts word pieces of up to four characters plus punctuation, which tracks
+    BPE tokenizers closely enough for budgeting JSON and log text.
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def compact_json(value: Any) -> str:
+    """Canonical compact JSON (no whitespace, stable key order within objects)"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _element_priority(element: Any, inherited: int) -> int:
+    """Items that mention errors or breaches sort ahead of their siblings"""
+    text = element if isinstance(element, str) else compact_json(element)
+    return inherited * 2 + (0 if ERROR_MARKERS.search(text) else 1)
+
+
+def _collect_units(value: Any, path: Tuple, priority: int, units: List[tuple], depth: int = 0) -> None:
+    """Flatten value into (priority, order, path, cost) units that can be kept or dropped"""
+    if isinstance(value, dict) and depth < 3:
+        for key, child in value.items():
+            child_priority = KEY_PRIORITY.get(key, priority)
+            _collect_units(child, path + (key,), child_priority, units, depth + 1)
+    elif isinstance(value, list) and depth < 3:
+        for index, element in enumerate(value):
+            units.append((_element_priority(element, priority), len(units), path + (index,),
+                          estimate_tokens(compact_json(element)) + 1))
+    elif isinstance(value, str) and depth == 0 and "\n" in value:
+        # Raw multi-line text (e.g. log lines): each line is a unit
+        for index, line in enumerate(value.split("\n")):
+            units.append((_element_priority(line, priority), len(units), path + (index,),
+                          estimate_tokens(line) + 1))
+    else:
+        units.append((priority * 2, len(units), path, estimate_tokens(compact_json(value)) + 2))
+
+
+def _rebuild(value: Any, path: Tuple, kept: set, depth: int = 0) -> Tuple[Any, int]:
+    """Rebuild value keeping only kept unit paths; returns (value, omitted unit count)"""
+    if isinstance(value, dict) and depth < 3:
+        result, omitted = {}, 0
+        for key, child in value.items():
+            rebuilt, child_omitted = _rebuild(child, path + (key,), kept, depth + 1)
+            omitted += child_omitted
+            if rebuilt is not _DROPPED:
+                result[key] = rebuilt
+        return (result if result or not value else _DROPPED), omitted
+    if isinstance(value, list) and depth < 3:
+        result = [element for index, element in enumerate(value) if path + (index,) in kept]
+        omitted = len(value) - len(result)
+        return (result if result or not value else _DROPPED), omitted
+    if isinstance(value, str) and depth == 0 and "\n" in value:
+        lines = value.split("\n")
+        result = [line for index, line in enumerate(lines) if path + (index,) in kept]
+        return ("\n".join(result) if result else _DROPPED), len(lines) - len(result)
+    return (value if path in kept else _DROPPED), (0 if path in kept else 1)
+
+
+_DROPPED = object()
+
+
+def fit_to_budget(value: Any, budget_tokens: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Render value as compact JSON within budget_tokens
+
+    When the full rendering is over budget, the highest-priority units (errors,
+    breaches, conclusions) are kept first and lower-priority ones are dropped,
+    preserving the original order of what remains.
+
+    Returns:
+        (text, {"tokens", "original_tokens", "budget", "truncated", "omitted_items"})
+    """
+    text = compact_json(value)
+    tokens = estimate_tokens(text)
+    stats = {"tokens": tokens, "original_tokens": tokens, "budget": budget_tokens,
+             "truncated": False, "omitted_items": 0}
+    if tokens <= budget_tokens:
+        return text, stats
+
+    units: List[tuple] = []
+    _collect_units(value, (), DEFAULT_PRIORITY, units)
+    kept = set()
+    spent = 0
+    for priority, order, path, cost in sorted(units):
+        if spent + cost > budget_tokens:
+            continue
+        kept.add(path)
+        spent += cost
+
+    rebuilt, omitted = _rebuild(value, (), kept)
+    if rebuilt is _DROPPED:
+        rebuilt = "" if isinstance(value, str) else type(value)()
+    text = compact_json(rebuilt)
+    if isinstance(value, str) and len(text) == 0:
+        # A single oversized line: hard-truncate by characters
+        text = value[:budget_tokens * 3]
+    stats.update(tokens=estimate_tokens(text), truncated=True, omitted_items=omitted)
+    return text, stats
+
+
+def budget_sections(sections: Dict[str, Any], budget_tokens: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Fit several named prompt sections into one budget
+
+    Each section first gets an equal share; share left unused by small sections
+    is handed to the remaining ones in order of size.
+    """
+    remaining = budget_tokens
+    rendered: Dict[str, str] = {}
+    per_section: Dict[str, Any] = {}
+    pending = sorted(sections, key=lambda name: estimate_tokens(compact_json(sections[name])))
+    for position, name in enumerate(pending):
+        share = remaining // (len(pending) - position)
+        rendered[name], per_section[name] = fit_to_budget(sections[name], share)
+        remaining -= per_section[name]["tokens"]
+    stats = {
+        "tokens": sum(section["tokens"] for section in per_section.values()),
+        "original_tokens": sum(section["original_tokens"] for section in per_section.values()),
+        "budget": budget_tokens,
+        "truncated": any(section["truncated"] for section in per_section.values()),
+        "sections": per_section
+    }
+    return rendered, stats
+
+
+def stage_budget(stage: str, overrides: Optional[Dict[str, int]] = None) -> int:
+    """Token budget for a stage's embedded data"""
+    if overrides and stage in overrides:
+        return overrides[stage]
+    return STAGE_TOKEN_BUDGETS.get(stage, 3000)
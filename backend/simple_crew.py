@@ -3,168 +3,600 @@ Simplified Crew Implementation for Demo
 Bypasses CrewAI complexity and directly uses mock LLM responses
 """
 
+import asyncio
+import hashlib
 import json
-import re
+import os
+import time
+import uuid
 from datetime import datetime
-from typing import Dict, Any
-from llm_config import get_llm
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+from pydantic import ValidationError
+from llm_config import get_failover_llm
+from llm_cache import CachedLLM
+from knowledge_index import find_similar_incidents
+from incident_payload import parse_structured
+from json_stream import StreamingJSONExtractor
+from log_templates import summarize_logs
+from metrics_engine import metrics_engine, precomputed_metrics_analysis
+from triage_rules import triage_engine
+from prompt_budget import budget_sections, estimate_tokens, fit_to_budget, stage_budget
+from single_flight import SingleFlight
+from stage_graph import Stage, StageGraph
+from tasks.output_schemas import STAGE_SCHEMAS, stage_json_schema
+from instrumentation import (
+    ANALYSES_IN_FLIGHT, JSON_EXTRACTIONS, LLM_STREAM_FALLBACKS, PROMPT_CHARS, PROMPT_TOKENS, RESPONSE_CHARS,
+    RESPONSE_TOKENS, STAGE_REPAIRS, STAGE_SECONDS, STAGE_VALIDATIONS, in_flight
+)
+from tracing import set_span_attribute, span, trace_analysis
 
 
-def extract_json_from_text(text: str) -> Dict[str, Any]:
+# Repair retries per stage when the output fails its schema (0 disables repair)
+STAGE_OUTPUT_MAX_REPAIRS = int(os.environ.get("STAGE_OUTPUT_MAX_REPAIRS", "1"))
+# Send each stage's JSON schema as the backend's format constraint
+STAGE_OUTPUT_SCHEMA_FORMAT = os.environ.get("STAGE_OUTPUT_SCHEMA_FORMAT", "1") not in ("0", "false", "False")
+# How much of an invalid response is quoted back in the repair prompt
+REPAIR_RESPONSE_CHARS = 4000
+
+
+def extract_json_from_text(text: str, stage: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extract the first JSON object from a response, skipping markdown fences and narrative text.
+    Returns None if there is no JSON object.
+    """
+    extractor = StreamingJSONExtractor()
+    extractor.feed(text)
+    data = extractor.finish()
+    method = extractor.method or "none"
+    JSON_EXTRACTIONS.inc(stage or "unknown", method)
+    set_span_attribute("json_method", method)
+    return data
+
+
+def validate_stage_output(stage: str, text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     """
-    Extract JSON from text response, handling cases where LLM returns markdown or narrative text.
-    Falls back to mock response if extraction fails.
+    Extract and validate a stage response against its schema
+    
+    Returns (data, None) when valid, otherwise (None, a description of what is wrong).
     """
+    data = extract_json_from_text(text, stage)
+    if data is None:
+        STAGE_VALIDATIONS.inc(stage, "no_json")
+        return None, "The response did not contain a JSON object."
     try:
-        # Try direct JSON parsing first
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # If not pure JSON, try to extract JSON from markdown code blocks
-        json_match = re.search(r'```(?:json)?\n?(.*?)\n?```', text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except json.JSONDecodeError:
-                pass
-        
-        # If still no valid JSON, return a safe generic response
-        from mock_llm import get_mock_llm
-        mock_llm = get_mock_llm()
-        # Use the mock LLM for this response
-        return json.loads(mock_llm.invoke("analysis"))
+        output = STAGE_SCHEMAS[stage].model_validate(data)
+    except ValidationError as e:
+        STAGE_VALIDATIONS.inc(stage, "schema_mismatch")
+        problems = [
+            f"- {'.'.join(str(part) for part in error['loc']) or '(root)'}: {error['msg']}"
+            for error in e.errors(include_url=False)
+        ]
+        return None, "The JSON object does not match the required schema:\n" + "\n".join(problems)
+    STAGE_VALIDATIONS.inc(stage, "valid")
+    return output.model_dump(), None
+
+
+def build_repair_prompt(prompt: str, response: str, problem: str) -> str:
+    """Follow-up prompt asking the LLM to fix only what was wrong with its previous answer"""
+    if len(response) > REPAIR_RESPONSE_CHARS:
+        response = response[:REPAIR_RESPONSE_CHARS] + "\n...[truncated]"
+    return f"""{prompt}
+
+Your previous answer could not be used.
 
+Previous answer:
+{response}
+
+Problems:
+{problem}
+
+Return ONLY the corrected JSON object with every required field, no other text."""
 
 
 class SimpleIncidentAnalysisCrew:
     """Simplified incident analysis crew using mock LLM"""
     
-    def __init__(self):
-        self.llm = get_llm()
+    # Stage name -> (upstream stages, label used in parse errors)
+    STAGES = {
+        "triage": ((), "triage"),
+        "logs": ((), "log analysis"),
+        "metrics": ((), "metrics analysis"),
+        "knowledge_base": ((), "knowledge base"),
+        "root_cause": (("triage", "logs", "metrics", "knowledge_base"), "root cause analysis"),
+        "actions": (("triage", "root_cause"), "action recommendations"),
+        "report": (("triage", "root_cause", "actions"), "post-incident report"),
+    }
+    
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        llm=None,
+        kb_top_k: int = 3,
+        token_budgets: Optional[Dict[str, int]] = None,
+        metrics_mode: str = "assisted",
+        fast_triage: bool = True,
+        max_repairs: int = STAGE_OUTPUT_MAX_REPAIRS,
+        schema_format: bool = STAGE_OUTPUT_SCHEMA_FORMAT
+    ):
+        # Wrap the LLM so replayed alerts and demo re-runs are served from cache
+        self.llm = CachedLLM(llm if llm is not None else get_failover_llm())
+        # Identical prompts in flight at the same time (duplicate alerts in a batch) share one call
+        self.prompt_flight = SingleFlight(reuse_window_seconds=0)
+        self.max_concurrency = max_concurrency
+        self.kb_top_k = kb_top_k
+        self.token_budgets = token_budgets or {}
+        # "assisted": engine findings go into the metrics prompt; "precomputed": they replace the LLM call
+        self.metrics_mode = metrics_mode
+        # Confident rule-based triage skips the LLM triage call
+        self.fast_triage = fast_triage
+        # Invalid stage output gets this many targeted repair retries before the stage fails
+        self.max_repairs = max_repairs
+        self.schema_format = schema_format
+    
+    def prepare_inputs(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parse the incident payload once per analysis
+        
+        Raw logs are mined into templates here so that the log and knowledge base
+        stages see a bounded summary however many lines were submitted, metric
+        thresholds and anomalies are computed up front by the metrics engine, and
+        the alert gets a rule-based triage assessment.
+        """
+        metrics_data = parse_structured(incident_data.get("metrics", ""))
+        alert_data = parse_structured(incident_data.get("alert", ""))
+        return {
+            "incident": incident_data,
+            "alert": alert_data,
+            "triage_assessment": triage_engine.assess(alert_data) if self.fast_triage else None,
+            "logs": summarize_logs(parse_structured(incident_data.get("logs", ""))),
+            "metrics": metrics_data,
+            "metrics_report": metrics_engine.analyze(metrics_data),
+            "metrics_mode": incident_data.get("metrics_mode") or self.metrics_mode
+        }
     
-    def analyze_incident(self, incident_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze incident using sequential agent workflow"""
+    def _build_prompt(self, stage: str, inputs: Dict[str, Any], upstream: Dict[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the prompt for a stage from the prepared inputs and upstream stage outputs
         
-        # Extract data from incident_data
-        alert_data = incident_data.get("alert", "")
-        log_data = incident_data.get("logs", "")
-        metrics_data = incident_data.get("metrics", "")
+        Embedded data is compact canonical JSON fitted to the stage's token budget;
+        downstream stages get the parsed upstream outputs rather than raw responses.
         
-        # Step 1: Alert Triage
-        triage_prompt = f"""
+        Returns:
+            (prompt, token stats for the embedded data)
+        """
+        budget = stage_budget(stage, self.token_budgets)
+        
+        alert_data = inputs["alert"]
+        log_data = inputs["logs"]
+        metrics_data = inputs["metrics"]
+        
+        if stage == "triage":
+            alert_text, stats = fit_to_budget(alert_data, budget)
+            return f"""
         Analyze this alert for triage and severity assessment.
         Return ONLY a valid JSON object with no additional text.
         
-        Alert Data: {alert_data}
+        Alert Data: {alert_text}
         
         Provide triage analysis including severity, business impact, and affected services.
-        """
-        triage_response = self.llm.invoke(triage_prompt)
-        try:
-            triage_data = extract_json_from_text(triage_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse triage response: {triage_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 2: Log Analysis
-        log_prompt = f"""
+        if stage == "logs":
+            log_text, stats = fit_to_budget(log_data, budget)
+            return f"""
         Analyze these logs for error patterns and timeline.
         Return ONLY a valid JSON object with no additional text.
         
-        Log Data: {log_data}
+        Log Data (recurring messages grouped into templates with counts): {log_text}
         
         Provide log analysis including key errors, patterns, and timeline.
-        """
-        log_response = self.llm.invoke(log_prompt)
-        try:
-            log_data_parsed = extract_json_from_text(log_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse log analysis response: {log_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 3: Metrics Analysis
-        metrics_prompt = f"""
+        if stage == "metrics":
+            report = inputs["metrics_report"]
+            sections, stats = budget_sections({
+                "breaches": {
+                    "threshold_breaches": report["threshold_breaches"],
+                    "anomalies": report["performance_anomalies"]
+                },
+                "metrics": metrics_data
+            }, budget)
+            return f"""
         Analyze these metrics for performance issues and thresholds.
         Return ONLY a valid JSON object with no additional text.
         
-        Metrics Data: {metrics_data}
+        Metrics Data: {sections["metrics"]}
+        
+        Precomputed threshold breaches and baseline anomalies (use these values as-is): {sections["breaches"]}
         
         Provide metrics analysis including threshold breaches and resource constraints.
-        """
-        metrics_response = self.llm.invoke(metrics_prompt)
-        try:
-            metrics_data_parsed = extract_json_from_text(metrics_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse metrics analysis response: {metrics_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 4: Knowledge Base Correlation
-        kb_prompt = f"""
+        if stage == "knowledge_base":
+            # Only the top-k retrieved incidents go into the prompt, never the whole history
+            sections, stats = budget_sections({
+                "alert": alert_data,
+                "logs": log_data,
+                "metrics": metrics_data,
+                "similar_incidents": find_similar_incidents(inputs["incident"], k=self.kb_top_k)
+            }, budget)
+            return f"""
         Search knowledge base for similar incidents based on data provided.
         Return ONLY a valid JSON object with no additional text.
         
-        Alert: {alert_data}
-        Logs: {log_data}
-        Metrics: {metrics_data}
+        Alert: {sections["alert"]}
+        Logs: {sections["logs"]}
+        Metrics: {sections["metrics"]}
+        
+        Most similar past incidents (ranked by similarity_score):
+        {sections["similar_incidents"]}
         
         Provide historical incident correlation and patterns.
-        """
-        kb_response = self.llm.invoke(kb_prompt)
-        try:
-            kb_data = extract_json_from_text(kb_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse knowledge base response: {kb_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 5: Root Cause Analysis
-        rca_prompt = f"""
+        if stage == "root_cause":
+            sections, stats = budget_sections({
+                name: upstream[name]["data"] for name in ("triage", "logs", "metrics", "knowledge_base")
+            }, budget)
+            return f"""
         Determine root cause based on all available data.
         Return ONLY a valid JSON object with no additional text.
         
-        Triage: {triage_response}
-        Logs: {log_response}
-        Metrics: {metrics_response}
-        Knowledge: {kb_response}
+        Triage: {sections["triage"]}
+        Logs: {sections["logs"]}
+        Metrics: {sections["metrics"]}
+        Knowledge: {sections["knowledge_base"]}
         
         Provide comprehensive root cause analysis.
-        """
-        rca_response = self.llm.invoke(rca_prompt)
-        try:
-            rca_data = extract_json_from_text(rca_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse root cause analysis response: {rca_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 6: Action Recommendations
-        action_prompt = f"""
+        if stage == "actions":
+            rca_text, stats = fit_to_budget(upstream["root_cause"]["data"], budget)
+            return f"""
         Recommend immediate and long-term actions based on root cause analysis.
         Return ONLY a valid JSON object with no additional text.
         
-        Root Cause: {rca_response}
-        Severity: {triage_data.get('severity', 'Unknown')}
+        Root Cause: {rca_text}
+        Severity: {upstream["triage"]["data"].get('severity', 'Unknown')}
         
         Provide actionable recommendations with priorities and timelines.
-        """
-        action_response = self.llm.invoke(action_prompt)
-        try:
-            action_data = extract_json_from_text(action_response)
-        except Exception as e:
-            raise ValueError(f"Failed to parse action recommendations response: {action_response}. Error: {str(e)}")
+        """, stats
         
-        # Step 7: Post-Incident Report
-        report_prompt = f"""
+        if stage == "report":
+            sections, stats = budget_sections({
+                name: upstream[name]["data"] for name in ("triage", "root_cause", "actions")
+            }, budget)
+            return f"""
         Generate post-incident report based on complete analysis.
         Return ONLY a valid JSON object with no additional text.
         
-        Incident Summary: {triage_response}
-        Root Cause: {rca_response}
-        Actions Taken: {action_response}
+        Incident Summary: {sections["triage"]}
+        Root Cause: {sections["root_cause"]}
+        Actions Taken: {sections["actions"]}
         
         Provide comprehensive post-incident report with lessons learned.
+        """, stats
+        
+        raise ValueError(f"Unknown stage: {stage}")
+    
+    def _format_options(self, stage: str) -> Dict[str, Any]:
+        """Per-call LLM options constraining the stage's output to its schema"""
+        return {"format": stage_json_schema(stage)} if self.schema_format else {}
+    
+    def _check_output(self, stage: str, prompt: str, response: str, attempt: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Validate one attempt's output, dropping it from the cache and counting the repair outcome"""
+        with span("validate_output", response_chars=len(response)):
+            data, problem = validate_stage_output(stage, response)
+        if data is None:
+            # An unusable response must not be replayed from cache
+            self.llm.discard(prompt, stage, **self._format_options(stage))
+        if attempt > 0:
+            STAGE_REPAIRS.inc(stage, "succeeded" if data is not None else "failed")
+        return data, problem
+    
+    def _invalid_output(self, stage: str, response: str, problem: str) -> ValueError:
+        label = self.STAGES[stage][1]
+        return ValueError(f"Failed to parse {label} response: {response}. Error: {problem}")
+    
+    @staticmethod
+    def _attempt_span(attempt: int, prompt: str):
+        if attempt == 0:
+            return span("llm.stream", prompt_chars=len(prompt))
+        return span("llm.repair", prompt_chars=len(prompt), attempt=attempt)
+    
+    def _generate_stage(self, stage: str, prompt: str) -> Tuple[str, Dict[str, Any]]:
+        """Generate a stage's output, retrying with a repair prompt while it fails validation"""
+        attempt_prompt = prompt
+        for attempt in range(self.max_repairs + 1):
+            with self._attempt_span(attempt, attempt_prompt):
+                response = self._stream_response(attempt_prompt, stage)
+            data, problem = self._check_output(stage, attempt_prompt, response, attempt)
+            if data is not None:
+                return response, data
+            attempt_prompt = build_repair_prompt(prompt, response, problem)
+        raise self._invalid_output(stage, response, problem)
+    
+    async def _agenerate_stage(
+        self,
+        stage: str,
+        prompt: str,
+        on_token: Optional[Callable[[str, str], None]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Async variant of _generate_stage"""
+        attempt_prompt = prompt
+        for attempt in range(self.max_repairs + 1):
+            with self._attempt_span(attempt, attempt_prompt):
+                response = await self._astream_response(attempt_prompt, stage, on_token)
+            data, problem = self._check_output(stage, attempt_prompt, response, attempt)
+            if data is not None:
+                return response, data
+            attempt_prompt = build_repair_prompt(prompt, response, problem)
+        raise self._invalid_output(stage, response, problem)
+    
+    def _parse_stage(
+        self,
+        stage: str,
+        response: str,
+        data: Dict[str, Any],
+        prompt: str,
+        prompt_stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build a stage result from its validated output"""
+        prompt_tokens = estimate_tokens(prompt)
+        PROMPT_CHARS.inc(stage, amount=len(prompt))
+        PROMPT_TOKENS.inc(stage, amount=prompt_tokens)
+        RESPONSE_CHARS.inc(stage, amount=len(response))
+        RESPONSE_TOKENS.inc(stage, amount=estimate_tokens(response))
+        return {
+            "response": response,
+            "data": data,
+            "prompt_tokens": {
+                "prompt": prompt_tokens,
+                "data": prompt_stats["tokens"],
+                "data_before_compaction": prompt_stats["original_tokens"],
+                "budget": prompt_stats["budget"],
+                "truncated": prompt_stats["truncated"]
+            }
+        }
+    
+    @staticmethod
+    def _precomputed_stage(stage: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stage result computed without the LLM (confident rule triage, precomputed metrics)"""
+        assessment = inputs["triage_assessment"]
+        if stage == "triage" and assessment and assessment["fast_path"]:
+            data = assessment
+        elif stage == "metrics" and inputs["metrics_mode"] == "precomputed":
+            data = precomputed_metrics_analysis(inputs["metrics_report"])
+        else:
+            return None
+        # Same shape as a validated LLM answer, whichever way the stage ran
+        data = STAGE_SCHEMAS[stage].model_validate(data).model_dump()
+        response = json.dumps(data)
+        return {
+            "response": response,
+            "data": data,
+            "prompt_tokens": {"prompt": 0, "data": 0, "data_before_compaction": 0, "budget": 0,
+                              "truncated": False, "precomputed": True},
+            "fingerprint": hashlib.sha256(f"{stage}:{response}".encode("utf-8")).hexdigest()
+        }
+    
+    @staticmethod
+    def _observe_stage(stage: str, outcome: str, started: float, result: Dict[str, Any]) -> Dict[str, Any]:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage, outcome)
+        set_span_attribute("outcome", outcome)
+        return result
+    
+    @staticmethod
+    def _memo_lookup(stage: str, fingerprint: str, memo: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Previous result of this stage for the same incident, if its prompt is unchanged"""
+        cached = memo.get(stage) if memo is not None else None
+        if cached is not None and cached.get("fingerprint") == fingerprint:
+            return {**cached, "reused": True}
+        return None
+    
+    @staticmethod
+    def _memo_store(stage: str, result: Dict[str, Any], memo: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if memo is not None:
+            memo[stage] = {key: value for key, value in result.items() if key != "reused"}
+        return result
+    
+    @staticmethod
+    def _stream_broken(stage: str, error: Exception) -> None:
+        LLM_STREAM_FALLBACKS.inc(stage)
+        set_span_attribute("stream_broken", True)
+        print(f"Stream for stage {stage} broke part-way ({error!r}), retrying without streaming")
+    
+    def _stream_response(self, prompt: str, stage: str) -> str:
         """
-        report_response = self.llm.invoke(report_prompt)
+        Stream a stage's generation, cancelling it once a complete JSON object has arrived
+        
+        A backend can only fail over before its first chunk, so a stream that breaks
+        part-way is discarded and the prompt re-run through invoke, which fails over
+        to the next backend and finally the mock.
+        """
+        extractor = StreamingJSONExtractor()
+        chunks = []
+        until = lambda text: extractor.feed(text) is not None
+        try:
+            for chunk in self.llm.stream(prompt, stage=stage, until=until, **self._format_options(stage)):
+                chunks.append(chunk)
+        except Exception as e:
+            self._stream_broken(stage, e)
+            return self.llm.invoke(prompt, stage=stage, **self._format_options(stage))
+        return "".join(chunks)
+    
+    async def _astream_response(
+        self,
+        prompt: str,
+        stage: str,
+        on_token: Optional[Callable[[str, str], None]] = None
+    ) -> str:
+        """
+        Async variant of _stream_response, relaying chunks to on_token when given
+        
+        Once chunks have been relayed a broken stream cannot be taken back, so it
+        is only retried when on_token has not seen any.
+        """
+        extractor = StreamingJSONExtractor()
+        chunks = []
+        until = lambda text: extractor.feed(text) is not None
         try:
-            report_data = extract_json_from_text(report_response)
+            async for chunk in self.llm.astream(prompt, stage=stage, until=until, **self._format_options(stage)):
+                chunks.append(chunk)
+                if on_token is not None:
+                    on_token(stage, chunk)
         except Exception as e:
-            raise ValueError(f"Failed to parse post-incident report response: {report_response}. Error: {str(e)}")
+            if on_token is not None and chunks:
+                raise
+            self._stream_broken(stage, e)
+            response = await self.llm.ainvoke(prompt, stage=stage, **self._format_options(stage))
+            if on_token is not None:
+                on_token(stage, response)
+            return response
+        return "".join(chunks)
+    
+    def _run_stage(
+        self,
+        stage: str,
+        inputs: Dict[str, Any],
+        upstream: Dict[str, Dict[str, Any]],
+        memo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run a single stage: build its prompt, call the LLM and parse the output"""
+        started = time.perf_counter()
+        with span(f"stage.{stage}", stage=stage):
+            precomputed = self._precomputed_stage(stage, inputs)
+            if precomputed is not None:
+                return self._observe_stage(stage, "precomputed", started, self._memo_store(stage, precomputed, memo))
+            with span("build_prompt"):
+                prompt, prompt_stats = self._build_prompt(stage, inputs, upstream)
+                # The prompt covers every input the stage sees, including upstream results
+                fingerprint = self.llm.cache_key(prompt, stage)
+            reused = self._memo_lookup(stage, fingerprint, memo)
+            if reused is not None:
+                return self._observe_stage(stage, "reused", started, reused)
+            response, data = self._generate_stage(stage, prompt)
+            result = self._parse_stage(stage, response, data, prompt, prompt_stats)
+            result["fingerprint"] = fingerprint
+            return self._observe_stage(stage, "llm", started, self._memo_store(stage, result, memo))
+    
+    async def _arun_stage(
+        self,
+        stage: str,
+        inputs: Dict[str, Any],
+        upstream: Dict[str, Dict[str, Any]],
+        on_token: Optional[Callable[[str, str], None]] = None,
+        memo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Async variant of _run_stage that never blocks the event loop"""
+        started = time.perf_counter()
+        with span(f"stage.{stage}", stage=stage):
+            precomputed = self._precomputed_stage(stage, inputs)
+            if precomputed is not None:
+                return self._observe_stage(stage, "precomputed", started, self._memo_store(stage, precomputed, memo))
+            with span("build_prompt"):
+                prompt, prompt_stats = self._build_prompt(stage, inputs, upstream)
+                fingerprint = self.llm.cache_key(prompt, stage)
+            reused = self._memo_lookup(stage, fingerprint, memo)
+            if reused is not None:
+                return self._observe_stage(stage, "reused", started, reused)
+            if on_token is None:
+                # Callers sharing a prompt also share its validation and any repair
+                response, data = await self.prompt_flight.do(
+                    fingerprint,
+                    lambda: self._agenerate_stage(stage, prompt)
+                )
+            else:
+                # Relay token-level chunks (repair attempts included) as they are generated
+                response, data = await self._agenerate_stage(stage, prompt, on_token)
+            result = self._parse_stage(stage, response, data, prompt, prompt_stats)
+            result["fingerprint"] = fingerprint
+            return self._observe_stage(stage, "llm", started, self._memo_store(stage, result, memo))
+    
+    def build_graph(
+        self,
+        incident_data: Dict[str, Any],
+        use_async: bool = False,
+        on_token: Optional[Callable[[str, str], None]] = None,
+        inputs: Optional[Dict[str, Any]] = None,
+        memo: Optional[Dict[str, Any]] = None
+    ) -> StageGraph:
+        """Build the stage dependency graph for one incident"""
+        if inputs is None:
+            with span("prepare_inputs"):
+                inputs = self.prepare_inputs(incident_data)
+        if use_async:
+            run_stage = partial(self._arun_stage, on_token=on_token, memo=memo)
+        else:
+            run_stage = partial(self._run_stage, memo=memo)
+        return StageGraph([
+            Stage(name, partial(run_stage, name, inputs), deps)
+            for name, (deps, _) in self.STAGES.items()
+        ])
+    
+    def analyze_incident(
+        self,
+        incident_data: Dict[str, Any],
+        memo: Optional[Dict[str, Any]] = None,
+        incident_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze incident by running the agent stages as a dependency graph"""
+        incident_id = incident_id or self.new_incident_id()
+        
+        # Triage, logs, metrics and knowledge base run in parallel;
+        # root cause, actions and report start as soon as their inputs are ready
+        with in_flight(ANALYSES_IN_FLIGHT), trace_analysis(incident_id, "analyze_incident", mode="sync"):
+            stage_results = self.build_graph(incident_data, memo=memo).run(max_concurrency=self.max_concurrency)
+            return self._assemble_result(stage_results, incident_id)
+    
+    async def analyze_incident_async(
+        self,
+        incident_data: Dict[str, Any],
+        on_stage_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        on_token: Optional[Callable[[str, str], None]] = None,
+        incident_id: Optional[str] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+        memo: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze incident on the event loop; same result as analyze_incident
+        
+        Args:
+            incident_data: Dictionary containing alert, logs, and metrics data
+            on_stage_complete: Called with (stage, {"response", "data"}) as each stage finishes
+            on_token: When given, stages stream from the LLM and relay (stage, chunk)
+            incident_id: Pre-assigned incident ID (generated when omitted)
+            limiter: Stage concurrency limit shared with other analyses (e.g. a batch)
+            memo: Per-incident stage results from a previous run, updated in place; stages
+                whose prompt is unchanged are reused instead of re-run
+        """
+        incident_id = incident_id or self.new_incident_id()
+        with in_flight(ANALYSES_IN_FLIGHT), trace_analysis(incident_id, "analyze_incident", mode="async"):
+            # Log mining is CPU-bound on large payloads; keep it off the event loop
+            with span("prepare_inputs"):
+                inputs = await asyncio.to_thread(self.prepare_inputs, incident_data)
+            graph = self.build_graph(incident_data, use_async=True, on_token=on_token, inputs=inputs, memo=memo)
+            stage_results = await graph.run_async(
+                max_concurrency=self.max_concurrency,
+                on_stage_complete=on_stage_complete,
+                semaphore=limiter
+            )
+            return self._assemble_result(stage_results, incident_id)
+    
+    @staticmethod
+    def new_incident_id() -> str:
+        """Generate an incident ID; the random suffix keeps IDs unique under concurrency"""
+        return f"INC-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}"
+    
+    def _assemble_result(self, stage_results: Dict[str, Dict[str, Any]], incident_id: Optional[str] = None) -> Dict[str, Any]:
+        """Combine stage outputs into the final analysis result"""
+        triage_data = stage_results["triage"]["data"]
+        rca_data = stage_results["root_cause"]["data"]
         
         # Combine all results
         return {
-            "incident_id": f"INC-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+            "incident_id": incident_id or self.new_incident_id(),
             "timestamp": datetime.now().isoformat(),
             "summary": {
                 "title": f"Memory leak causing service degradation - {triage_data.get('severity', 'P1')}",
@@ -174,11 +606,13 @@ class SimpleIncidentAnalysisCrew:
             },
             "triage": triage_data,
             "analysis": {
-                "logs": log_data_parsed,
-                "metrics": metrics_data_parsed,
-                "knowledge_base": kb_data
+                "logs": stage_results["logs"]["data"],
+                "metrics": stage_results["metrics"]["data"],
+                "knowledge_base": stage_results["knowledge_base"]["data"]
             },
             "root_cause": rca_data,
-            "recommendations": action_data,
-            "post_incident_report": report_data
-        }
\ No newline at end of file
+            "recommendations": stage_results["actions"]["data"],
+            "post_incident_report": stage_results["report"]["data"],
+            "prompt_stats": {stage: result["prompt_tokens"] for stage, result in stage_results.items()},
+            "reused_stages": [stage for stage, result in stage_results.items() if result.get("reused")]
+        }
@@ -0,0 +1,105 @@
+"""
+Single-Flight Request Coalescing
+Collapses identical concurrent analyses into one execution shared by all callers
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls that share a key
+
+    The first caller for a key (the leader) starts the work; callers arriving while
+    it runs await the same result. Successful results are reused for
+    reuse_window_seconds after completion. Failures are shared with the callers
+    waiting at that moment but never reused. A caller that is cancelled stops
+    waiting without affecting the others; once every caller has been cancelled
+    the work itself is cancelled, since nobody is left to use its result.
+    """
+
+    def __init__(self, reuse_window_seconds: float = 10.0, max_recent: int = 1024):
+        self.reuse_window_seconds = reuse_window_seconds
+        self.max_recent = max_recent
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._recent: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {"requests": 0, "executions": 0, "coalesced": 0, "reused": 0, "failures": 0,
+                          "abandoned": 0}
+
+    def _recent_result(self, key: str):
+        entry = self._recent.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._recent[key]
+            return None
+        return entry
+
+    def _remember(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._counters["failures"] += 1
+            return
+        if self.reuse_window_seconds > 0:
+            self._recent[key] = (task.result(), time.monotonic() + self.reuse_window_seconds)
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once per key across concurrent callers and return its result"""
+        self._counters["requests"] += 1
+
+        entry = self._recent_result(key)
+        if entry is not None:
+            self._counters["reused"] += 1
+            return entry[0]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._remember(key, t))
+
+        # Shield so one caller disconnecting doesn't cancel the shared analysis
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # The last caller was cancelled: stop the work rather than finish it for nobody
+                    self._abandon(key, task)
+
+    def _abandon(self, key: str, task: asyncio.Task) -> None:
+        self._counters["abandoned"] += 1
+        # Callers arriving from now on start a fresh execution
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for coalescing effectiveness"""
+        deduplicated = self._counters["coalesced"] + self._counters["reused"]
+        requests = self._counters["requests"]
+        return {
+            **self._counters,
+            "deduplicated": deduplicated,
+            "dedup_rate": round(deduplicated / requests, 4) if requests else 0.0,
+            "in_flight": len(self._in_flight),
+            "recent_results": len(self._recent),
+            "reuse_window_seconds": self.reuse_window_seconds
+        }
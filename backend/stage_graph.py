@@ -0,0 +1,151 @@
+"""
+Stage Graph Executor
+Runs analysis stages as a dependency DAG so independent stages execute concurrently
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Stage:
+    """A single node in the stage graph"""
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class StageGraph:
+    """Dependency graph of analysis stages with bounded parallel execution"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+        self._validate()
+
+    def _validate(self) -> None:
+        """Reject unknown dependencies and cycles"""
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self.topological_order()
+
+    def topological_order(self) -> List[str]:
+        """Return stage names in a valid execution order (declaration order among peers)"""
+        order: List[str] = []
+        done = set()
+        pending = list(self.stages)
+        while pending:
+            ready = [name for name in pending if all(dep in done for dep in self.stages[name].deps)]
+            if not ready:
+                raise ValueError(f"Cycle detected between stages: {pending}")
+            for name in ready:
+                order.append(name)
+                done.add(name)
+                pending.remove(name)
+        return order
+
+    def _ready(self, done: Dict[str, Any], started: set) -> List[str]:
+        return [
+            name for name, stage in self.stages.items()
+            if name not in started and all(dep in done for dep in stage.deps)
+        ]
+
+    def run(
+        self,
+        max_concurrency: int = 4,
+        on_stage_complete: Optional[Callable[[str, Any], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute all stages, starting each one as soon as its dependencies finish
+
+        Args:
+            max_concurrency: Upper bound on stages (LLM calls) in flight at once
+            on_stage_complete: Optional callback invoked with (stage_name, result)
+
+        Returns:
+            Mapping of stage name to stage result
+        """
+        results: Dict[str, Any] = {}
+        started: set = set()
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            in_flight = {}
+
+            def submit_ready():
+                for name in self._ready(results, started):
+                    started.add(name)
+                    stage = self.stages[name]
+                    deps = {dep: results[dep] for dep in stage.deps}
+                    # Run in a copy of the caller's context so tracing spans nest under the analysis
+                    context = contextvars.copy_context()
+                    in_flight[executor.submit(context.run, stage.fn, deps)] = name
+
+            submit_ready()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = in_flight.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise
+                    if on_stage_complete:
+                        on_stage_complete(name, results[name])
+                submit_ready()
+
+        return results
+
+    async def run_async(
+        self,
+        max_concurrency: int = 4,
+        on_stage_complete: Optional[Callable[[str, Any], None]] = None,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute all stages on the event loop; stage functions must be coroutine functions
+
+        Args:
+            max_concurrency: Upper bound on stages (LLM calls) in flight at once
+            on_stage_complete: Optional callback invoked with (stage_name, result)
+            semaphore: Limit shared with other graphs (e.g. a batch); replaces max_concurrency
+
+        Returns:
+            Mapping of stage name to stage result
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            if stage.deps:
+                await asyncio.gather(*(tasks[dep] for dep in stage.deps))
+            deps = {dep: results[dep] for dep in stage.deps}
+            async with semaphore:
+                results[stage.name] = await stage.fn(deps)
+            if on_stage_complete:
+                on_stage_complete(stage.name, results[stage.name])
+            return results[stage.name]
+
+        for name in self.topological_order():
+            tasks[name] = asyncio.ensure_future(run_stage(self.stages[name]))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return results
@@ -3,12 +3,16 @@ CrewAI Tasks for Incident Analysis Pipeline
 Defines the sequential tasks that agents will execute
 """
 
-from crewai import Task
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Any, Dict
 
+if TYPE_CHECKING:
+    from crewai import Task
 
-def create_alert_triage_task(agent, incident_data: Dict[str, Any]) -> Task:
+
+def create_alert_triage_task(agent, incident_data: Dict[str, Any]) -> "Task":
     """Task for initial alert triage and severity assessment"""
+    from crewai import Task
+    
     return Task(
         description=f"""
         Analyze the following incident data and perform initial triage:
@@ -37,8 +41,10 @@ def create_alert_triage_task(agent, incident_data: Dict[str, Any]) -> Task:
     )
 
 
-def create_log_analysis_task(agent, incident_data: Dict[str, Any]) -> Task:
+def create_log_analysis_task(agent, incident_data: Dict[str, Any]) -> "Task":
     """Task for analyzing log data"""
+    from crewai import Task
+    
     return Task(
         description=f"""
         Analyze the following log data to identify patterns and anomalies:
@@ -68,8 +74,10 @@ def create_log_analysis_task(agent, incident_data: Dict[str, Any]) -> Task:
     )
 
 
-def create_metrics_analysis_task(agent, incident_data: Dict[str, Any]) -> Task:
+def create_metrics_analysis_task(agent, incident_data: Dict[str, Any]) -> "Task":
     """Task for analyzing metrics data"""
+    from crewai import Task
+    
     return Task(
         description=f"""
         Analyze the following metrics data to identify performance issues:
@@ -99,13 +107,15 @@ def create_metrics_analysis_task(agent, incident_data: Dict[str, Any]) -> Task:
     )
 
 
-def create_knowledge_base_task(agent, past_incidents: list) -> Task:
-    """Task for correlating with historical incidents"""
+def create_knowledge_base_task(agent, past_incidents: list) -> "Task":
+    """Task for correlating with historical incidents (pass the retrieved top-k matches)"""
+    from crewai import Task
+    
     return Task(
         description=f"""
         Correlate the current incident with historical incidents and patterns:
         
-        Historical Incidents: {past_incidents}
+        Most Similar Historical Incidents: {past_incidents}
         
         Your task is to:
         1. Find similar past incidents
@@ -130,8 +140,10 @@ def create_knowledge_base_task(agent, past_incidents: list) -> Task:
     )
 
 
-def create_root_cause_task(agent) -> Task:
+def create_root_cause_task(agent) -> "Task":
     """Task for root cause analysis synthesis"""
+    from crewai import Task
+    
     return Task(
         description="""
         Synthesize all previous analysis to determine the most likely root cause:
@@ -164,8 +176,10 @@ def create_root_cause_task(agent) -> Task:
     )
 
 
-def create_action_recommendation_task(agent) -> Task:
+def create_action_recommendation_task(agent) -> "Task":
     """Task for generating action recommendations"""
+    from crewai import Task
+    
     return Task(
         description="""
         Based on the root cause analysis, provide specific action recommendations:
@@ -195,8 +209,10 @@ def create_action_recommendation_task(agent) -> Task:
     )
 
 
-def create_post_incident_task(agent) -> Task:
+def create_post_incident_task(agent) -> "Task":
     """Task for generating post-incident report"""
+    from crewai import Task
+    
     return Task(
         description="""
         Generate a comprehensive post-incident report based on all analysis:
@@ -0,0 +1,158 @@
+"""
+Stage Output Schemas
+Pydantic models for each analysis stage's JSON output, following the structures in incident_tasks.py
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Type
+
+from pydantic import BaseModel, ConfigDict
+
+
+Level = Literal["High", "Medium", "Low"]
+
+
+class StageOutput(BaseModel):
+    # Fields beyond the schema are kept rather than rejected
+    model_config = ConfigDict(extra="allow")
+
+
+class TriageOutput(StageOutput):
+    severity: Literal["P0", "P1", "P2", "P3"]
+    urgency: Literal["Critical", "High", "Medium", "Low"]
+    affected_services: List[str]
+    business_impact: str
+    classification: str
+    confidence: Level
+
+
+class LogEvent(StageOutput):
+    timestamp: str
+    event: str
+    severity: str
+
+
+class LogAnalysisOutput(StageOutput):
+    error_patterns: List[str]
+    key_errors: List[str]
+    timeline: List[LogEvent]
+    failure_indicators: List[str]
+    log_correlation: str
+
+
+class ThresholdBreach(StageOutput):
+    metric: str
+    value: str
+    threshold: str
+    severity: str
+
+
+class MetricsAnalysisOutput(StageOutput):
+    resource_constraints: List[str]
+    performance_anomalies: List[str]
+    capacity_issues: List[str]
+    threshold_breaches: List[ThresholdBreach]
+    trends: str
+
+
+class SimilarIncident(StageOutput):
+    id: str
+    similarity: str
+    outcome: str
+
+
+class KnowledgeBaseOutput(StageOutput):
+    similar_incidents: List[SimilarIncident]
+    recurring_patterns: List[str]
+    lessons_learned: List[str]
+    proven_strategies: List[str]
+    preventive_measures: List[str]
+
+
+class RootCauseOutput(StageOutput):
+    # The task text calls this "root_cause"; the API result and frontend read primary_cause
+    primary_cause: str
+    supporting_evidence: List[str]
+    confidence_level: Level
+    alternative_causes: List[str]
+    failure_chain: str
+    contributing_factors: List[str]
+
+
+class ImmediateAction(StageOutput):
+    action: str
+    priority: Level
+    estimated_time: str
+
+
+class LongTermAction(StageOutput):
+    action: str
+    priority: Level
+    estimated_effort: str
+
+
+class ActionRecommendationsOutput(StageOutput):
+    immediate_actions: List[ImmediateAction]
+    long_term_actions: List[LongTermAction]
+    rollback_procedures: List[str]
+    monitoring_steps: List[str]
+    validation_criteria: List[str]
+
+
+class ReportEvent(StageOutput):
+    time: str
+    event: str
+    impact: str
+
+
+class ImpactAnalysis(StageOutput):
+    services_affected: List[str]
+    users_impacted: str
+    business_impact: str
+    duration: str
+
+
+class ActionItem(StageOutput):
+    action: str
+    owner: str
+    due_date: str
+
+
+class PostIncidentReportOutput(StageOutput):
+    incident_summary: str
+    timeline: List[ReportEvent]
+    impact_analysis: ImpactAnalysis
+    resolution_summary: str
+    lessons_learned: List[str]
+    preventive_measures: List[str]
+    action_items: List[ActionItem]
+
+
+# Pipeline stage name -> output model
+STAGE_SCHEMAS: Dict[str, Type[StageOutput]] = {
+    "triage": TriageOutput,
+    "logs": LogAnalysisOutput,
+    "metrics": MetricsAnalysisOutput,
+    "knowledge_base": KnowledgeBaseOutput,
+    "root_cause": RootCauseOutput,
+    "actions": ActionRecommendationsOutput,
+    "report": PostIncidentReportOutput,
+}
+
+
+def _closed(schema: Any) -> Any:
+    """Schema with extra properties disallowed, so constrained decoding never wanders off the fields"""
+    if isinstance(schema, dict):
+        schema = {key: _closed(value) for key, value in schema.items()}
+        if schema.get("type") == "object":
+            schema["additionalProperties"] = False
+        return schema
+    if isinstance(schema, list):
+        return [_closed(item) for item in schema]
+    return schema
+
+
+@lru_cache(maxsize=None)
+def stage_json_schema(stage: str) -> Dict[str, Any]:
+    """JSON schema for a stage's output, as sent in Ollama's `format` field (treat as read-only)"""
+    return _closed(STAGE_SCHEMAS[stage].model_json_schema())
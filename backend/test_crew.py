@@ -5,7 +5,7 @@ import json
 import sys
 
 try:
-    from simple_crew import SimpleIncidentAnalysisCrew
+    from simple_crew import SimpleIncidentAnalysisCrew, extract_json_from_text
     from mock_llm import MockOllamaLLM
     
     print("✓ All imports successful")
@@ -19,6 +19,14 @@ try:
     parsed = json.loads(response)
     print(f"✓ LLM invoke works, parsed response keys: {list(parsed.keys())}")
     
+    # Test 2b: JSON extraction from narrative responses
+    fenced = 'Tip: use {placeholder in the template.\n```json\n{"severity": "P1", "services": {"a": 1}}\n```'
+    assert extract_json_from_text(fenced) == {"severity": "P1", "services": {"a": 1}}
+    # Truncated or invalid objects yield nothing rather than one of their nested objects
+    assert extract_json_from_text('{"similar_incidents": [{"id": "INC-1"}, {"id"') is None
+    assert extract_json_from_text('{"root_cause": {"primary_cause": "x"}, "evidence": ["a",],}') is None
+    print("✓ JSON extraction recovers fenced objects and rejects truncated ones")
+    
     # Test 3: Create crew and test with sample data
     crew = SimpleIncidentAnalysisCrew()
     print("✓ SimpleIncidentAnalysisCrew instance created")
@@ -0,0 +1,260 @@
+"""
+Analysis Tracing
+Lightweight per-analysis span tracing with an in-process ring buffer and optional OTLP JSON export
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "200"))
+# Append finished traces as OTLP/JSON lines to this file (empty disables export)
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "sre-incident-commander")
+
+
+class Span:
+    """One timed operation; times are epoch nanoseconds so they line up across threads"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return round((self.end_ns - self.start_ns) / 1e6, 3)
+
+
+class Trace:
+    """All spans of one analysis, rooted at a single request span"""
+
+    def __init__(self, incident_id: str):
+        self.trace_id = secrets.token_hex(16)
+        self.incident_id = incident_id
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Span:
+        span = Span(self, name, parent_id, attributes)
+        with self._lock:
+            self.spans.append(span)
+            if self.root is None:
+                self.root = span
+        return span
+
+    def waterfall(self) -> Dict[str, Any]:
+        """Spans depth-first (siblings by start) with offsets from the root, ready for a waterfall chart"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        origin = self.root.start_ns
+        rows = []
+        stack = [(self.root, 0)]
+        while stack:
+            span, depth = stack.pop()
+            rows.append({
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "depth": depth,
+                "offset_ms": round((span.start_ns - origin) / 1e6, 3),
+                "duration_ms": span.duration_ms,
+                "status": "error" if span.error else ("ok" if span.end_ns is not None else "running"),
+                "error": span.error,
+                "attributes": span.attributes
+            })
+            stack.extend((child, depth + 1) for child in reversed(children.get(span.span_id, [])))
+        return {
+            "trace_id": self.trace_id,
+            "incident_id": self.incident_id,
+            "name": self.root.name,
+            "started_at": self.root.start_ns / 1e9,
+            "duration_ms": self.root.duration_ms,
+            "status": rows[0]["status"],
+            "span_count": len(rows),
+            "spans": rows
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "incident_id": self.incident_id,
+            "name": self.root.name,
+            "started_at": self.root.start_ns / 1e9,
+            "duration_ms": self.root.duration_ms,
+            "status": "error" if self.root.error else "ok",
+            "span_count": len(self.spans)
+        }
+
+    def to_otlp(self, service_name: str = TRACE_SERVICE_NAME) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest for this trace"""
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        with self._lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "sre-commander.tracing"},
+                "spans": [
+                    {
+                        "traceId": self.trace_id,
+                        "spanId": span.span_id,
+                        **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                        "name": span.name,
+                        "kind": 2 if span.parent_id is None else 1,
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                        "attributes": [
+                            attribute(key, value) for key, value in
+                            {"incident.id": self.incident_id, **span.attributes}.items()
+                        ],
+                        "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                    }
+                    for span in spans
+                ]
+            }]
+        }]}
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent finished traces, keyed by incident ID"""
+
+    def __init__(self, maxsize: int = TRACE_BUFFER_SIZE, export_path: str = TRACE_EXPORT_PATH):
+        self.maxsize = maxsize
+        self.export_path = export_path
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.incident_id] = trace
+            self._traces.move_to_end(trace.incident_id)
+            while len(self._traces) > self.maxsize:
+                self._traces.popitem(last=False)
+        if self.export_path:
+            self._export(trace)
+
+    def _export(self, trace: Trace) -> None:
+        try:
+            line = json.dumps(trace.to_otlp(), default=str)
+            with self._export_lock, open(self.export_path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+        except OSError as e:
+            print(f"Trace export to {self.export_path} failed: {e}")
+
+    def get(self, incident_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(incident_id)
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        """Newest first"""
+        with self._lock:
+            traces = list(self._traces.values())
+        return traces[::-1][:limit]
+
+
+trace_buffer = TraceBuffer()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def trace_analysis(incident_id: str, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Root span for one analysis; the finished trace goes to trace_buffer
+
+    Nested inside another traced analysis this becomes a child span instead of
+    starting a second trace.
+    """
+    if _current_span.get() is not None:
+        with span(name, **attributes) as current:
+            yield current
+        return
+    trace = Trace(incident_id)
+    try:
+        with _enter(trace.start_span(name, None, attributes)) as root:
+            yield root
+    finally:
+        # Failed analyses are kept too; they are usually the ones worth inspecting
+        trace_buffer.add(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current span; a no-op outside a traced analysis"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _enter(parent.trace.start_span(name, parent.span_id, attributes)) as current:
+        yield current
+
+
+@contextmanager
+def _enter(current: Span) -> Iterator[Span]:
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def record_sequential_span(name: str, **attributes: Any) -> None:
+    """
+    Record a just-finished child of the current span that began when its previous sibling ended
+
+    For frameworks that run steps one after another and only report completions
+    (e.g. CrewAI's task_callback).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+    trace = parent.trace
+    with trace._lock:
+        siblings = [span.end_ns for span in trace.spans if span.parent_id == parent.span_id and span.end_ns]
+    recorded = trace.start_span(name, parent.span_id, attributes)
+    recorded.start_ns = max(siblings, default=parent.start_ns)
+    recorded.end_ns = time.time_ns()
+
+
+def set_span_attribute(key: str, value: Any) -> None:
+    """Annotate the current span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes[key] = value
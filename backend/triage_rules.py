@@ -0,0 +1,164 @@
+"""
+Rule-Based Triage
+Deterministic fast-path triage from alert severity, metrics and service tier
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from metrics_engine import iter_samples
+
+
+PRIORITIES = ["P0", "P1", "P2", "P3"]
+URGENCY = {"P0": "Critical", "P1": "High", "P2": "Medium", "P3": "Low"}
+
+# Alert severity label -> starting priority
+SEVERITY_PRIORITY = {
+    "critical": "P1", "page": "P1", "high": "P1", "error": "P2",
+    "warning": "P2", "medium": "P2", "low": "P3", "info": "P3",
+}
+
+# Metric rules: the most severe matching rule per metric counts
+TRIAGE_METRIC_RULES = [
+    {"metric": "error_rate_percent", "gte": 25.0, "priority": "P0"},
+    {"metric": "error_rate_percent", "gte": 10.0, "priority": "P1"},
+    {"metric": "error_rate_percent", "gte": 5.0, "priority": "P2"},
+    {"metric": "status_5xx_percent", "gte": 10.0, "priority": "P1"},
+    {"metric": "memory_usage_percent", "gte": 98.0, "priority": "P1"},
+    {"metric": "memory_usage_percent", "gte": 90.0, "priority": "P2"},
+    {"metric": "memory_utilization_percent", "gte": 98.0, "priority": "P1"},
+    {"metric": "memory_utilization_percent", "gte": 90.0, "priority": "P2"},
+    {"metric": "connection_pool_saturation_percent", "gte": 95.0, "priority": "P1"},
+    {"metric": "connection_pool_saturation_percent", "gte": 85.0, "priority": "P2"},
+    {"metric": "connection_wait_time_ms", "gte": 5000.0, "priority": "P1"},
+    {"metric": "response_time_p95_ms", "gte": 3000.0, "priority": "P1"},
+    {"metric": "response_time_p95_ms", "gte": 1000.0, "priority": "P2"},
+    {"metric": "cpu_usage_percent", "gte": 95.0, "priority": "P2"},
+]
+
+# Service tier: 0 = customer-facing critical path, 1 = core, 2 = internal; override with TRIAGE_SERVICE_TIERS (JSON)
+SERVICE_TIERS = {
+    "api-gateway": 0, "checkout-service": 0, "payment-service": 0, "database": 0,
+    "user-service": 1, "auth-service": 1, "inventory-service": 1,
+}
+SERVICE_TIERS.update(json.loads(os.environ.get("TRIAGE_SERVICE_TIERS", "{}")))
+
+TIER_IMPACT = {
+    0: "High - customer-facing critical path is degraded",
+    1: "Medium - core service degraded; dependent features at risk",
+    2: "Low - internal service impact",
+}
+
+TRIAGE_CONFIDENCE_THRESHOLD = float(os.environ.get("TRIAGE_CONFIDENCE_THRESHOLD", "0.7"))
+
+
+def _rank(priority: str) -> int:
+    return PRIORITIES.index(priority)
+
+
+class TriageRuleEngine:
+    """
+    Maps an alert to P0-P3, urgency and affected services without an LLM
+
+    The alert severity sets a starting priority; tier-0 services escalate it one
+    level and tier-2 services relax it one level. Metric rules can only escalate.
+    The confidence score reflects how much structured evidence the alert carried
+    and whether severity and metrics agree; below confidence_threshold the
+    caller should fall back to LLM triage.
+    """
+
+    def __init__(
+        self,
+        metric_rules: Optional[List[Dict[str, Any]]] = None,
+        severity_priority: Optional[Dict[str, str]] = None,
+        service_tiers: Optional[Dict[str, int]] = None,
+        confidence_threshold: float = TRIAGE_CONFIDENCE_THRESHOLD
+    ):
+        self.metric_rules = metric_rules if metric_rules is not None else TRIAGE_METRIC_RULES
+        self.severity_priority = severity_priority if severity_priority is not None else SEVERITY_PRIORITY
+        self.service_tiers = service_tiers if service_tiers is not None else SERVICE_TIERS
+        self.confidence_threshold = confidence_threshold
+
+    def _metric_matches(self, alert: Dict[str, Any]) -> List[Dict[str, Any]]:
+        values: Dict[str, float] = {}
+        for _, _, numeric in iter_samples(alert.get("metrics") or {}):
+            values.update(numeric)
+        best: Dict[str, Dict[str, Any]] = {}
+        for rule in self.metric_rules:
+            value = values.get(rule["metric"])
+            if value is None or value < rule["gte"]:
+                continue
+            current = best.get(rule["metric"])
+            if current is None or _rank(rule["priority"]) < _rank(current["priority"]):
+                best[rule["metric"]] = {**rule, "value": value}
+        return list(best.values())
+
+    def assess(self, alert: Any) -> Dict[str, Any]:
+        """
+        Triage an alert
+
+        Returns:
+            Triage JSON in the LLM stage's shape plus "confidence_score",
+            "matched_rules", "fast_path" (confidence >= threshold) and "source"
+        """
+        if not isinstance(alert, dict):
+            # Free text: nothing structured to go on
+            return {"confidence_score": 0.0, "fast_path": False, "source": "rules", "matched_rules": []}
+
+        severity_label = str(alert.get("severity") or "").lower()
+        services = [str(service) for service in (alert.get("services") or [alert.get("service")]) if service]
+        tiers = [self.service_tiers[service] for service in services if service in self.service_tiers]
+        tier = min(tiers) if tiers else None
+
+        matched: List[str] = []
+        confidence = 0.4
+        severity_priority = self.severity_priority.get(severity_label)
+        priority = severity_priority
+        if severity_priority is not None:
+            confidence += 0.2
+            matched.append(f"severity:{severity_label}->{severity_priority}")
+            if tier == 0 and severity_priority != "P0":
+                priority = PRIORITIES[_rank(severity_priority) - 1]
+                matched.append(f"tier0:{priority}")
+            elif tier == 2 and severity_priority != "P3":
+                priority = PRIORITIES[_rank(severity_priority) + 1]
+                matched.append(f"tier2:{priority}")
+
+        metric_matches = self._metric_matches(alert)
+        if metric_matches:
+            confidence += 0.15
+            metric_priority = min((match["priority"] for match in metric_matches), key=_rank)
+            matched.extend(f"{match['metric']}>={match['gte']}->{match['priority']}" for match in metric_matches)
+            if priority is None:
+                priority = metric_priority
+            else:
+                gap = abs(_rank(metric_priority) - _rank(severity_priority))
+                confidence += 0.1 if gap == 0 else (-0.2 if gap >= 2 else 0.0)
+                priority = min(priority, metric_priority, key=_rank)
+
+        if tier is not None:
+            confidence += 0.1
+        elif not services:
+            confidence -= 0.2
+        if priority is None:
+            return {"confidence_score": 0.0, "fast_path": False, "source": "rules", "matched_rules": matched}
+
+        confidence = round(max(0.0, min(1.0, confidence)), 2)
+        return {
+            "severity": priority,
+            "urgency": URGENCY[priority],
+            "affected_services": services,
+            "business_impact": TIER_IMPACT.get(tier, "Unknown - service tier not configured"),
+            "classification": str(alert.get("message") or severity_label or "alert"),
+            "escalation_needed": priority in ("P0", "P1"),
+            "priority_justification": "; ".join(matched),
+            "confidence": "High" if confidence >= 0.8 else ("Medium" if confidence >= 0.6 else "Low"),
+            "confidence_score": confidence,
+            "matched_rules": matched,
+            "fast_path": confidence >= self.confidence_threshold,
+            "source": "rules"
+        }
+
+
+triage_engine = TriageRuleEngine()
@@ -6,6 +6,32 @@ import Header from './components/Header'
 import LoadingSpinner from './components/LoadingSpinner'
 
 const API_BASE_URL = 'http://localhost:8080'
+const POLL_INTERVAL_MS = 1000
+const POLL_TIMEOUT_MS = 600000
+
+// Submit an incident to the job API and poll until the analysis finishes
+const runIncidentJob = async (incidentData) => {
+  const submitted = await axios.post(`${API_BASE_URL}/incidents`, incidentData, {
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    timeout: 30000,
+  })
+  const incidentId = submitted.data.incident_id
+  const deadline = Date.now() + POLL_TIMEOUT_MS
+
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+    const { data: job } = await axios.get(`${API_BASE_URL}/incidents/${incidentId}`, { timeout: 30000 })
+    if (job.status === 'completed') {
+      return job
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Incident analysis failed')
+    }
+  }
+  throw new Error(`Timed out waiting for incident ${incidentId}`)
+}
 
 function App() {
   const [analysisResult, setAnalysisResult] = useState(null)
@@ -18,15 +44,10 @@ function App() {
     setAnalysisResult(null)
 
     try {
-      const response = await axios.post(`${API_BASE_URL}/analyze-incident`, incidentData, {
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        timeout: 240000, // 2 minute timeout for LLM processing
-      })
+      const job = await runIncidentJob(incidentData)
 
-      console.log('Full response:', response.data)
-      const analysisData = response.data.analysis
+      console.log('Full response:', job)
+      const analysisData = job.analysis
       if (!analysisData) {
         throw new Error('No analysis data in response')
       }